@@ -0,0 +1,48 @@
+"""Per-request build time with and without the cached request plan.
+
+Run from the repository root with ``python -m benchmarks.request_plan``.
+The "uncached" numbers clear the plan cache before every call, which is what
+building a request cost before the plan was resolved once per class.
+"""
+
+import timeit
+from typing import Callable
+
+from requestmodel.plan import _build_request_plan
+from tests.fastapi_server.schema import FileCreateSchema
+from tests.locatieserver.requests import LookupRequest
+from tests.test_param_types import CreateRequest
+
+
+NUMBER = 20_000
+
+
+def uncached(build: Callable[[], object]) -> Callable[[], object]:
+    def run() -> object:
+        _build_request_plan.cache_clear()
+        return build()
+
+    return run
+
+
+def report(name: str, build: Callable[[], object]) -> None:
+    before = min(timeit.repeat(uncached(build), number=NUMBER, repeat=3))
+    after = min(timeit.repeat(build, number=NUMBER, repeat=3))
+
+    print(
+        f"{name:<16} uncached {before / NUMBER * 1e6:8.2f} us"
+        f"   cached {after / NUMBER * 1e6:8.2f} us"
+        f"   {before / after:5.2f}x"
+    )
+
+
+def main() -> None:
+    lookup = LookupRequest(id="adr-bf54db721969487ed33ba84d9973c702")
+    create = CreateRequest(data=FileCreateSchema(name="test", path="test"))
+
+    report("LookupRequest", lookup.request_args_for_values)
+    report("CreateRequest", create.request_args_for_values)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""Micro-benchmarks of building requests and parsing responses.
+
+Run from the repository root with ``python -m benchmarks.suite``. Every case
+runs offline, responses come from an httpx ``MockTransport``.
+
+``--save`` stores the results and ``--compare`` compares them with a stored
+baseline, exiting with status 1 when a case got slower than the
+``--threshold``. Both use ``benchmarks/baseline.json`` unless given a file.
+
+The baseline is only meaningful on the machine it was recorded on, record a
+new one before comparing elsewhere.
+"""
+
+import argparse
+import json
+import sys
+import time
+from functools import partial
+from pathlib import Path
+from typing import Any
+from typing import Callable
+from typing import ClassVar
+from typing import Dict
+from typing import List
+from typing import Type
+
+from httpx import Client
+from httpx import MockTransport
+from httpx import Request
+from httpx import Response
+from typing_extensions import Annotated
+from typing_extensions import get_type_hints
+
+from requestmodel import RequestModel
+from requestmodel import params
+from requestmodel.adapters.httpx import HTTPXAdapter
+from requestmodel.fastapi import jsonable_encoder
+from requestmodel.utils import get_annotated_type
+from tests.locatieserver.models import LookupDoc
+from tests.locatieserver.models import LookupResponse
+from tests.locatieserver.requests import LookupRequest
+
+
+BASELINE = Path(__file__).parent / "baseline.json"
+SIZES = {"small": 1, "medium": 100, "large": 5_000}
+
+
+class BulkLookupRequest(RequestModel[LookupResponse]):
+    method: ClassVar[str] = "POST"
+    url: ClassVar[str] = "/lookup/{collection}"
+    response_model: ClassVar[Type[LookupResponse]] = LookupResponse
+
+    collection: str
+    content_type: Annotated[str, params.Header()] = "application/json"
+    docs: Annotated[List[LookupDoc], params.Body(embed=True)]
+
+
+def make_doc(n: int) -> LookupDoc:
+    return LookupDoc(
+        bron="BAG",
+        woonplaatscode="3594",
+        type="adres",
+        woonplaatsnaam="Utrecht",
+        huis_nlt=str(n),
+        openbareruimtetype="Weg",
+        gemeentecode="0344",
+        weergavenaam=f"Stationsplein {n}, 3511ED Utrecht",
+        straatnaam_verkort="Stationsplein",
+        id=f"adr-{n:032x}",
+        gemeentenaam="Utrecht",
+        identificatie=f"0344010000{n:06d}",
+        openbareruimte_id="0344300000118753",
+        provinciecode="PV26",
+        postcode="3511ED",
+        provincienaam="Utrecht",
+        nummeraanduiding_id=f"0344200000{n:06d}",
+        adresseerbaarobject_id=f"0344010000{n:06d}",
+        huisnummer=n,
+        provincieafkorting="UT",
+        straatnaam="Stationsplein",
+        gekoppeld_perceel=["UTT00-C-1234"],
+    )
+
+
+def response_content(docs: List[LookupDoc]) -> bytes:
+    return json.dumps(
+        {
+            "response": {
+                "numFound": len(docs),
+                "start": 0,
+                "docs": [doc.model_dump() for doc in docs],
+            }
+        }
+    ).encode()
+
+
+def cases() -> Dict[str, Callable[[], Any]]:
+    result: Dict[str, Callable[[], Any]] = {}
+    adapter = HTTPXAdapter()
+
+    lookup = LookupRequest(id="adr-bf54db721969487ed33ba84d9973c702")
+    hints = get_type_hints(LookupRequest, include_extras=True)
+    fields = [(key, hints[key]) for key in LookupRequest.model_fields]
+    path_params = {"collection"}
+
+    result["get_annotated_type"] = lambda: [
+        get_annotated_type(key, hint, path_params) for key, hint in fields
+    ]
+    result["request_args_for_values[lookup]"] = lookup.request_args_for_values
+
+    for size, count in SIZES.items():
+        docs = [make_doc(n) for n in range(count)]
+        content = response_content(docs)
+        model = BulkLookupRequest(collection="adressen", docs=docs)
+        response = Response(200, content=content)
+
+        def handler(request: Request, content: bytes = content) -> Response:
+            return Response(200, content=content)
+
+        client = Client(transport=MockTransport(handler), base_url="http://test")
+
+        result[f"request_args_for_values[{size}]"] = model.request_args_for_values
+        result[f"jsonable_encoder[{size}]"] = partial(jsonable_encoder, docs)
+        result[f"transform[{size}]"] = partial(adapter.transform, client, model)
+        result[f"adapt_type[{size}]"] = partial(model.adapt_type, response)
+        result[f"send[{size}]"] = partial(model.send, client)
+
+    return result
+
+
+def measure(call: Callable[[], Any], budget: float, repeat: int) -> float:
+    """Return the fastest time per call over ``repeat`` runs"""
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            call()
+        elapsed = time.perf_counter() - start
+
+        if elapsed >= budget / repeat:
+            break
+        number *= 2
+
+    best = elapsed / number
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            call()
+        best = min(best, (time.perf_counter() - start) / number)
+
+    return best
+
+
+def compare(
+    results: Dict[str, float], baseline: Dict[str, float], threshold: float
+) -> List[str]:
+    regressions = []
+
+    for name, seconds in results.items():
+        before = baseline.get(name)
+
+        if before is None:
+            print(f"{name:<36} {seconds * 1e6:12.2f} us   (new)")
+            continue
+
+        ratio = seconds / before
+        flag = ""
+
+        if ratio > 1 + threshold:
+            regressions.append(name)
+            flag = "   REGRESSION"
+
+        print(f"{name:<36} {seconds * 1e6:12.2f} us   {ratio:5.2f}x{flag}")
+
+    return regressions
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--save", type=Path, nargs="?", const=BASELINE, help="store as baseline"
+    )
+    parser.add_argument(
+        "--compare", type=Path, nargs="?", const=BASELINE, help="compare to baseline"
+    )
+    parser.add_argument(
+        "--threshold", type=float, default=0.25, help="allowed slowdown (0.25)"
+    )
+    parser.add_argument("--budget", type=float, default=0.5, help="seconds per case")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("-k", dest="keyword", default="", help="only matching cases")
+    args = parser.parse_args(argv)
+
+    results = {
+        name: measure(call, args.budget, args.repeat)
+        for name, call in cases().items()
+        if args.keyword in name
+    }
+
+    if args.compare is not None:
+        baseline = json.loads(args.compare.read_text())
+        regressions = compare(results, baseline, args.threshold)
+    else:
+        regressions = []
+        for name, seconds in results.items():
+            print(f"{name:<36} {seconds * 1e6:12.2f} us")
+
+    if args.save is not None:
+        args.save.write_text(json.dumps(results, indent=2, sort_keys=True) + "\n")
+
+    if regressions:
+        print(f"{len(regressions)} case(s) slower than {1 + args.threshold:.2f}x")
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,300 @@
+"""End-to-end throughput and latency of the adapters against real sockets.
+
+Run from the repository root with ``python -m benchmarks.throughput``.
+
+The test apps are served from a separate process by the threaded werkzeug
+server, the FastAPI app through a2wsgi. Every combination of server, client
+(``send``, ``asend`` and ``requests``), concurrency and payload size runs for
+``--duration`` seconds. The CPU time is the time of the client process only.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from dataclasses import dataclass
+from multiprocessing.connection import Connection
+from pathlib import Path
+from typing import Any
+from typing import Callable
+from typing import ClassVar
+from typing import Dict
+from typing import List
+from typing import Tuple
+from typing import Type
+
+import httpx
+import requests
+from werkzeug.serving import make_server
+
+from requestmodel import RequestModel
+from requestmodel.adapters.requests import RequestsRequestModel
+from tests.fastapi_server.schema import PaginatedResponse
+
+
+SERVERS = ["fastapi", "flask"]
+CLIENTS = ["send", "asend", "requests"]
+
+
+class PayloadRequest(RequestModel[PaginatedResponse]):
+    method: ClassVar[str] = "GET"
+    url: ClassVar[str] = "/payload"
+    response_model: ClassVar[Type[PaginatedResponse]] = PaginatedResponse
+
+    size: int
+
+
+class PayloadRequests(RequestsRequestModel[PaginatedResponse]):
+    method: ClassVar[str] = "GET"
+    # requests needs an absolute url, set once the server is listening
+    url: ClassVar[str] = "/payload"
+    response_model: ClassVar[Type[PaginatedResponse]] = PaginatedResponse
+
+    size: int
+
+
+def load_app(server: str) -> Any:
+    if server == "fastapi":
+        from a2wsgi import ASGIMiddleware
+
+        from tests.fastapi_server import app
+
+        return ASGIMiddleware(app)  # type: ignore[arg-type]
+
+    from tests.flask_server import app as flask_app
+
+    return flask_app
+
+
+def serve(server: str, connection: Connection) -> None:
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    httpd = make_server("127.0.0.1", 0, load_app(server), threaded=True)
+    connection.send(httpd.server_port)
+    httpd.serve_forever()
+
+
+@dataclass
+class Result:
+    server: str
+    client: str
+    concurrency: int
+    size: int
+    requests: int
+    errors: int
+    rps: float
+    p50: float
+    p95: float
+    p99: float
+    cpu_per_request: float
+
+
+def percentile(latencies: List[float], p: float) -> float:
+    if not latencies:
+        return 0.0
+
+    return latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))]
+
+
+def run_threads(
+    call: Callable[[], Any], concurrency: int, duration: float
+) -> Tuple[List[float], int]:
+    latencies: List[float] = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker() -> None:
+        own: List[float] = []
+        failed = 0
+
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                call()
+            except Exception:
+                failed += 1
+                continue
+            own.append(time.perf_counter() - start)
+
+        with lock:
+            latencies.extend(own)
+            errors[0] += failed
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for _ in range(concurrency):
+            executor.submit(worker)
+
+    return latencies, errors[0]
+
+
+async def run_tasks(
+    client: httpx.AsyncClient, size: int, concurrency: int, duration: float
+) -> Tuple[List[float], int]:
+    latencies: List[float] = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker() -> None:
+        nonlocal errors
+
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                await PayloadRequest(size=size).asend(client)
+            except Exception:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    return latencies, errors
+
+
+def measure(
+    base_url: str, client: str, concurrency: int, size: int, duration: float
+) -> Tuple[List[float], int]:
+    limits = httpx.Limits(max_connections=concurrency)
+
+    if client == "send":
+        with httpx.Client(base_url=base_url, limits=limits) as sync_client:
+            # a model per call, like asend, send keeps its response on the model
+            return run_threads(
+                lambda: PayloadRequest(size=size).send(sync_client),
+                concurrency,
+                duration,
+            )
+
+    if client == "asend":
+
+        async def main() -> Tuple[List[float], int]:
+            async with httpx.AsyncClient(base_url=base_url, limits=limits) as c:
+                return await run_tasks(c, size, concurrency, duration)
+
+        return asyncio.run(main())
+
+    # a session and a model per thread, neither is thread safe
+    local = threading.local()
+    PayloadRequests.url = f"{base_url}/payload"
+
+    def call() -> Any:
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+            local.model = PayloadRequests(size=size)
+        return local.model.send(local.session)
+
+    return run_threads(call, concurrency, duration)
+
+
+def benchmark(
+    server: str,
+    base_url: str,
+    client: str,
+    concurrency: int,
+    size: int,
+    duration: float,
+) -> Result:
+    wall = time.perf_counter()
+    cpu = time.process_time()
+
+    latencies, errors = measure(base_url, client, concurrency, size, duration)
+
+    wall = time.perf_counter() - wall
+    cpu = time.process_time() - cpu
+    latencies.sort()
+    count = len(latencies)
+
+    return Result(
+        server=server,
+        client=client,
+        concurrency=concurrency,
+        size=size,
+        requests=count,
+        errors=errors,
+        rps=count / wall,
+        p50=percentile(latencies, 50),
+        p95=percentile(latencies, 95),
+        p99=percentile(latencies, 99),
+        cpu_per_request=cpu / max(count, 1),
+    )
+
+
+def print_result(result: Result) -> None:
+    print(
+        f"{result.server:<8} {result.client:<9} {result.concurrency:>5} "
+        f"{result.size:>6} {result.rps:>9.0f} "
+        f"{result.p50 * 1e3:>8.2f} {result.p95 * 1e3:>8.2f} {result.p99 * 1e3:>8.2f} "
+        f"{result.cpu_per_request * 1e6:>9.0f} {result.errors:>6}"
+    )
+
+
+def csv_ints(value: str) -> List[int]:
+    return [int(v) for v in value.split(",")]
+
+
+def csv_names(choices: List[str]) -> Callable[[str], List[str]]:
+    def parse(value: str) -> List[str]:
+        names = value.split(",")
+        unknown = set(names) - set(choices)
+
+        if unknown:
+            raise argparse.ArgumentTypeError(f"unknown: {', '.join(sorted(unknown))}")
+
+        return names
+
+    return parse
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--servers", type=csv_names(SERVERS), default=SERVERS)
+    parser.add_argument("--clients", type=csv_names(CLIENTS), default=CLIENTS)
+    parser.add_argument("--concurrency", type=csv_ints, default=[1, 8, 32])
+    parser.add_argument("--sizes", type=csv_ints, default=[1, 100, 10_000])
+    parser.add_argument("--duration", type=float, default=2.0, help="seconds per run")
+    parser.add_argument("--json", type=Path, help="also write the results here")
+    args = parser.parse_args(argv)
+
+    results: List[Dict[str, Any]] = []
+
+    print(
+        f"{'server':<8} {'client':<9} {'conc':>5} {'size':>6} {'req/s':>9} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'cpu us/r':>9} {'errors':>6}"
+    )
+
+    for server in args.servers:
+        parent, child = multiprocessing.Pipe()
+        process = multiprocessing.Process(
+            target=serve, args=(server, child), daemon=True
+        )
+        process.start()
+
+        try:
+            base_url = f"http://127.0.0.1:{parent.recv()}"
+
+            for client in args.clients:
+                for concurrency in args.concurrency:
+                    for size in args.sizes:
+                        result = benchmark(
+                            server, base_url, client, concurrency, size, args.duration
+                        )
+                        print_result(result)
+                        results.append(asdict(result))
+        finally:
+            process.terminate()
+            process.join()
+
+    if args.json is not None:
+        args.json.write_text(json.dumps(results, indent=2) + "\n")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -237,6 +237,15 @@ def xdoctest(session: Session) -> None:
     session.run("python", "-m", "xdoctest", *args)
 
 
+@session(python=python_versions[0])
+def benchmarks(session: Session) -> None:
+    """Compare the micro-benchmarks with the stored baseline."""
+    args = session.posargs or ["--compare"]
+    session.install(".")
+    session.install("requests")
+    session.run("python", "-m", "benchmarks.suite", *args)
+
+
 @session(name="docs-build", python=python_versions[0])
 def docs_build(session: Session) -> None:
     """Build the documentation."""
@@ -1,5 +1,16 @@
 from .model import IteratorRequestModel
+from .model import NDJSONRequestModel
+from .model import OffsetIteratorRequestModel
 from .model import RequestModel
+from .model import SSERequestModel
+from .model import StreamingRequestModel
 
 
-__all__ = ["RequestModel", "IteratorRequestModel"]
+__all__ = [
+    "RequestModel",
+    "IteratorRequestModel",
+    "OffsetIteratorRequestModel",
+    "StreamingRequestModel",
+    "NDJSONRequestModel",
+    "SSERequestModel",
+]
@@ -1,3 +1,5 @@
+from typing import Any
+
 from httpx import Request
 from httpx._client import BaseClient
 
@@ -5,6 +7,7 @@ from requestmodel import params
 from requestmodel.adapters.base import BaseAdapter
 from requestmodel.model import RequestModel
 from requestmodel.typing import ResponseType
+from requestmodel.upload import multipart_upload
 
 
 class HTTPXAdapter(BaseAdapter):
@@ -13,16 +16,52 @@ class HTTPXAdapter(BaseAdapter):
     def transform(
         self, client: BaseClient, model: RequestModel[ResponseType]
     ) -> Request:
-        request_args = model.request_args_for_values()
+        request_args = model.request_args_for_values(
+            include_body=not model.encode_json_body
+        )
 
         headers = client.headers
 
         if request_args[params.Header]:
             headers.update(request_args[params.Header])
 
+        is_json_request = "json" in headers.get("content-type", "")
+
         body = request_args[params.Body]
+        content: Any = None
+        stream = model.stream_body()
 
-        is_json_request = "json" in headers.get("content-type", "")
+        if stream is not None:
+            content_type, content = stream
+            headers = headers.copy()
+            headers.setdefault("content-type", content_type)
+        elif model.encode_json_body:
+            if is_json_request:
+                content = model.json_body()
+            else:
+                body = model.body_for_values()
+
+        upload = multipart_upload(
+            body if not is_json_request else {}, request_args[params.File]
+        )
+
+        if upload is not None:
+            headers = headers.copy()
+            headers.update(upload.headers)
+
+            r = Request(
+                method=model.method,
+                url=client._merge_url(model.url.format(**request_args[params.Path])),
+                params=request_args[params.Query],
+                headers=headers,
+                cookies=request_args[params.Cookie],
+                content=upload,
+            )
+            # content= adds the Host header, the upload itself can be sent
+            # by both clients while content= would only wrap it for Client
+            r.stream = upload
+
+            return r
 
         r = Request(
             method=model.method,
@@ -31,8 +70,9 @@ class HTTPXAdapter(BaseAdapter):
             headers=headers,
             cookies=request_args[params.Cookie],
             files=request_args[params.File],
-            data=body if not is_json_request else None,
-            json=body if is_json_request else None,
+            content=content,
+            data=body if not is_json_request and content is None else None,
+            json=body if is_json_request and content is None else None,
         )
 
         return r
@@ -1,24 +1,64 @@
+from typing import Any
+from typing import Iterator
 from typing import Optional
 
+from pydantic import Field
 from requests import Request
 from requests import Response
 from requests import Session
 from requests.adapters import BaseAdapter
 
 from requestmodel import params
+from requestmodel.instrumentation import BUILD
+from requestmodel.instrumentation import SEND
+from requestmodel.instrumentation import VALIDATE
 from requestmodel.model import BaseRequestModel
 from requestmodel.typing import ResponseType
+from requestmodel.upload import multipart_upload
 
 
 class RequestsAdapter(BaseAdapter):
     def transform(self, model: BaseRequestModel[ResponseType]) -> Request:
-        request_args = model.request_args_for_values()
+        request_args = model.request_args_for_values(
+            include_body=not model.encode_json_body
+        )
 
         headers = request_args[params.Header]
         body = request_args[params.Body]
 
         is_json_request = "json" in headers.get("content-type", "")
 
+        content: Any = None
+        stream = model.stream_body()
+
+        if stream is not None:
+            content_type, content = stream
+            headers.setdefault("content-type", content_type)
+
+            if not isinstance(content, Iterator):
+                raise TypeError("requests can not send an async iterable body")
+        elif model.encode_json_body:
+            if is_json_request:
+                content = model.json_body()
+            else:
+                body = model.body_for_values()
+
+        upload = multipart_upload(
+            body if not is_json_request else {}, request_args[params.File]
+        )
+
+        if upload is not None:
+            headers.update(upload.headers)
+
+            return Request(
+                method=model.method,
+                url=model.url.format(**request_args[params.Path]),
+                params=request_args[params.Query],
+                headers=headers,
+                cookies=request_args[params.Cookie],
+                data=upload,
+            )
+
         r = Request(
             method=model.method,
             url=model.url.format(**request_args[params.Path]),
@@ -26,15 +66,15 @@ class RequestsAdapter(BaseAdapter):
             headers=headers,
             cookies=request_args[params.Cookie],
             files=request_args[params.File],
-            data=body if not is_json_request else None,
-            json=body if is_json_request else None,
+            data=body if not is_json_request and content is None else content,
+            json=body if is_json_request and content is None else None,
         )
 
         return r
 
 
 class RequestsRequestModel(BaseRequestModel[ResponseType]):
-    response: Optional[Response] = None
+    response: Optional[Response] = Field(default=None, exclude=True)
 
     def handle_error(self, response: Response) -> None:
         response.raise_for_status()
@@ -47,7 +87,22 @@ class RequestsRequestModel(BaseRequestModel[ResponseType]):
 
     def send(self, client: Session) -> ResponseType:
         """Send the request synchronously"""
-        r = self.as_request()
-        self.response = client.send(r.prepare())
-        self.handle_error(self.response)
-        return self.adapt_type(self.response)
+        with self.phase(BUILD) as event:
+            r = self.as_request().prepare()
+
+            if self.compression is not None:
+                self.compression.compress_prepared(r)
+
+            if event is not None:
+                event.request = r
+
+        with self.phase(SEND, r) as event:
+            self.response = client.send(r)
+
+            if event is not None:
+                event.attempts = 1
+                event.response = self.response
+
+        with self.phase(VALIDATE, r, self.response):
+            self.handle_error(self.response)
+            return self.adapt_type(self.response)
@@ -0,0 +1,177 @@
+import asyncio
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+from dataclasses import dataclass
+from typing import AsyncGenerator
+from typing import Deque
+from typing import Generic
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Set
+
+from httpx import AsyncClient
+from httpx import Client
+
+from .model import RequestModel
+from .typing import ResponseType
+
+
+@dataclass(frozen=True)
+class BatchResult(Generic[ResponseType]):
+    """The outcome of one request in a batch
+
+    ``model`` is the instance that was sent, so its raw_response belongs to
+    this result. When the same instance is in flight twice, a copy is sent.
+    """
+
+    index: int
+    model: RequestModel[ResponseType]
+    response: Optional[ResponseType] = None
+    error: Optional[Exception] = None
+
+    def result(self) -> ResponseType:
+        """Return the response or raise the exception of the request"""
+        if self.error is not None:
+            raise self.error
+
+        return self.response  # type: ignore[return-value]
+
+
+class _InFlight:
+    """Keep track of the model instances that are being sent"""
+
+    def __init__(self) -> None:
+        self.ids: Set[int] = set()
+
+    def claim(self, model: RequestModel[ResponseType]) -> RequestModel[ResponseType]:
+        # send() stores raw_response on the model, never share one instance
+        if id(model) in self.ids:
+            model = model.model_copy()
+
+        self.ids.add(id(model))
+        return model
+
+    def release(self, model: RequestModel[ResponseType]) -> None:
+        self.ids.remove(id(model))
+
+
+def _send(
+    client: Client, index: int, model: RequestModel[ResponseType]
+) -> BatchResult[ResponseType]:
+    try:
+        # exactly one request per model, also for the iterator models
+        return BatchResult(index, model, response=RequestModel.send(model, client))
+    except Exception as e:
+        return BatchResult(index, model, error=e)
+
+
+async def _asend(
+    client: AsyncClient, index: int, model: RequestModel[ResponseType]
+) -> BatchResult[ResponseType]:
+    try:
+        response = await RequestModel.asend(model, client)
+        return BatchResult(index, model, response=response)
+    except Exception as e:
+        return BatchResult(index, model, error=e)
+
+
+def _completed(
+    window: "Deque[Future[BatchResult[ResponseType]]]", ordered: bool
+) -> "List[Future[BatchResult[ResponseType]]]":
+    if ordered:
+        return [window.popleft()]
+
+    done, _ = wait(window, return_when=FIRST_COMPLETED)
+    for future in done:
+        window.remove(future)
+    return list(done)
+
+
+async def _acompleted(
+    window: "Deque[asyncio.Task[BatchResult[ResponseType]]]", ordered: bool
+) -> "List[asyncio.Task[BatchResult[ResponseType]]]":
+    if ordered:
+        return [window.popleft()]
+
+    done, _ = await asyncio.wait(window, return_when=asyncio.FIRST_COMPLETED)
+    for task in done:
+        window.remove(task)
+    return list(done)
+
+
+def send_many(
+    client: Client,
+    models: Iterable[RequestModel[ResponseType]],
+    concurrency: int = 10,
+    ordered: bool = True,
+) -> Iterator[BatchResult[ResponseType]]:
+    """Send the models from a thread pool with at most ``concurrency`` in flight
+
+    Results are yielded in input order, or as they complete when ``ordered``
+    is false. A failing request does not stop the batch, its exception is
+    stored on the result.
+    """
+    in_flight = _InFlight()
+    window: "Deque[Future[BatchResult[ResponseType]]]" = deque()
+
+    def collect(
+        future: "Future[BatchResult[ResponseType]]",
+    ) -> BatchResult[ResponseType]:
+        result = future.result()
+        in_flight.release(result.model)
+        return result
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for index, model in enumerate(models):
+            if len(window) >= concurrency:
+                yield from map(collect, _completed(window, ordered))
+
+            model = in_flight.claim(model)
+            window.append(executor.submit(_send, client, index, model))
+
+        while window:
+            yield from map(collect, _completed(window, ordered))
+
+
+async def asend_many(
+    client: AsyncClient,
+    models: Iterable[RequestModel[ResponseType]],
+    concurrency: int = 10,
+    ordered: bool = True,
+) -> AsyncGenerator[BatchResult[ResponseType], None]:
+    """Send the models concurrently with at most ``concurrency`` in flight
+
+    Results are yielded in input order, or as they complete when ``ordered``
+    is false. A failing request does not stop the batch, its exception is
+    stored on the result.
+    """
+    in_flight = _InFlight()
+    window: "Deque[asyncio.Task[BatchResult[ResponseType]]]" = deque()
+
+    async def collect(
+        task: "asyncio.Task[BatchResult[ResponseType]]",
+    ) -> BatchResult[ResponseType]:
+        result = await task
+        in_flight.release(result.model)
+        return result
+
+    try:
+        for index, model in enumerate(models):
+            if len(window) >= concurrency:
+                for task in await _acompleted(window, ordered):
+                    yield await collect(task)
+
+            model = in_flight.claim(model)
+            window.append(asyncio.ensure_future(_asend(client, index, model)))
+
+        while window:
+            for task in await _acompleted(window, ordered):
+                yield await collect(task)
+    finally:
+        for task in window:
+            task.cancel()
@@ -0,0 +1,213 @@
+import threading
+import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from typing import Any
+from typing import Hashable
+from typing import Optional
+
+from httpx import Request
+from httpx import Response
+
+
+CACHEABLE_METHODS = {"GET", "HEAD"}
+
+
+def cache_key(request: Request) -> Hashable:
+    """Identify a request by its method, url and headers
+
+    The url already holds the merged base url, the path and the query
+    parameters, the headers hold the header and cookie parameters.
+    """
+    return (
+        request.method,
+        str(request.url),
+        tuple(sorted(request.headers.multi_items())),
+    )
+
+
+def _http_date(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def freshness_lifetime(response: Response, default: float = 0.0) -> Optional[float]:
+    """Seconds the response may be served from cache, None when not storable
+
+    Follows Cache-Control max-age, no-cache and no-store, then Expires
+    relative to Date.
+    """
+    directives = {}
+    for directive in response.headers.get("cache-control", "").split(","):
+        name, _, value = directive.strip().partition("=")
+        directives[name.lower()] = value.strip('"')
+
+    if "no-store" in directives:
+        return None
+
+    if "no-cache" in directives:
+        return 0.0
+
+    if directives.get("max-age", "").isdigit():
+        age = response.headers.get("age", "0")
+        return float(directives["max-age"]) - (float(age) if age.isdigit() else 0)
+
+    if "expires" in response.headers:
+        expires = _http_date(response.headers["expires"])
+
+        # an invalid date means the response is already expired
+        if expires is None:
+            return 0.0
+
+        return expires - (_http_date(response.headers.get("date")) or time.time())
+
+    return default
+
+
+class CacheEntry:
+    """A validated response together with the raw response it came from"""
+
+    def __init__(
+        self, response: Response, value: Any, lifetime: float, size: int
+    ) -> None:
+        self.response = response
+        self.value = value
+        self.etag = response.headers.get("etag")
+        self.expires = time.monotonic() + lifetime
+        self.size = size
+
+    @property
+    def fresh(self) -> bool:
+        return time.monotonic() < self.expires
+
+
+class CacheLookup:
+    """The outcome of looking up one request, used to finish the exchange"""
+
+    def __init__(
+        self, cache: "ResponseCache", key: Hashable, entry: Optional[CacheEntry]
+    ) -> None:
+        self.cache = cache
+        self.key = key
+        self.entry = entry
+        # the entry that can be used without sending the request
+        self.hit = entry if entry is not None and entry.fresh else None
+
+    def revalidated(self, response: Response) -> Optional[CacheEntry]:
+        """Return the refreshed entry when the server answered 304"""
+        if self.entry is None or response.status_code != 304:
+            return None
+
+        self.cache.revalidate(self.entry, response)
+        return self.entry
+
+    def store(self, response: Response, value: Any) -> None:
+        self.cache.store(self.key, response, value)
+
+
+class ResponseCache:
+    """In-memory LRU cache of validated responses for idempotent requests
+
+    Responses are kept as long as Cache-Control or Expires allows, or
+    ``default_ttl`` seconds when the server says nothing. Stale entries with
+    an ETag are revalidated with If-None-Match. The least recently used
+    entries are evicted once the cached bodies exceed ``max_bytes``.
+
+    Every lookup counts as a hit or a miss, misses answered with 304 Not
+    Modified also count as a revalidation.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, default_ttl: float = 0.0):
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, request: Request, model: Hashable = None) -> Optional[CacheLookup]:
+        """Look up the request, None when its method is not cacheable
+
+        ``model`` is part of the key: a cache shared by several request
+        models only returns a value to the model that validated it. A stale
+        entry with an ETag gets its If-None-Match header set on the request.
+        """
+        if request.method not in CACHEABLE_METHODS:
+            return None
+
+        key = (model, cache_key(request))
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+            lookup = CacheLookup(self, key, entry)
+
+            if lookup.hit is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        if lookup.hit is None and entry is not None and entry.etag:
+            request.headers["If-None-Match"] = entry.etag
+
+        return lookup
+
+    def store(self, key: Hashable, response: Response, value: Any) -> None:
+        lifetime = freshness_lifetime(response, self.default_ttl)
+        etag = response.headers.get("etag")
+
+        if response.status_code != 200 or lifetime is None:
+            return
+
+        if lifetime <= 0 and not etag:
+            return
+
+        entry = CacheEntry(response, value, lifetime, len(response.content))
+
+        if entry.size > self.max_bytes:
+            return
+
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = entry
+            self.size += entry.size
+            self._evict()
+
+    def revalidate(self, entry: CacheEntry, response: Response) -> None:
+        lifetime = freshness_lifetime(response, self.default_ttl) or 0.0
+
+        with self._lock:
+            self.revalidations += 1
+            entry.expires = time.monotonic() + lifetime
+            entry.etag = response.headers.get("etag", entry.etag)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+
+        if entry is not None:
+            self.size -= entry.size
+
+    def _evict(self) -> None:
+        while self.size > self.max_bytes:
+            _, entry = self._entries.popitem(last=False)
+            self.size -= entry.size
+            self.evictions += 1
@@ -0,0 +1,192 @@
+import threading
+import time
+from collections import deque
+from typing import AbstractSet
+from typing import Any
+from typing import Awaitable
+from typing import Callable
+from typing import Deque
+from typing import Optional
+from typing import Tuple
+from typing import Type
+from typing import Union
+
+from httpx import Request
+from httpx import RequestError
+from httpx import Response
+from httpx import TransportError
+
+from .utils import PerHost
+
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+FAILURE_STATUS_CODES = frozenset({500, 502, 503, 504})
+
+
+class CircuitBreakerOpen(RequestError):
+    """The request was not sent because the circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """Fail fast while an upstream is unhealthy
+
+    The breaker keeps the outcome of the last ``window`` calls. Once at least
+    ``min_calls`` are known and the share of failures reaches
+    ``failure_rate`` it opens, and every call raises CircuitBreakerOpen
+    without sending anything. After ``open_timeout`` seconds it lets
+    ``probes`` calls through: it closes when they all succeed and opens
+    again on the first failure.
+
+    A failure is a response with a status code in ``status_codes`` or one
+    of ``exceptions`` being raised.
+    """
+
+    def __init__(
+        self,
+        failure_rate: float = 0.5,
+        window: int = 20,
+        min_calls: int = 10,
+        open_timeout: float = 30.0,
+        probes: int = 1,
+        status_codes: AbstractSet[int] = FAILURE_STATUS_CODES,
+        exceptions: Tuple[Type[Exception], ...] = (TransportError,),
+    ) -> None:
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.open_timeout = open_timeout
+        self.probes = probes
+        self.status_codes = status_codes
+        self.exceptions = exceptions
+        self.opened = 0
+        self.rejected = 0
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self._probing = 0
+        self._succeeded_probes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def for_request(self, request: Request) -> "CircuitBreaker":
+        return self
+
+    def before(self, request: Request) -> bool:
+        """Raise CircuitBreakerOpen when the request may not be sent
+
+        Returns whether the request is a probe of a half-open breaker.
+        """
+        with self._lock:
+            state = self._current_state()
+
+            if state == CLOSED:
+                return False
+
+            if state == HALF_OPEN and self._probing < self.probes:
+                self._probing += 1
+                return True
+
+            self.rejected += 1
+
+        raise CircuitBreakerOpen(f"circuit breaker is {state}", request=request)
+
+    def record(self, success: Optional[bool], probe: bool = False) -> None:
+        """Record the outcome of a call, None when it tells nothing"""
+        with self._lock:
+            if probe:
+                self._record_probe(success)
+            elif self._state == CLOSED and success is not None:
+                self._outcomes.append(success)
+
+                calls = len(self._outcomes)
+                failures = self._outcomes.count(False)
+                if calls >= self.min_calls and failures >= self.failure_rate * calls:
+                    self._open()
+
+    def call(self, request: Request, send: Callable[[], Response]) -> Response:
+        probe = self.before(request)
+
+        try:
+            response = send()
+        except BaseException as e:
+            self.record(self._success(error=e), probe)
+            raise
+
+        self.record(self._success(response=response), probe)
+        return response
+
+    async def acall(
+        self, request: Request, send: Callable[[], Awaitable[Response]]
+    ) -> Response:
+        probe = self.before(request)
+
+        try:
+            response = await send()
+        except BaseException as e:
+            self.record(self._success(error=e), probe)
+            raise
+
+        self.record(self._success(response=response), probe)
+        return response
+
+    def _success(
+        self,
+        response: Optional[Response] = None,
+        error: Optional[BaseException] = None,
+    ) -> Optional[bool]:
+        if response is not None:
+            return response.status_code not in self.status_codes
+
+        if isinstance(error, self.exceptions):
+            return False
+
+        return None
+
+    def _record_probe(self, success: Optional[bool]) -> None:
+        if self._state != HALF_OPEN:
+            return
+
+        self._probing -= 1
+
+        if success is False:
+            self._open()
+        elif success:
+            self._succeeded_probes += 1
+
+            if self._succeeded_probes >= self.probes:
+                self._close()
+
+    def _current_state(self) -> str:
+        reopen_at = self._opened_at + self.open_timeout
+
+        if self._state == OPEN and time.monotonic() >= reopen_at:
+            self._state = HALF_OPEN
+            self._probing = 0
+            self._succeeded_probes = 0
+
+        return self._state
+
+    def _open(self) -> None:
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self.opened += 1
+
+    def _close(self) -> None:
+        self._state = CLOSED
+        self._outcomes.clear()
+
+
+class HostCircuitBreaker(PerHost[CircuitBreaker]):
+    """A circuit breaker for every host the requests are sent to"""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(lambda: CircuitBreaker(*args, **kwargs))
+
+
+CircuitBreakers = Union[CircuitBreaker, HostCircuitBreaker]
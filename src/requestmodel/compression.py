@@ -0,0 +1,181 @@
+import asyncio
+import gzip
+import threading
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Optional
+
+from httpx import Request
+from httpx import RequestNotRead
+from httpx._decoders import SUPPORTED_DECODERS
+
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+
+def _gzip(data: bytes, level: Optional[int]) -> bytes:
+    # level 6 is the zlib default, gzip.compress defaults to the slow level 9
+    return gzip.compress(data, compresslevel=6 if level is None else level, mtime=0)
+
+
+def _zstd(data: bytes, level: Optional[int]) -> bytes:  # pragma: no cover
+    # compressors are not thread safe, so every body gets its own
+    return bytes(
+        zstandard.ZstdCompressor(level=3 if level is None else level).compress(data)
+    )
+
+
+def _brotli(data: bytes, level: Optional[int]) -> bytes:  # pragma: no cover
+    return bytes(brotli.compress(data, quality=5 if level is None else level))
+
+
+ENCODERS: Dict[str, Callable[[bytes, Optional[int]], bytes]] = {"gzip": _gzip}
+
+if zstandard is not None:  # pragma: no cover
+    ENCODERS["zstd"] = _zstd
+
+if brotli is not None:  # pragma: no cover
+    ENCODERS["br"] = _brotli
+
+
+def accept_encoding() -> str:
+    """The encodings httpx can decode, the best compression first"""
+    preference = ["zstd", "br", "gzip", "deflate"]
+    return ", ".join(name for name in preference if name in SUPPORTED_DECODERS)
+
+
+ACCEPT_ENCODING = accept_encoding()
+
+
+class Compression:
+    """Compress request bodies and negotiate compressed responses
+
+    Bodies of at least ``threshold`` bytes are compressed with ``encoding``
+    (``gzip``, or ``zstd`` and ``br`` when zstandard or brotli is installed)
+    at ``level``, the encoder default when None. Streamed bodies and bodies
+    that already have a Content-Encoding are sent as they are.
+
+    ``accept`` is sent as Accept-Encoding, by default every encoding httpx
+    can decode, None leaves the header alone. Responses are decoded while
+    they are read, before validation.
+
+    ``asend`` compresses bodies of at least ``offload_threshold`` bytes in
+    the default executor, so the event loop is not blocked.
+    """
+
+    def __init__(
+        self,
+        encoding: str = "gzip",
+        level: Optional[int] = None,
+        threshold: int = 1024,
+        offload_threshold: int = 256 * 1024,
+        accept: Optional[str] = ACCEPT_ENCODING,
+    ) -> None:
+        if encoding not in ENCODERS:
+            raise ValueError(
+                f"{encoding} compression is not available, "
+                f"choose from {', '.join(sorted(ENCODERS))}"
+            )
+
+        self.encoding = encoding
+        self.level = level
+        self.threshold = threshold
+        self.offload_threshold = offload_threshold
+        self.accept = accept
+        self.compressed = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._lock = threading.Lock()
+
+    def encode(self, data: bytes) -> bytes:
+        compressed = ENCODERS[self.encoding](data, self.level)
+
+        with self._lock:
+            self.compressed += 1
+            self.bytes_in += len(data)
+            self.bytes_out += len(compressed)
+
+        return compressed
+
+    def body(self, request: Any) -> Optional[bytes]:
+        """The body to compress, None when it should be sent as it is"""
+        if "content-encoding" in request.headers:
+            return None
+
+        try:
+            content = request.content if isinstance(request, Request) else request.body
+        except RequestNotRead:
+            # a streaming body
+            return None
+
+        if isinstance(content, str):
+            content = content.encode()
+
+        if not isinstance(content, bytes) or len(content) < self.threshold:
+            return None
+
+        return content
+
+    def compress(self, request: Request) -> Request:
+        """Return the request with a compressed body and Accept-Encoding"""
+        self.negotiate(request)
+        data = self.body(request)
+
+        if data is None:
+            return request
+
+        return self.replace(request, self.encode(data))
+
+    async def acompress(self, request: Request) -> Request:
+        """Compress like compress, large bodies in the default executor"""
+        self.negotiate(request)
+        data = self.body(request)
+
+        if data is None:
+            return request
+
+        if len(data) < self.offload_threshold:
+            return self.replace(request, self.encode(data))
+
+        loop = asyncio.get_running_loop()
+        return self.replace(
+            request, await loop.run_in_executor(None, self.encode, data)
+        )
+
+    def compress_prepared(self, request: Any) -> None:
+        """Compress a prepared request of the requests library in place"""
+        self.negotiate(request)
+        data = self.body(request)
+
+        if data is None:
+            return
+
+        request.body = self.encode(data)
+        request.headers["Content-Encoding"] = self.encoding
+        request.headers["Content-Length"] = str(len(request.body))
+
+    def negotiate(self, request: Any) -> None:
+        if self.accept is not None:
+            request.headers["Accept-Encoding"] = self.accept
+
+    def replace(self, request: Request, content: bytes) -> Request:
+        headers = request.headers.copy()
+        headers["Content-Encoding"] = self.encoding
+        headers.pop("Content-Length", None)
+
+        return Request(
+            request.method,
+            request.url,
+            headers=headers,
+            content=content,
+            extensions=request.extensions,
+        )
@@ -0,0 +1,123 @@
+import asyncio
+import time
+from collections import deque
+from typing import AbstractSet
+from typing import Awaitable
+from typing import Callable
+from typing import Deque
+from typing import Optional
+
+from httpx import Response
+from httpx import TimeoutException
+
+
+DROP_STATUS_CODES = frozenset({429, 503})
+
+
+class AdaptiveLimiter:
+    """Limit the requests in flight, adapting the limit to the upstream
+
+    The limit grows by one per window of successful requests (additive
+    increase) as long as the window is being used. It is multiplied by
+    ``backoff`` (multiplicative decrease) when a request is dropped: a
+    status code in ``status_codes``, a timeout, or a latency above
+    ``tolerance`` times the smoothed latency. Requests that started before
+    the last decrease do not cut the limit again.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 10,
+        min_limit: int = 1,
+        max_limit: int = 200,
+        backoff: float = 0.5,
+        tolerance: float = 2.0,
+        smoothing: float = 0.05,
+        status_codes: AbstractSet[int] = DROP_STATUS_CODES,
+    ) -> None:
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.status_codes = status_codes
+        self.in_flight = 0
+        self.latency: Optional[float] = None
+        self.drops = 0
+        self._limit = float(initial_limit)
+        self._decreased_at = 0.0
+        self._waiters: "Deque[asyncio.Future[None]]" = deque()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    async def acquire(self) -> None:
+        """Wait for a free slot, waiters are served in order"""
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # the slot was handed over just before the cancellation
+                self.release()
+            raise
+
+    def release(self) -> None:
+        """Free a slot without a sample, for requests that were not measured"""
+        self.in_flight -= 1
+        self._wake()
+
+    def sample(self, started: float, latency: float, dropped: bool = False) -> None:
+        """Free the slot of a request and adapt the limit to its outcome"""
+        in_flight = self.in_flight
+        spike = self.latency is not None and latency > self.latency * self.tolerance
+
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency += (latency - self.latency) * self.smoothing
+
+        if dropped or spike:
+            self.drops += 1
+
+            if started >= self._decreased_at:
+                self._limit = max(self.min_limit, self._limit * self.backoff)
+                self._decreased_at = time.monotonic()
+
+        elif in_flight * 2 >= self._limit:
+            self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+
+        self.release()
+
+    async def acall(self, send: Callable[[], Awaitable[Response]]) -> Response:
+        """Await send within a slot and learn from the response"""
+        await self.acquire()
+        started = time.monotonic()
+
+        try:
+            response = await send()
+        except TimeoutException:
+            self.sample(started, time.monotonic() - started, dropped=True)
+            raise
+        except BaseException:
+            self.release()
+            raise
+
+        dropped = response.status_code in self.status_codes
+        self.sample(started, time.monotonic() - started, dropped)
+        return response
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_flight < self.limit:
+            waiter = self._waiters.popleft()
+
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
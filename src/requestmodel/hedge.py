@@ -0,0 +1,134 @@
+import asyncio
+import time
+from collections import deque
+from typing import AbstractSet
+from typing import Awaitable
+from typing import Callable
+from typing import Deque
+from typing import Optional
+from typing import Sequence
+
+from httpx import Request
+from httpx import Response
+
+from .retry import IDEMPOTENT_METHODS
+from .retry import replayable
+
+
+# latencies needed before a percentile delay is trusted
+MIN_SAMPLES = 10
+
+
+async def _first_success(
+    tasks: "Sequence[asyncio.Future[Response]]",
+) -> "asyncio.Future[Response]":
+    pending = set(tasks)
+
+    while True:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+
+        for task in done:
+            if task.exception() is None:
+                return task
+
+        if not pending:
+            return task
+
+
+async def _discard(
+    tasks: "Sequence[asyncio.Future[Response]]",
+    winner: "Optional[asyncio.Future[Response]]",
+) -> None:
+    cancelled = []
+
+    for task in tasks:
+        if task is winner:
+            continue
+
+        if not task.done():
+            task.cancel()
+            cancelled.append(task)
+        elif not task.cancelled() and task.exception() is None:
+            await task.result().aclose()
+
+    # let the losers release their connection before returning
+    if cancelled:
+        await asyncio.wait(cancelled)
+
+
+class Hedge:
+    """Send a duplicate request when the first one is slow
+
+    When no response arrived after ``delay`` seconds, or the ``percentile``
+    of the recent latencies when no delay is given, the request is sent a
+    second time. The first successful response wins and the other request
+    is cancelled. At most ``max_rate`` of the requests are hedged.
+
+    Only idempotent requests with a body that can be sent again are hedged.
+    """
+
+    def __init__(
+        self,
+        delay: Optional[float] = None,
+        percentile: float = 95.0,
+        window: int = 100,
+        max_rate: float = 0.05,
+        methods: AbstractSet[str] = IDEMPOTENT_METHODS,
+    ) -> None:
+        self.delay = delay
+        self.percentile = percentile
+        self.max_rate = max_rate
+        self.methods = methods
+        self.requests = 0
+        self.issued = 0
+        self.won = 0
+        self._latencies: Deque[float] = deque(maxlen=window)
+
+    def hedgeable(self, request: Request) -> bool:
+        return request.method in self.methods and replayable(request)
+
+    def observe(self, latency: float) -> None:
+        self._latencies.append(latency)
+
+    def delay_for(self) -> Optional[float]:
+        """Return the seconds to wait before hedging, None to never hedge"""
+        if self.delay is not None:
+            return self.delay
+
+        if len(self._latencies) < MIN_SAMPLES:
+            return None
+
+        latencies = sorted(self._latencies)
+        return latencies[int(self.percentile / 100 * (len(latencies) - 1))]
+
+    async def acall(
+        self, request: Request, send: Callable[[], Awaitable[Response]]
+    ) -> Response:
+        """Await send, hedged with a second call when it is slow"""
+        if not self.hedgeable(request):
+            return await send()
+
+        self.requests += 1
+        started = time.monotonic()
+        delay = self.delay_for()
+        tasks = [asyncio.ensure_future(send())]
+        winner = None
+
+        try:
+            if delay is not None:
+                await asyncio.wait(tasks, timeout=delay)
+
+                if not tasks[0].done() and self.issued < self.max_rate * self.requests:
+                    self.issued += 1
+                    tasks.append(asyncio.ensure_future(send()))
+
+            winner = await _first_success(tasks)
+            response = winner.result()
+        finally:
+            await _discard(tasks, winner)
+
+        if winner is not tasks[0]:
+            self.won += 1
+
+        self.observe(time.monotonic() - started)
+        return response
@@ -0,0 +1,219 @@
+import logging
+import time
+from contextlib import contextmanager
+from contextlib import nullcontext
+from typing import Any
+from typing import ContextManager
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Protocol
+from typing import Type
+
+from httpx import RequestNotRead
+from httpx import ResponseNotRead
+
+
+BUILD = "build"
+SEND = "send"
+VALIDATE = "validate"
+
+LOGGER = logging.getLogger("requestmodel")
+
+# what a model uses when nothing is instrumented, reentrant and shared
+NO_PHASE: ContextManager[None] = nullcontext()
+
+
+def content_length(message: Any) -> Optional[int]:
+    """Size of the body of an httpx or requests request or response"""
+    if message is None:
+        return None
+
+    length = message.headers.get("content-length")
+
+    if length is not None and length.isdigit():
+        return int(length)
+
+    try:
+        content = getattr(message, "content", None)
+    except (RequestNotRead, ResponseNotRead):
+        # a streaming body, its size is not known up front
+        return None
+
+    if content is None:
+        content = getattr(message, "body", None)
+
+    return len(content) if content is not None else 0
+
+
+class PhaseEvent:
+    """One phase of sending a request model: build, send or validate
+
+    ``request`` and ``response`` are set as soon as they are known, the
+    duration and error are set when the phase ends.
+    """
+
+    def __init__(
+        self,
+        phase: str,
+        model: Type[Any],
+        method: str,
+        url: str,
+        request: Any = None,
+        response: Any = None,
+    ) -> None:
+        self.phase = phase
+        self.model = model
+        self.method = method
+        self.url = url
+        self.request = request
+        self.response = response
+        self.duration: Optional[float] = None
+        self.error: Optional[BaseException] = None
+        # the number of times the request was sent, retries included
+        self.attempts = 0
+        # free for the instrumentation to keep state between start and end
+        self.context: Any = None
+
+    @property
+    def status_code(self) -> Optional[int]:
+        return getattr(self.response, "status_code", None)
+
+    @property
+    def bytes_out(self) -> Optional[int]:
+        return content_length(self.request)
+
+    @property
+    def bytes_in(self) -> Optional[int]:
+        return content_length(self.response)
+
+
+class Instrumentation:
+    """Receive the start and end of every phase, override what you need"""
+
+    def phase_start(self, event: PhaseEvent) -> None:
+        pass
+
+    def phase_end(self, event: PhaseEvent) -> None:
+        pass
+
+    @contextmanager
+    def phase(
+        self, name: str, model: Any, request: Any = None, response: Any = None
+    ) -> Iterator[PhaseEvent]:
+        event = PhaseEvent(name, type(model), model.method, model.url)
+        event.request = request
+        event.response = response
+
+        self.phase_start(event)
+        started = time.perf_counter()
+
+        try:
+            yield event
+        except BaseException as e:
+            event.error = e
+            raise
+        finally:
+            event.duration = time.perf_counter() - started
+            self.phase_end(event)
+
+
+class Instrumentations(Instrumentation):
+    """Forward every phase to several instrumentations
+
+    Phases start in the given order and end in reverse, like nested context
+    managers. Every instrumentation sees its own ``event.context``.
+    """
+
+    def __init__(self, *instrumentations: Instrumentation) -> None:
+        self.instrumentations = instrumentations
+
+    def phase_start(self, event: PhaseEvent) -> None:
+        contexts: List[Any] = []
+
+        for instrumentation in self.instrumentations:
+            event.context = None
+            instrumentation.phase_start(event)
+            contexts.append(event.context)
+
+        event.context = contexts
+
+    def phase_end(self, event: PhaseEvent) -> None:
+        started = list(zip(self.instrumentations, event.context))
+
+        for instrumentation, context in reversed(started):
+            event.context = context
+            instrumentation.phase_end(event)
+
+
+class SlowRequestLogger(Instrumentation):
+    """Log every phase that takes at least ``threshold`` seconds"""
+
+    def __init__(
+        self,
+        threshold: float = 1.0,
+        logger: logging.Logger = LOGGER,
+        level: int = logging.WARNING,
+    ) -> None:
+        self.threshold = threshold
+        self.logger = logger
+        self.level = level
+
+    def phase_end(self, event: PhaseEvent) -> None:
+        if event.duration is None or event.duration < self.threshold:
+            return
+
+        self.logger.log(
+            self.level,
+            "%s %s %s: %s took %.3fs (status %s)",
+            event.model.__name__,
+            event.method,
+            event.url,
+            event.phase,
+            event.duration,
+            event.status_code,
+        )
+
+
+class Span(Protocol):  # pragma: no cover
+    def set_attribute(self, key: str, value: Any) -> None: ...  # noqa: E704
+
+    def record_exception(self, exception: BaseException) -> None: ...  # noqa: E704
+
+    def end(self) -> None: ...  # noqa: E704
+
+
+class Tracer(Protocol):  # pragma: no cover
+    def start_span(self, name: str) -> Span: ...  # noqa: E704
+
+
+class TracingInstrumentation(Instrumentation):
+    """Record every phase as a span, an OpenTelemetry tracer can be used"""
+
+    def __init__(self, tracer: Tracer) -> None:
+        self.tracer = tracer
+
+    def phase_start(self, event: PhaseEvent) -> None:
+        span = self.tracer.start_span(f"{event.model.__name__} {event.phase}")
+        span.set_attribute("requestmodel.model", event.model.__qualname__)
+        span.set_attribute("requestmodel.phase", event.phase)
+        span.set_attribute("http.request.method", event.method)
+        span.set_attribute("url.template", event.url)
+        event.context = span
+
+    def phase_end(self, event: PhaseEvent) -> None:
+        span: Span = event.context
+        attributes = {
+            "http.response.status_code": event.status_code,
+            "http.request.body.size": event.bytes_out,
+            "http.response.body.size": event.bytes_in,
+        }
+
+        for key, value in attributes.items():
+            if value is not None:
+                span.set_attribute(key, value)
+
+        if event.error is not None:
+            span.record_exception(event.error)
+
+        span.end()
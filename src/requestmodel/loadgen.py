@@ -0,0 +1,335 @@
+"""Drive a request model at a target rate or concurrency.
+
+Usage::
+
+    python -m requestmodel.loadgen myservice.requests:LookupRequest \\
+        --base-url https://api.example.com --params lookups.jsonl \\
+        --rate 200 --duration 60
+
+Every line of the ``--params`` file holds the keyword arguments of one model
+instance, the lines are used round robin. ``--params-factory`` names a
+callable that returns an iterable of them instead.
+
+With ``--rate`` requests are started on a fixed schedule, whether or not the
+earlier ones finished (open loop). Latency is measured from the scheduled
+start, so a slow upstream can not hide its queueing delay (coordinated
+omission). With only ``--concurrency`` every worker sends its next request
+as soon as the previous one finished (closed loop).
+"""
+
+import argparse
+import asyncio
+import importlib
+import itertools
+import json
+import sys
+from typing import Any
+from typing import Awaitable
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Set
+from typing import TextIO
+from typing import Tuple
+
+from httpx import AsyncClient
+from httpx import HTTPStatusError
+from httpx import Timeout
+
+from .model import RequestModel
+
+
+Params = Dict[str, Any]
+
+
+def import_object(path: str) -> Any:
+    """Import ``package.module:name`` or ``package.module.name``"""
+    if ":" in path:
+        module_name, _, name = path.partition(":")
+    else:
+        module_name, _, name = path.rpartition(".")
+
+    module = importlib.import_module(module_name)
+
+    obj = module
+    for attribute in name.split("."):
+        obj = getattr(obj, attribute)
+
+    return obj
+
+
+def load_params(path: str) -> List[Params]:
+    """Read the keyword arguments from a JSON lines file"""
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def repeat(params: Iterable[Params]) -> Iterator[Params]:
+    """Cycle through a list, iterators end the run when they are exhausted"""
+    if isinstance(params, Sequence):
+        return itertools.cycle(params)
+
+    return iter(params)
+
+
+def percentile(latencies: List[float], p: float) -> float:
+    """The nearest-rank percentile of sorted latencies"""
+    if not latencies:
+        return 0.0
+
+    return latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))]
+
+
+def error_name(error: BaseException) -> str:
+    if isinstance(error, HTTPStatusError):
+        return f"HTTP {error.response.status_code}"
+
+    return type(error).__name__
+
+
+class LoadStats:
+    """Latencies and errors, in total and since the last report"""
+
+    def __init__(self) -> None:
+        self.latencies: List[float] = []
+        self.errors: Dict[str, int] = {}
+        self.started = 0
+        self._interval: List[float] = []
+        self._interval_errors = 0
+
+    @property
+    def completed(self) -> int:
+        return len(self.latencies) + sum(self.errors.values())
+
+    def record(self, latency: float, error: Optional[BaseException] = None) -> None:
+        if error is not None:
+            name = error_name(error)
+            self.errors[name] = self.errors.get(name, 0) + 1
+            self._interval_errors += 1
+        else:
+            self.latencies.append(latency)
+            self._interval.append(latency)
+
+    def interval(self) -> Tuple[List[float], int]:
+        """Return and reset the latencies and error count since the last call"""
+        latencies, errors = sorted(self._interval), self._interval_errors
+        self._interval = []
+        self._interval_errors = 0
+        return latencies, errors
+
+
+def format_latencies(latencies: List[float]) -> str:
+    return "  ".join(
+        f"p{p} {percentile(latencies, p) * 1e3:7.1f} ms" for p in (50, 95, 99)
+    )
+
+
+async def send_one(
+    send: Callable[[Params], Awaitable[Any]],
+    params: Params,
+    scheduled: float,
+    stats: LoadStats,
+) -> None:
+    loop = asyncio.get_running_loop()
+    stats.started += 1
+
+    try:
+        await send(params)
+    except Exception as e:
+        stats.record(loop.time() - scheduled, e)
+    else:
+        stats.record(loop.time() - scheduled)
+
+
+async def open_loop(
+    send: Callable[[Params], Awaitable[Any]],
+    params: Iterator[Params],
+    stats: LoadStats,
+    rate: float,
+    duration: float,
+) -> None:
+    """Start ``rate`` requests per second on schedule for ``duration`` seconds"""
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    tasks: "Set[asyncio.Future[None]]" = set()
+
+    for i, kwargs in enumerate(params):
+        if i / rate >= duration:
+            break
+
+        scheduled = start + i / rate
+
+        delay = scheduled - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        task = asyncio.ensure_future(send_one(send, kwargs, scheduled, stats))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    if tasks:
+        await asyncio.wait(tasks)
+
+
+async def closed_loop(
+    send: Callable[[Params], Awaitable[Any]],
+    params: Iterator[Params],
+    stats: LoadStats,
+    concurrency: int,
+    duration: float,
+) -> None:
+    """Keep ``concurrency`` requests in flight for ``duration`` seconds"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + duration
+
+    async def worker() -> None:
+        for kwargs in params:
+            if loop.time() >= deadline:
+                break
+
+            await send_one(send, kwargs, loop.time(), stats)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+async def report(stats: LoadStats, interval: float, out: TextIO) -> None:
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+
+    while True:
+        await asyncio.sleep(interval)
+        latencies, errors = stats.interval()
+        rate = (len(latencies) + errors) / interval
+
+        in_flight = stats.started - stats.completed
+
+        print(
+            f"{loop.time() - start:6.1f}s  {rate:8.1f} req/s  in flight {in_flight:<5}"
+            f"  errors {errors:<5}  {format_latencies(latencies)}",
+            file=out,
+        )
+
+
+def summary(stats: LoadStats, elapsed: float, out: TextIO) -> None:
+    latencies = sorted(stats.latencies)
+    completed = stats.completed
+    failed = completed - len(latencies)
+
+    print(f"\nrequests   {completed} in {elapsed:.1f}s", file=out)
+    print(f"throughput {completed / elapsed:.1f} req/s", file=out)
+    print(f"errors     {failed} ({failed / max(completed, 1):.2%})", file=out)
+
+    for name, count in sorted(stats.errors.items()):
+        print(f"  {name:<20} {count}", file=out)
+
+    if latencies:
+        print(f"latency    {format_latencies(latencies)}", file=out)
+        print(f"           max {latencies[-1] * 1e3:.1f} ms", file=out)
+
+
+async def run(
+    model: Callable[..., RequestModel[Any]],
+    params: Iterable[Params],
+    client: AsyncClient,
+    duration: float,
+    rate: Optional[float] = None,
+    concurrency: int = 1,
+    interval: float = 1.0,
+    out: Optional[TextIO] = None,
+) -> LoadStats:
+    """Send the model with the params until ``duration`` seconds passed
+
+    The requests are started at ``rate`` per second when given, with at most
+    ``concurrency`` in flight otherwise. A list of params is used round robin,
+    other iterables end the run early when they run out.
+    """
+    stats = LoadStats()
+    loop = asyncio.get_running_loop()
+    # looked up now, so redirecting stdout after the import still works
+    out = sys.stdout if out is None else out
+
+    async def send(kwargs: Params) -> Any:
+        return await model(**kwargs).asend(client)
+
+    reporter = asyncio.ensure_future(report(stats, interval, out))
+    start = loop.time()
+
+    try:
+        if rate is not None:
+            await open_loop(send, repeat(params), stats, rate, duration)
+        else:
+            await closed_loop(send, repeat(params), stats, concurrency, duration)
+    finally:
+        reporter.cancel()
+
+    summary(stats, loop.time() - start, out)
+    return stats
+
+
+def parse_header(value: str) -> Tuple[str, str]:
+    name, sep, header = value.partition(":")
+
+    if not sep:
+        raise argparse.ArgumentTypeError("expected NAME:VALUE")
+
+    return name.strip(), header.strip()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m requestmodel.loadgen",
+        description=__doc__.splitlines()[0],
+    )
+    parser.add_argument("model", help="dotted path of the request model")
+    parser.add_argument("--base-url", default="", help="base url of the client")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--params", help="JSON lines file with model arguments")
+    source.add_argument(
+        "--params-factory", help="dotted path of a callable returning arguments"
+    )
+    parser.add_argument("--rate", type=float, help="requests per second (open loop)")
+    parser.add_argument(
+        "--concurrency", type=int, default=1, help="requests in flight (closed loop)"
+    )
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--interval", type=float, default=1.0, help="report every")
+    parser.add_argument("--timeout", type=float, default=30.0, help="per request")
+    parser.add_argument(
+        "--header", type=parse_header, action="append", default=[], help="NAME:VALUE"
+    )
+    args = parser.parse_args(argv)
+
+    model = import_object(args.model)
+
+    params: Iterable[Params] = [{}]
+    if args.params is not None:
+        params = load_params(args.params)
+    elif args.params_factory is not None:
+        params = import_object(args.params_factory)()
+
+    async def start() -> LoadStats:
+        async with AsyncClient(
+            base_url=args.base_url,
+            headers=dict(args.header),
+            timeout=Timeout(args.timeout),
+        ) as client:
+            return await run(
+                model,
+                params,
+                client,
+                args.duration,
+                rate=args.rate,
+                concurrency=args.concurrency,
+                interval=args.interval,
+            )
+
+    asyncio.run(start())
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    sys.exit(main())
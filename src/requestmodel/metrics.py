@@ -0,0 +1,240 @@
+import math
+import threading
+from bisect import bisect_left
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Sequence
+from typing import Tuple
+from typing import Union
+
+from .instrumentation import SEND
+from .instrumentation import VALIDATE
+from .instrumentation import Instrumentation
+from .instrumentation import PhaseEvent
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = tuple(float(4**n) for n in range(4, 13))
+
+Labels = Tuple[str, ...]
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf"
+
+    return str(int(value)) if value == int(value) else repr(value)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = value.replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+        pairs.append(f'{name}="{escaped}"')
+
+    return "{" + ",".join(pairs) + "}"
+
+
+class Counter:
+    """A value per label combination that only goes up"""
+
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def samples(self) -> Iterator[Tuple[str, Labels, Labels, float]]:
+        with self._lock:
+            values = list(self._values.items())
+
+        for labels, value in sorted(values):
+            yield self.name, self.labelnames, labels, value
+
+
+class Histogram:
+    """Observations counted in fixed buckets, per label combination
+
+    Only the bucket an observation falls in is counted, the cumulative
+    counts Prometheus expects are computed when rendering.
+    """
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # the bucket counts followed by the sum of the observations
+        self._values: Dict[Labels, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self.buckets, value)
+
+        with self._lock:
+            counts = self._values.get(labels)
+
+            if counts is None:
+                counts = self._values[labels] = [0.0] * (len(self.buckets) + 1)
+
+            counts[index] += 1
+            counts[-1] += value
+
+    def count(self, *labels: str) -> float:
+        return sum(self._values.get(labels, [0.0])[:-1])
+
+    def samples(self) -> Iterator[Tuple[str, Labels, Labels, float]]:
+        with self._lock:
+            values = [(labels, list(counts)) for labels, counts in self._values.items()]
+
+        names = self.labelnames + ("le",)
+
+        for labels, counts in sorted(values):
+            total = 0.0
+
+            for bound, count in zip(self.buckets, counts):
+                total += count
+                le = _format_value(bound)
+                yield f"{self.name}_bucket", names, labels + (le,), total
+
+            yield f"{self.name}_sum", self.labelnames, labels, counts[-1]
+            yield f"{self.name}_count", self.labelnames, labels, total
+
+
+Metric = Union[Counter, Histogram]
+
+
+class MetricsRegistry:
+    """A set of metrics that can be rendered for Prometheus to scrape"""
+
+    def __init__(self) -> None:
+        self.metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        with self._lock:
+            metric = self.metrics.setdefault(name, Counter(name, help, labelnames))
+
+        if not isinstance(metric, Counter):
+            raise ValueError(f"{name} is already registered as a {metric.type}")
+
+        return metric
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        with self._lock:
+            metric = self.metrics.setdefault(
+                name, Histogram(name, help, labelnames, buckets)
+            )
+
+        if not isinstance(metric, Histogram):
+            raise ValueError(f"{name} is already registered as a {metric.type}")
+
+        return metric
+
+    def render(self) -> str:
+        """Render the metrics in the Prometheus text exposition format"""
+        lines = []
+
+        for metric in list(self.metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+
+            for name, labelnames, labels, value in metric.samples():
+                rendered = _format_labels(labelnames, labels)
+                lines.append(f"{name}{rendered} {_format_value(value)}")
+
+        return "\n".join(lines) + "\n"
+
+
+# used by MetricsInstrumentation when it does not get a registry of its own
+REGISTRY = MetricsRegistry()
+
+
+class MetricsInstrumentation(Instrumentation):
+    """Aggregate the phases of every request model in a registry"""
+
+    def __init__(self, registry: MetricsRegistry = REGISTRY) -> None:
+        self.registry = registry
+        self.requests = registry.counter(
+            "requestmodel_requests_total",
+            "Responses received by status code",
+            ("model", "method", "status_code"),
+        )
+        self.retries = registry.counter(
+            "requestmodel_retries_total", "Attempts after the first", ("model",)
+        )
+        self.errors = registry.counter(
+            "requestmodel_errors_total",
+            "Exceptions raised while sending or validating",
+            ("model", "phase", "error"),
+        )
+        self.latency = registry.histogram(
+            "requestmodel_request_duration_seconds",
+            "Time from sending the request until the response, retries included",
+            ("model",),
+        )
+        self.validation = registry.histogram(
+            "requestmodel_validation_duration_seconds",
+            "Time to check the status and validate the response",
+            ("model",),
+        )
+        self.size = registry.histogram(
+            "requestmodel_response_size_bytes",
+            "Size of the response bodies",
+            ("model",),
+            SIZE_BUCKETS,
+        )
+
+    def phase_end(self, event: PhaseEvent) -> None:
+        model = event.model.__qualname__
+
+        if event.error is not None:
+            self.errors.inc(model, event.phase, type(event.error).__name__)
+
+        if event.duration is None:  # pragma: no cover
+            return
+
+        if event.phase == SEND:
+            self.latency.observe(event.duration, model)
+
+            if event.attempts > 1:
+                self.retries.inc(model, amount=event.attempts - 1)
+
+            if event.response is not None:
+                status_code = str(event.status_code)
+                self.requests.inc(model, event.method, status_code)
+
+                size = event.bytes_in
+                if size is not None:
+                    self.size.observe(size, model)
+
+        elif event.phase == VALIDATE:
+            self.validation.observe(event.duration, model)
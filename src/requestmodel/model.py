@@ -1,10 +1,18 @@
+import asyncio
 from typing import Any
+from typing import AsyncGenerator
+from typing import Awaitable
 from typing import ClassVar
+from typing import ContextManager
+from typing import Dict
+from typing import Generator
 from typing import Generic
+from typing import Iterable
 from typing import Iterator
 from typing import Optional
 from typing import Protocol
 from typing import Set
+from typing import Tuple
 from typing import Type
 
 from httpx import AsyncClient
@@ -14,18 +22,45 @@ from httpx import Response
 from httpx._client import BaseClient
 from pydantic import BaseModel
 from pydantic import ConfigDict
+from pydantic import Field
 from pydantic import TypeAdapter
 from pydantic._internal._model_construction import ModelMetaclass
-from typing_extensions import get_type_hints
+from pydantic_core import to_json
 from typing_extensions import override
 
 from . import params
-from .fastapi import get_path_param_names
-from .fastapi import jsonable_encoder
+from .cache import CACHEABLE_METHODS
+from .cache import CacheEntry
+from .cache import CacheLookup
+from .cache import ResponseCache
+from .cache import cache_key
+from .circuitbreaker import CircuitBreakers
+from .compression import Compression
+from .concurrency import AdaptiveLimiter
+from .hedge import Hedge
+from .instrumentation import BUILD
+from .instrumentation import NO_PHASE
+from .instrumentation import SEND
+from .instrumentation import VALIDATE
+from .instrumentation import Instrumentation
+from .instrumentation import PhaseEvent
+from .plan import FieldPlan
+from .plan import RequestPlan
+from .plan import get_request_plan
+from .ratelimit import RateLimiter
+from .retry import Retry
+from .singleflight import SingleFlight
+from .streaming import BodyEncoder
+from .streaming import ItemScanner
+from .streaming import JSONArrayScanner
+from .streaming import NDJSONScanner
+from .streaming import SSEScanner
 from .typing import RequestArgs
 from .typing import ResponseType
+from .typing import StreamContent
+from .upload import FileUpload
 from .utils import flatten_body
-from .utils import get_annotated_type
+from .utils import json_member_value
 from .utils import unify_body
 
 
@@ -42,10 +77,45 @@ class BaseRequestModel(BaseModel, Generic[ResponseType]):
 
     response_model: ClassVar[Type[ResponseType]]  # type: ignore[misc]
 
+    # validate response.content directly, response.json() is the fallback
+    validate_json_bytes: ClassVar[bool] = True
+    # send JSON bodies as bytes from json_body() instead of a dict
+    encode_json_body: ClassVar[bool] = False
+    # receives the start and end of the build, send and validate phases
+    instrumentation: ClassVar[Optional[Instrumentation]] = None
+    # compress request bodies and negotiate compressed responses
+    compression: ClassVar[Optional[Compression]] = None
+
+    def phase(
+        self, name: str, request: Any = None, response: Any = None
+    ) -> ContextManager[Optional[PhaseEvent]]:
+        """Time a phase of sending this model, a no-op without instrumentation"""
+        if self.instrumentation is None:
+            return NO_PHASE
+
+        return self.instrumentation.phase(name, self, request, response)
+
+    @classmethod
+    def request_plan(cls) -> RequestPlan:
+        """The field layout of this model, resolved once per class"""
+        return get_request_plan(cls)
+
     def get_path_param_names(self) -> Set[str]:
-        return get_path_param_names(self.url)
+        return set(self.request_plan().path_param_names)
+
+    def request_args_for_values(self, include_body: bool = True) -> RequestArgs:
+        plan = self.request_plan()
+
+        return self.request_args_for_fields(
+            plan.fields if include_body else plan.param_fields
+        )
 
-    def request_args_for_values(self) -> RequestArgs:
+    def body_for_values(self) -> Dict[str, Any]:
+        body_fields = self.request_plan().body_fields
+
+        return self.request_args_for_fields(body_fields)[params.Body]
+
+    def request_args_for_fields(self, fields: Iterable[FieldPlan]) -> RequestArgs:
         request_args: RequestArgs = {
             params.Query: {},
             params.Path: {},
@@ -55,45 +125,132 @@ class BaseRequestModel(BaseModel, Generic[ResponseType]):
             params.Body: {},
         }
 
-        # we exclude unset properties from the request
-        values = jsonable_encoder(self, exclude_unset=True)
-        path_param_names = self.get_path_param_names()
+        values = self.dump_values(fields)
 
-        for key, field in get_type_hints(self.__class__, include_extras=True).items():
-            if getattr(field, "__origin__", None) is ClassVar:
+        for field in fields:
+            if field.dump_key not in values:
                 continue
 
-            annotated_property = get_annotated_type(key, field, path_param_names)
+            value = values[field.dump_key]
+
+            if isinstance(field.param, params.Body):
+                unify_body(field.param, field.name, request_args, value)
+            else:
+                request_args[field.kind][field.name] = value
+
+        flatten_body(request_args)
+
+        return request_args
 
-            if annotated_property.exclude:
+    def sent_keys(self, fields: Iterable[FieldPlan]) -> Tuple[Set[str], Set[str]]:
+        """Split the fields into set fields and unset fields with a default
+
+        Unset fields with a None default are not sent at all.
+        """
+        fields_set = self.model_fields_set
+        set_keys = set()
+        default_keys = set()
+
+        for field in fields:
+            if field.key in fields_set:
+                set_keys.add(field.key)
+            elif getattr(self, field.key, None) is not None:
+                default_keys.add(field.key)
+
+        return set_keys, default_keys
+
+    def dump_values(self, fields: Iterable[FieldPlan]) -> Dict[str, Any]:
+        """Serialize the fields to JSON compatible values in a single pass
+
+        Set fields are dumped without their unset nested values, file
+        uploads are passed on as they are.
+        """
+        set_keys, default_keys = self.sent_keys(fields)
+        uploads: Dict[str, Any] = {}
+
+        for field in fields:
+            if field.kind is not params.File:
                 continue
 
-            if key in values:
-                value = values[key]
-            else:
-                if getattr(self, key, None) is not None:
-                    value = jsonable_encoder(getattr(self, key))
-                else:
-                    continue
+            value = getattr(self, field.key, None)
+
+            if isinstance(value, FileUpload):
+                uploads[field.dump_key] = value
+                set_keys.discard(field.key)
+                default_keys.discard(field.key)
 
-            attr_name = annotated_property.alias or key
+        values: Dict[str, Any] = {}
 
-            if (
-                isinstance(annotated_property, params.Header)
-                and annotated_property.convert_underscores
-            ):
-                attr_name = attr_name.replace("_", "-")
+        if set_keys:
+            values = self.model_dump(
+                mode="json", by_alias=True, include=set_keys, exclude_unset=True
+            )
 
-            if isinstance(annotated_property, params.Body):
-                unify_body(annotated_property, attr_name, request_args, value)
+        if default_keys:
+            values.update(
+                self.model_dump(mode="json", by_alias=True, include=default_keys)
+            )
+
+        values.update(uploads)
+
+        return values
+
+    def json_body(self) -> bytes:
+        """Serialize the body fields straight to JSON bytes with pydantic-core
+
+        The embed and flatten rules are the same as unify_body.
+        """
+        fields = self.request_plan().body_fields
+        set_keys, default_keys = self.sent_keys(fields)
+        members = []
+
+        for field in fields:
+            if field.key not in set_keys and field.key not in default_keys:
+                continue
+
+            document = self.__pydantic_serializer__.to_json(
+                self,
+                include={field.key},
+                by_alias=True,
+                exclude_unset=field.key in set_keys,
+            )
+            value = json_member_value(document, field.dump_key)
+
+            if value.startswith(b"{") and not field.embed:
+                # the members of an object are merged into the top level
+                if value != b"{}":
+                    members.append(value[1:-1])
             else:
-                request_args[type(annotated_property)][attr_name] = value
+                members.append(to_json(field.name) + b":" + value)
 
-        flatten_body(request_args)
+        return b"{" + b",".join(members) + b"}"
 
-        return request_args
+    def stream_body(self) -> Optional[Tuple[str, StreamContent]]:
+        """The content type and the chunks of the StreamBody field, if any
+
+        Async iterables are encoded by an async iterator, which only an
+        AsyncClient can send.
+        """
+        field = self.request_plan().stream_field
+
+        if field is None or not isinstance(field.param, params.StreamBody):
+            return None
+
+        items = getattr(self, field.key)
+        encoder = BodyEncoder(field.param.format, field.param.chunk_size)
+
+        if hasattr(items, "__aiter__"):
+            return encoder.content_type, encoder.aiter_bytes(items)
+
+        return encoder.content_type, encoder.iter_bytes(items)
 
     def adapt_type(self, response: JSONResponse) -> ResponseType:
+        content = getattr(response, "content", None)
+
+        # validate the raw body in one pass instead of building a dict first
+        if self.validate_json_bytes and isinstance(content, bytes):
+            return self.adapt_content(content)
+
         if isinstance(self.response_model, TypeAdapter):
             return self.response_model.validate_python(response.json())
 
@@ -102,27 +259,205 @@ class BaseRequestModel(BaseModel, Generic[ResponseType]):
 
         raise ValueError("response_model must be a TypeAdapter or a BaseModel")
 
+    def adapt_content(self, content: bytes) -> ResponseType:
+        if isinstance(self.response_model, TypeAdapter):
+            return self.response_model.validate_json(content)
+
+        if isinstance(self.response_model, (BaseModel, ModelMetaclass)):
+            return self.response_model.model_validate_json(content)
+
+        raise ValueError("response_model must be a TypeAdapter or a BaseModel")
+
 
 class RequestModel(BaseRequestModel[ResponseType]):
-    raw_response: Optional[Response] = None
+    raw_response: Optional[Response] = Field(default=None, exclude=True)
+
+    # opt-in cache for GET and HEAD requests, shared by the subclasses
+    response_cache: ClassVar[Optional[ResponseCache]] = None
+    # let identical concurrent GET and HEAD requests share one call in asend
+    single_flight: ClassVar[Optional[SingleFlight]] = None
+    # retry failed attempts of idempotent requests
+    retry: ClassVar[Optional[Retry]] = None
+    # a token bucket for this model, or one per host with a HostRateLimiter
+    rate_limiter: ClassVar[Optional[RateLimiter]] = None
+    # adapt the number of asend calls in flight to the upstream
+    concurrency_limiter: ClassVar[Optional[AdaptiveLimiter]] = None
+    # fail fast while the upstream of this model, or of a host, is unhealthy
+    circuit_breaker: ClassVar[Optional[CircuitBreakers]] = None
+    # send a duplicate of a slow asend call and take the first response
+    hedge: ClassVar[Optional[Hedge]] = None
 
     def handle_error(self, response: Response) -> None:
         response.raise_for_status()
 
     def send(self, client: Client) -> ResponseType:
         """Send the request synchronously"""
-        r = self.as_request(client)
-        self.raw_response = client.send(r)
-        self.handle_error(self.raw_response)
-
-        return self.adapt_type(self.raw_response)
+        r = self.build_request(client)
+        return self.send_request(client, r)
 
     async def asend(self, client: AsyncClient) -> ResponseType:
         """Send the request asynchronously"""
-        r = self.as_request(client)
-        self.raw_response = await client.send(r)
-        self.handle_error(self.raw_response)
-        return self.adapt_type(self.raw_response)
+        r = await self.abuild_request(client)
+
+        if self.single_flight is None or r.method not in CACHEABLE_METHODS:
+            return await self.asend_request(client, r)
+
+        async def shared_call() -> Tuple[Optional[Response], ResponseType]:
+            value = await self.asend_request(client, r)
+            return self.raw_response, value
+
+        # the value is validated as the response_model of this class
+        key = (id(client), type(self), cache_key(r))
+        self.raw_response, value = await self.single_flight.do(key, shared_call)
+        return value
+
+    def send_request(self, client: Client, r: Request) -> ResponseType:
+        lookup = self.cache_lookup(r)
+
+        if lookup is not None and lookup.hit is not None:
+            return self.from_cache(lookup.hit)
+
+        with self.phase(SEND, r) as event:
+            self.raw_response = self.dispatch(client, r, event)
+
+            if event is not None:
+                event.response = self.raw_response
+
+        return self.handle_response(self.raw_response, lookup)
+
+    async def asend_request(self, client: AsyncClient, r: Request) -> ResponseType:
+        lookup = self.cache_lookup(r)
+
+        if lookup is not None and lookup.hit is not None:
+            return self.from_cache(lookup.hit)
+
+        with self.phase(SEND, r) as event:
+            self.raw_response = await self.adispatch(client, r, event)
+
+            if event is not None:
+                event.response = self.raw_response
+
+        return self.handle_response(self.raw_response, lookup)
+
+    def dispatch(
+        self, client: Client, r: Request, event: Optional[PhaseEvent] = None
+    ) -> Response:
+        """Send the request over the wire, retrying when a policy is set"""
+
+        def attempt() -> Response:
+            if event is not None:
+                event.attempts += 1
+
+            return self.transmit(client, r)
+
+        if self.retry is None:
+            return attempt()
+
+        return self.retry.call(r, attempt)
+
+    async def adispatch(
+        self, client: AsyncClient, r: Request, event: Optional[PhaseEvent] = None
+    ) -> Response:
+        """Send the request over the wire, retrying when a policy is set"""
+
+        def attempt() -> Awaitable[Response]:
+            if event is not None:
+                event.attempts += 1
+
+            if self.hedge is None:
+                return self.atransmit(client, r)
+
+            return self.hedge.acall(r, lambda: self.atransmit(client, r))
+
+        if self.retry is None:
+            return await attempt()
+
+        return await self.retry.acall(r, attempt)
+
+    def transmit(self, client: Client, r: Request) -> Response:
+        """A single attempt to send the request"""
+
+        def send() -> Response:
+            if self.rate_limiter is not None:
+                self.rate_limiter.for_request(r).acquire()
+
+            return client.send(r)
+
+        if self.circuit_breaker is None:
+            return send()
+
+        return self.circuit_breaker.for_request(r).call(r, send)
+
+    async def atransmit(self, client: AsyncClient, r: Request) -> Response:
+        """A single attempt to send the request"""
+
+        async def send() -> Response:
+            if self.rate_limiter is not None:
+                await self.rate_limiter.for_request(r).aacquire()
+
+            if self.concurrency_limiter is None:
+                return await client.send(r)
+
+            return await self.concurrency_limiter.acall(lambda: client.send(r))
+
+        if self.circuit_breaker is None:
+            return await send()
+
+        return await self.circuit_breaker.for_request(r).acall(r, send)
+
+    def handle_response(
+        self, response: Response, lookup: Optional[CacheLookup] = None
+    ) -> ResponseType:
+        """Check and validate the response, using the cache when it is unchanged"""
+        entry = lookup.revalidated(response) if lookup is not None else None
+
+        if entry is not None:
+            return self.from_cache(entry)
+
+        with self.phase(VALIDATE, response.request, response):
+            self.handle_error(response)
+            value = self.adapt_type(response)
+
+        if lookup is not None:
+            lookup.store(response, value)
+
+        return value
+
+    def cache_lookup(self, request: Request) -> Optional[CacheLookup]:
+        if self.response_cache is None:
+            return None
+
+        # the value is validated as the response_model of this class
+        return self.response_cache.lookup(request, type(self))
+
+    def from_cache(self, entry: CacheEntry) -> ResponseType:
+        self.raw_response = entry.response
+        return entry.value
+
+    def build_request(self, client: BaseClient) -> Request:
+        with self.phase(BUILD) as event:
+            r = self.as_request(client)
+
+            if self.compression is not None:
+                r = self.compression.compress(r)
+
+            if event is not None:
+                event.request = r
+
+        return r
+
+    async def abuild_request(self, client: BaseClient) -> Request:
+        """Build the request, large bodies are compressed off the event loop"""
+        with self.phase(BUILD) as event:
+            r = self.as_request(client)
+
+            if self.compression is not None:
+                r = await self.compression.acompress(r)
+
+            if event is not None:
+                event.request = r
+
+        return r
 
     def as_request(self, client: BaseClient) -> Request:
         """Transform the properties of the object into a request"""
@@ -134,7 +469,7 @@ class RequestModel(BaseRequestModel[ResponseType]):
 
 
 class IteratorRequestModel(RequestModel[ResponseType]):
-    raw_response: Optional[Response] = None
+    raw_response: Optional[Response] = Field(default=None, exclude=True)
 
     def next_from_response(self, response: ResponseType) -> bool:  # pragma: no cover
         """
@@ -147,7 +482,9 @@ class IteratorRequestModel(RequestModel[ResponseType]):
         raise NotImplementedError
 
     @override
-    def send(self, client: Client) -> Iterator[ResponseType]:  # type: ignore[override]
+    def send(  # type: ignore[override]
+        self, client: Client
+    ) -> Generator[ResponseType, None, None]:
         response = super().send(client)
         yield response
 
@@ -156,3 +493,216 @@ class IteratorRequestModel(RequestModel[ResponseType]):
             self.raw_response = None
             response = super().send(client)
             yield response
+
+    async def aiter_pages(
+        self, client: AsyncClient, prefetch: int = 1
+    ) -> AsyncGenerator[ResponseType, None]:
+        """Iterate over the pages asynchronously
+
+        Up to ``prefetch`` pages are requested ahead of the consumer, so the
+        next request is in flight while the current page is processed. The
+        pages still depend on each other, next_from_response is called as
+        soon as a page arrives.
+        """
+        if prefetch < 1:
+            response = await RequestModel.asend(self, client)
+            yield response
+
+            while self.next_from_response(response):
+                self.raw_response = None
+                response = await RequestModel.asend(self, client)
+                yield response
+            return
+
+        # a page or the error that stopped the pagination, None when done
+        pages: "asyncio.Queue[Tuple[Optional[ResponseType], Optional[Exception]]]"
+        pages = asyncio.Queue()
+        slots = asyncio.Semaphore(prefetch)
+
+        fetcher = asyncio.ensure_future(_fetch_pages(self, client, pages, slots))
+
+        try:
+            while True:
+                page, error = await pages.get()
+                slots.release()
+
+                if error is not None:
+                    raise error
+                if page is None:
+                    break
+
+                yield page
+        finally:
+            fetcher.cancel()
+
+
+class OffsetIteratorRequestModel(RequestModel[ResponseType]):
+    """Paginate by offset when the first page tells how many pages follow
+
+    The remaining pages do not depend on each other, so they are requested
+    concurrently instead of one after another.
+    """
+
+    def pages_from_response(
+        self, response: ResponseType
+    ) -> Iterable[RequestModel[ResponseType]]:  # pragma: no cover
+        """
+        Return a request for every remaining page based on the first response
+
+        In example a copy of the current object for every remaining offset:
+        self.model_copy(update={"start": start})
+
+        """
+        raise NotImplementedError
+
+    @override
+    def send(  # type: ignore[override]
+        self, client: Client, concurrency: int = 4, ordered: bool = True
+    ) -> Iterator[ResponseType]:
+        """Send the first page, then the remaining pages from a thread pool
+
+        Pages are yielded in order, or as they complete when ``ordered`` is
+        false. The first failing page raises.
+        """
+        from .batch import send_many
+
+        response = super().send(client)
+        yield response
+
+        pages = self.pages_from_response(response)
+
+        for result in send_many(client, pages, concurrency, ordered):
+            yield result.result()
+
+    async def aiter_pages(
+        self, client: AsyncClient, concurrency: int = 4, ordered: bool = True
+    ) -> AsyncGenerator[ResponseType, None]:
+        """Send the first page, then the remaining pages concurrently
+
+        Pages are yielded in order, or as they complete when ``ordered`` is
+        false. The first failing page raises.
+        """
+        from .batch import asend_many
+
+        response = await self.asend(client)
+        yield response
+
+        pages = self.pages_from_response(response)
+
+        async for result in asend_many(client, pages, concurrency, ordered):
+            yield result.result()
+
+
+class StreamingRequestModel(RequestModel[ResponseType]):
+    """Validate the items of a JSON array response one by one as they arrive
+
+    The response_model is the type of a single item. ``items_path`` holds the
+    object keys leading to the array, by default the response is the array.
+    Only the item being received is kept in memory.
+    """
+
+    items_path: ClassVar[Tuple[str, ...]] = ()
+
+    def item_scanner(self) -> ItemScanner:
+        return JSONArrayScanner(self.items_path)
+
+    def open_stream(self, response: Response) -> None:
+        """Check the status, the body of an error response is read first"""
+        if response.is_error:
+            response.read()
+
+        self.handle_error(response)
+
+    @override
+    def send(  # type: ignore[override]
+        self, client: Client
+    ) -> Generator[ResponseType, None, None]:
+        r = self.build_request(client)
+
+        with self.phase(SEND, r):
+            self.raw_response = client.send(r, stream=True)
+
+        try:
+            self.open_stream(self.raw_response)
+            scanner = self.item_scanner()
+
+            for chunk in self.raw_response.iter_bytes():
+                for item in scanner.feed(chunk):
+                    yield self.adapt_content(item)
+
+                if scanner.done:
+                    break
+
+            for item in scanner.close():
+                yield self.adapt_content(item)
+        finally:
+            self.raw_response.close()
+
+    async def aiter_items(
+        self, client: AsyncClient
+    ) -> AsyncGenerator[ResponseType, None]:
+        """Iterate over the items asynchronously"""
+        r = await self.abuild_request(client)
+
+        with self.phase(SEND, r):
+            self.raw_response = await client.send(r, stream=True)
+
+        try:
+            if self.raw_response.is_error:
+                await self.raw_response.aread()
+
+            self.open_stream(self.raw_response)
+            scanner = self.item_scanner()
+
+            async for chunk in self.raw_response.aiter_bytes():
+                for item in scanner.feed(chunk):
+                    yield self.adapt_content(item)
+
+                if scanner.done:
+                    break
+
+            for item in scanner.close():
+                yield self.adapt_content(item)
+        finally:
+            await self.raw_response.aclose()
+
+
+class NDJSONRequestModel(StreamingRequestModel[ResponseType]):
+    """Validate the records of a newline delimited JSON response one by one"""
+
+    @override
+    def item_scanner(self) -> ItemScanner:
+        return NDJSONScanner()
+
+
+class SSERequestModel(StreamingRequestModel[ResponseType]):
+    """Validate the data of server-sent events one by one
+
+    ``events`` limits the event types that are validated, None accepts all.
+    """
+
+    events: ClassVar[Optional[Set[str]]] = None
+
+    @override
+    def item_scanner(self) -> ItemScanner:
+        return SSEScanner(self.events)
+
+
+async def _fetch_pages(
+    model: IteratorRequestModel[ResponseType],
+    client: AsyncClient,
+    pages: "asyncio.Queue[Tuple[Optional[ResponseType], Optional[Exception]]]",
+    slots: asyncio.Semaphore,
+) -> None:
+    try:
+        has_next = True
+        while has_next:
+            # the consumer frees a slot for every page it takes
+            await slots.acquire()
+            model.raw_response = None
+            response = await RequestModel.asend(model, client)
+            has_next = model.next_from_response(response)
+            pages.put_nowait((response, None))
+        pages.put_nowait((None, None))
+    except Exception as e:
+        pages.put_nowait((None, e))
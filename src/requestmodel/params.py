@@ -13,6 +13,26 @@ class Body(Param):
         self.embed = embed
 
 
+class StreamBody(Param):
+    """A body sent in chunks from a sync or async iterable of items
+
+    The items are encoded one by one as ``ndjson`` or as a JSON ``array``.
+    """
+
+    def __init__(
+        self,
+        format: str = "ndjson",
+        chunk_size: int = 64 * 1024,
+        **kwargs: Unpack[_FieldInfoInputs],
+    ) -> None:
+        if format not in ("ndjson", "array"):
+            raise ValueError(f"unknown stream format {format!r}")
+
+        super().__init__(**kwargs)
+        self.format = format
+        self.chunk_size = chunk_size
+
+
 class Cookie(Param):
     pass
 
@@ -0,0 +1,103 @@
+from functools import lru_cache
+from typing import ClassVar
+from typing import FrozenSet
+from typing import NamedTuple
+from typing import Optional
+from typing import Tuple
+from typing import Type
+
+from pydantic import BaseModel
+from pydantic.fields import FieldInfo
+from typing_extensions import get_type_hints
+
+from . import params
+from .fastapi import get_path_param_names
+from .utils import get_annotated_type
+
+
+class FieldPlan(NamedTuple):
+    """How a single field of a request model ends up in the request"""
+
+    key: str
+    dump_key: str
+    name: str
+    kind: Type[FieldInfo]
+    param: FieldInfo
+    embed: bool
+
+
+class RequestPlan(NamedTuple):
+    """The resolved shape of a request model, shared by all its instances"""
+
+    url: str
+    path_param_names: FrozenSet[str]
+    fields: Tuple[FieldPlan, ...]
+    body_fields: Tuple[FieldPlan, ...]
+    param_fields: Tuple[FieldPlan, ...]
+    stream_field: Optional[FieldPlan]
+
+
+def get_request_plan(model: Type[BaseModel]) -> RequestPlan:
+    """Return the cached plan of the model, rebuilt when its url changed"""
+    return _build_request_plan(model, getattr(model, "url", ""))
+
+
+@lru_cache(maxsize=None)
+def _build_request_plan(model: Type[BaseModel], url: str) -> RequestPlan:
+    path_param_names = frozenset(get_path_param_names(url))
+    fields = []
+    stream_field = None
+
+    for key, field in get_type_hints(model, include_extras=True).items():
+        if getattr(field, "__origin__", None) is ClassVar:
+            continue
+
+        # private attributes are never part of the request
+        if key not in model.model_fields:
+            continue
+
+        field_info = model.model_fields[key]
+
+        annotated_property = get_annotated_type(key, field, path_param_names)
+
+        if annotated_property.exclude or field_info.exclude:
+            continue
+
+        name = annotated_property.alias or key
+
+        if (
+            isinstance(annotated_property, params.Header)
+            and annotated_property.convert_underscores
+        ):
+            name = name.replace("_", "-")
+
+        field_plan = FieldPlan(
+            key=key,
+            dump_key=field_info.serialization_alias or key,
+            name=name,
+            kind=type(annotated_property),
+            param=annotated_property,
+            embed=getattr(annotated_property, "embed", False),
+        )
+
+        # the streamed body is encoded while it is sent, never dumped
+        if isinstance(annotated_property, params.StreamBody):
+            if stream_field is not None:
+                raise ValueError(f"{model.__name__} has more than one StreamBody")
+            stream_field = field_plan
+        else:
+            fields.append(field_plan)
+
+    body_fields = tuple(f for f in fields if isinstance(f.param, params.Body))
+
+    if stream_field is not None and body_fields:
+        raise ValueError(f"{model.__name__} can not mix StreamBody and Body fields")
+
+    return RequestPlan(
+        url=url,
+        path_param_names=path_param_names,
+        fields=tuple(fields),
+        body_fields=body_fields,
+        param_fields=tuple(f for f in fields if not isinstance(f.param, params.Body)),
+        stream_field=stream_field,
+    )
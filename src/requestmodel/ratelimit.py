@@ -0,0 +1,85 @@
+import asyncio
+import threading
+import time
+from typing import Optional
+from typing import Union
+
+from httpx import Request
+
+from .utils import PerHost
+
+
+class TokenBucket:
+    """Allow ``rate`` requests per second with bursts of up to ``capacity``
+
+    A request reserves a token right away, possibly going into debt, and
+    then sleeps until its token is due. Waiters are served in order and
+    nobody polls, the lock is only held to do the bookkeeping.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None) -> None:
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self.acquired = 0
+        self.delayed = 0
+        self.waited = 0.0
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def for_request(self, request: Request) -> "TokenBucket":
+        return self
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        """Take the tokens and return how long to wait until they are due"""
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self._updated
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+
+            wait = max(0.0, -self._tokens / self.rate)
+
+            self.acquired += 1
+            if wait:
+                self.delayed += 1
+                self.waited += wait
+
+            return wait
+
+    def refund(self, tokens: float = 1.0) -> None:
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + tokens)
+
+    def acquire(self) -> float:
+        """Block until a token is available, return the seconds waited"""
+        wait = self.reserve()
+
+        if wait:
+            time.sleep(wait)
+
+        return wait
+
+    async def aacquire(self) -> float:
+        """Wait until a token is available, return the seconds waited"""
+        wait = self.reserve()
+
+        if wait:
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                self.refund()
+                raise
+
+        return wait
+
+
+class HostRateLimiter(PerHost[TokenBucket]):
+    """A token bucket for every host the requests are sent to"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None) -> None:
+        super().__init__(lambda: TokenBucket(rate, capacity))
+
+
+RateLimiter = Union[TokenBucket, HostRateLimiter]
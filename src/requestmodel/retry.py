@@ -0,0 +1,198 @@
+import asyncio
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import AbstractSet
+from typing import Awaitable
+from typing import Callable
+from typing import Optional
+from typing import Tuple
+from typing import Type
+
+from httpx import Request
+from httpx import RequestNotRead
+from httpx import Response
+from httpx import TransportError
+
+from .upload import MultipartUpload
+
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "PUT", "DELETE", "OPTIONS", "TRACE"})
+RETRY_STATUS_CODES = frozenset({429, 502, 503, 504})
+
+
+def replayable(request: Request) -> bool:
+    """Whether the body of the request can be sent again
+
+    Bodies held in memory and file uploads can, other streams only once.
+    """
+    if isinstance(request.stream, MultipartUpload):
+        return True
+
+    try:
+        _ = request.content
+    except RequestNotRead:
+        return False
+
+    return True
+
+
+class RetryBudget:
+    """Limit retries to a fraction of the requests
+
+    Every request deposits ``ratio`` tokens and every retry withdraws one, so
+    retries can add at most ``ratio`` extra traffic once the ``burst``
+    tokens the budget starts with are spent.
+    """
+
+    def __init__(self, ratio: float = 0.1, burst: int = 10) -> None:
+        self.ratio = ratio
+        self.burst = burst
+        self.exhausted = 0
+        self._tokens = float(burst)
+        self._lock = threading.Lock()
+
+    def deposit(self) -> None:
+        with self._lock:
+            self._tokens = min(self._tokens + self.ratio, self.burst)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self._tokens < 1:
+                self.exhausted += 1
+                return False
+
+            self._tokens -= 1
+            return True
+
+
+# shared by every Retry that does not get a budget of its own
+RETRY_BUDGET = RetryBudget()
+
+
+def parse_retry_after(response: Response) -> Optional[float]:
+    """Return the seconds to wait from the Retry-After header"""
+    value = response.headers.get("retry-after", "").strip()
+
+    if value.isdigit():
+        return float(value)
+
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class Retry:
+    """Retry policy with exponential backoff and full jitter
+
+    Only requests with an idempotent method and a body that can be sent
+    again are retried. The n-th retry waits a random time between zero and
+    ``backoff * 2 ** n`` seconds, capped by ``max_backoff``. A Retry-After
+    header is honoured, unless it asks to wait longer than ``max_backoff``.
+    """
+
+    def __init__(
+        self,
+        attempts: int = 3,
+        status_codes: AbstractSet[int] = RETRY_STATUS_CODES,
+        exceptions: Tuple[Type[Exception], ...] = (TransportError,),
+        backoff: float = 0.1,
+        max_backoff: float = 10.0,
+        methods: AbstractSet[str] = IDEMPOTENT_METHODS,
+        respect_retry_after: bool = True,
+        budget: RetryBudget = RETRY_BUDGET,
+    ) -> None:
+        self.attempts = attempts
+        self.status_codes = status_codes
+        self.exceptions = exceptions
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.methods = methods
+        self.respect_retry_after = respect_retry_after
+        self.budget = budget
+        self.retries = 0
+
+    def backoff_for(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2**attempt))
+
+    def delay(
+        self,
+        request: Request,
+        attempt: int,
+        response: Optional[Response] = None,
+        error: Optional[Exception] = None,
+    ) -> Optional[float]:
+        """Return how long to wait before the next attempt, None to give up"""
+        if attempt + 1 >= self.attempts or request.method not in self.methods:
+            return None
+
+        if error is not None and not isinstance(error, self.exceptions):
+            return None
+
+        if response is not None and response.status_code not in self.status_codes:
+            return None
+
+        if not replayable(request):
+            return None
+
+        delay = self.backoff_for(attempt)
+
+        if response is not None and self.respect_retry_after:
+            retry_after = parse_retry_after(response)
+
+            if retry_after is not None:
+                if retry_after > self.max_backoff:
+                    return None
+                delay = retry_after
+
+        if not self.budget.withdraw():
+            return None
+
+        self.retries += 1
+        return delay
+
+    def call(self, request: Request, send: Callable[[], Response]) -> Response:
+        """Call send until it succeeds or the policy gives up"""
+        self.budget.deposit()
+        attempt = 0
+
+        while True:
+            try:
+                response = send()
+            except Exception as e:
+                delay = self.delay(request, attempt, error=e)
+                if delay is None:
+                    raise
+            else:
+                delay = self.delay(request, attempt, response=response)
+                if delay is None:
+                    return response
+                response.close()
+
+            time.sleep(delay)
+            attempt += 1
+
+    async def acall(
+        self, request: Request, send: Callable[[], Awaitable[Response]]
+    ) -> Response:
+        """Await send until it succeeds or the policy gives up"""
+        self.budget.deposit()
+        attempt = 0
+
+        while True:
+            try:
+                response = await send()
+            except Exception as e:
+                delay = self.delay(request, attempt, error=e)
+                if delay is None:
+                    raise
+            else:
+                delay = self.delay(request, attempt, response=response)
+                if delay is None:
+                    return response
+                await response.aclose()
+
+            await asyncio.sleep(delay)
+            attempt += 1
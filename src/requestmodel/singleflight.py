@@ -0,0 +1,50 @@
+import asyncio
+from typing import Any
+from typing import Awaitable
+from typing import Callable
+from typing import Dict
+from typing import Hashable
+from typing import TypeVar
+
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Let concurrent callers with the same key share a single call
+
+    The first caller starts the call, callers arriving while it is in flight
+    await the same result or exception. A caller that is cancelled does not
+    cancel the call for the others.
+    """
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.shared = 0
+        self._tasks: Dict[Hashable, "asyncio.Future[Any]"] = {}
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[T]]) -> T:
+        # futures belong to a loop, never share them between loops
+        key = (id(asyncio.get_running_loop()), key)
+        task = self._tasks.get(key)
+
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(call())
+            self._tasks[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.shared += 1
+
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: "asyncio.Future[Any]") -> None:
+        # callers find the finished task until now, so it was never replaced
+        del self._tasks[key]
+
+        # nobody may be waiting anymore, mark the exception as retrieved
+        if not task.cancelled():
+            task.exception()
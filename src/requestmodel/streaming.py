@@ -0,0 +1,360 @@
+import json
+import re
+from typing import Any
+from typing import AsyncIterable
+from typing import AsyncIterator
+from typing import Collection
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Protocol
+from typing import Sequence
+
+from pydantic_core import to_json
+
+
+# the bytes that change the structure, everything else is skipped at once
+_STRUCTURE = re.compile(rb'["\[\]{},:]')
+
+_LINE_END = re.compile(rb"\r\n|\r|\n")
+
+_QUOTE = ord('"')
+_BACKSLASH = ord("\\")
+_OPEN_OBJECT = ord("{")
+_OPEN_ARRAY = ord("[")
+_CLOSE_OBJECT = ord("}")
+_CLOSE_ARRAY = ord("]")
+_COMMA = ord(",")
+_COLON = ord(":")
+
+
+def _string_end(buffer: bytearray, start: int) -> int:
+    """Return the index after the quote closing the string, -1 when incomplete"""
+    end = buffer.find(b'"', start)
+
+    while end != -1:
+        backslashes = 0
+        while buffer[end - 1 - backslashes] == _BACKSLASH:
+            backslashes += 1
+
+        if backslashes % 2 == 0:
+            return end + 1
+
+        end = buffer.find(b'"', end + 1)
+
+    return -1
+
+
+def _decode_key(raw: bytes) -> str:
+    if b"\\" in raw:
+        return str(json.loads(b'"' + raw + b'"'))
+
+    return raw.decode()
+
+
+class _Container:
+    __slots__ = ("kind", "key", "expect_key")
+
+    def __init__(self, kind: int) -> None:
+        self.kind = kind
+        self.key: Optional[str] = None
+        self.expect_key = kind == _OPEN_OBJECT
+
+
+class ItemScanner(Protocol):  # pragma: no cover
+    """Split a response body into the raw bytes of its items"""
+
+    done: bool
+
+    def feed(self, data: bytes) -> List[bytes]: ...  # noqa: E704
+
+    def close(self) -> List[bytes]: ...  # noqa: E704
+
+
+class JSONArrayScanner:
+    """Split a JSON array into the raw bytes of its items as data arrives
+
+    ``path`` holds the object keys that lead to the array, an empty path is
+    a top-level array. Only the item being received is buffered, so memory
+    does not grow with the size of the document. The items are not parsed,
+    invalid JSON inside an item is left to the validation of the item.
+    """
+
+    def __init__(self, path: Sequence[str] = ()) -> None:
+        self.path = tuple(path)
+        self.done = False
+        self._buffer = bytearray()
+        self._pos = 0
+        self._stack: List[_Container] = []
+        # where the current item starts, None when outside of the array
+        self._item_start: Optional[int] = None
+
+    def feed(self, data: bytes) -> List[bytes]:
+        """Add data and return the items that are complete"""
+        if self.done:
+            return []
+
+        self._buffer += data
+        items: List[bytes] = []
+
+        while not self.done:
+            match = _STRUCTURE.search(self._buffer, self._pos)
+
+            if match is None:
+                self._pos = len(self._buffer)
+                break
+
+            index = match.start()
+
+            if self._buffer[index] == _QUOTE:
+                end = _string_end(self._buffer, index + 1)
+
+                if end == -1:
+                    self._pos = index
+                    break
+
+                self._string(index, end)
+                self._pos = end
+            else:
+                self._structure(index, items)
+                self._pos = index + 1
+
+        self._trim()
+        return items
+
+    def close(self) -> List[bytes]:
+        """Raise ValueError when the array was not found or is incomplete"""
+        if not self.done:
+            location = ".".join(self.path) or "the top level"
+            raise ValueError(f"no complete JSON array at {location}")
+
+        return []
+
+    def _in_array(self) -> bool:
+        return self._item_start is not None and len(self._stack) == len(self.path) + 1
+
+    def _on_path(self) -> bool:
+        """Whether an array opened now is the array the path leads to"""
+        if len(self._stack) != len(self.path):
+            return False
+
+        return all(
+            container.kind == _OPEN_OBJECT and container.key == key
+            for container, key in zip(self._stack, self.path)
+        )
+
+    def _string(self, start: int, end: int) -> None:
+        top = self._stack[-1] if self._stack else None
+
+        if top is not None and top.expect_key:
+            top.key = _decode_key(bytes(self._buffer[start + 1 : end - 1]))
+
+    def _structure(self, index: int, items: List[bytes]) -> None:
+        char = self._buffer[index]
+
+        if char == _OPEN_OBJECT or char == _OPEN_ARRAY:
+            if char == _OPEN_ARRAY and self._item_start is None and self._on_path():
+                self._item_start = index + 1
+            self._stack.append(_Container(char))
+
+        elif char == _CLOSE_OBJECT or char == _CLOSE_ARRAY:
+            if self._in_array():
+                self._emit(index, items)
+                self.done = True
+            if self._stack:
+                self._stack.pop()
+
+        elif char == _COMMA:
+            if self._in_array():
+                self._emit(index, items)
+                self._item_start = index + 1
+            elif self._stack and self._stack[-1].kind == _OPEN_OBJECT:
+                self._stack[-1].expect_key = True
+
+        elif char == _COLON and self._stack:
+            self._stack[-1].expect_key = False
+
+    def _emit(self, end: int, items: List[bytes]) -> None:
+        item = bytes(self._buffer[self._item_start : end]).strip()
+
+        if item:
+            items.append(item)
+
+    def _trim(self) -> None:
+        """Drop the bytes that are no longer needed"""
+        keep = self._pos if self._item_start is None else self._item_start
+
+        if keep:
+            del self._buffer[:keep]
+            self._pos -= keep
+
+            if self._item_start is not None:
+                self._item_start -= keep
+
+
+class LineScanner:
+    """Split a body into lines as data arrives
+
+    Lines end with ``\\n``, ``\\r\\n`` or a lone ``\\r``.
+    """
+
+    def __init__(self) -> None:
+        self.done = False
+        self._buffer = bytearray()
+
+    def lines(self, data: bytes) -> List[bytes]:
+        self._buffer += data
+        lines: List[bytes] = []
+        start = 0
+
+        while True:
+            match = _LINE_END.search(self._buffer, start)
+
+            # a trailing \r may be the first half of \r\n
+            if (
+                match is None
+                or match.end() == len(self._buffer)
+                and match.group() == b"\r"
+            ):
+                break
+
+            lines.append(bytes(self._buffer[start : match.start()]))
+            start = match.end()
+
+        del self._buffer[:start]
+        return lines
+
+    def rest(self) -> bytes:
+        rest = bytes(self._buffer)
+        self._buffer.clear()
+        return rest
+
+
+class NDJSONScanner(LineScanner):
+    """Split newline delimited JSON (JSON Lines) into its records"""
+
+    def feed(self, data: bytes) -> List[bytes]:
+        return [line for line in self.lines(data) if line.strip()]
+
+    def close(self) -> List[bytes]:
+        """Return the last record when the body does not end with a newline"""
+        rest = self.rest()
+        return [rest] if rest.strip() else []
+
+
+class SSEScanner(LineScanner):
+    """Split a text/event-stream into the data of its events
+
+    ``events`` limits the event types that are returned, events without a
+    type are ``message`` events. Comments, ``id`` and ``retry`` fields and
+    events without data are skipped.
+    """
+
+    def __init__(self, events: Optional[Collection[str]] = None) -> None:
+        super().__init__()
+        self.events = events
+        self._data: List[bytes] = []
+        self._event = b""
+
+    def feed(self, data: bytes) -> List[bytes]:
+        items: List[bytes] = []
+
+        for line in self.lines(data):
+            if not line:
+                self._dispatch(items)
+                continue
+
+            name, _, value = line.partition(b":")
+            if value.startswith(b" "):
+                value = value[1:]
+
+            if name == b"data":
+                self._data.append(value)
+            elif name == b"event":
+                self._event = value
+
+        return items
+
+    def close(self) -> List[bytes]:
+        """Drop an event that was not finished by a blank line"""
+        self.rest()
+        self._data = []
+        return []
+
+    def _dispatch(self, items: List[bytes]) -> None:
+        event = self._event.decode() or "message"
+
+        if self._data and (self.events is None or event in self.events):
+            items.append(b"\n".join(self._data))
+
+        self._data = []
+        self._event = b""
+
+
+CONTENT_TYPES = {"ndjson": "application/x-ndjson", "array": "application/json"}
+
+
+class BodyEncoder:
+    """Encode items one by one as NDJSON or a JSON array
+
+    Items are collected into chunks of about ``chunk_size`` bytes, so large
+    uploads are not written to the socket one small item at a time.
+    """
+
+    def __init__(self, format: str = "ndjson", chunk_size: int = 64 * 1024) -> None:
+        self.format = format
+        self.chunk_size = chunk_size
+        self.content_type = CONTENT_TYPES[format]
+        self._buffer = bytearray()
+        self._count = 0
+
+    def encode(self, item: Any) -> Optional[bytes]:
+        """Add an item, return a chunk once enough data is collected"""
+        document = to_json(item, by_alias=True)
+
+        if self.format == "ndjson":
+            self._buffer += document
+            self._buffer += b"\n"
+        else:
+            self._buffer += b"," if self._count else b"["
+            self._buffer += document
+
+        self._count += 1
+
+        if len(self._buffer) < self.chunk_size:
+            return None
+
+        return self._flush()
+
+    def close(self) -> bytes:
+        """Return the rest of the body"""
+        if self.format == "array":
+            self._buffer += b"]" if self._count else b"[]"
+
+        return self._flush()
+
+    def iter_bytes(self, items: Iterable[Any]) -> Iterator[bytes]:
+        for item in items:
+            chunk = self.encode(item)
+            if chunk is not None:
+                yield chunk
+
+        rest = self.close()
+        if rest:
+            yield rest
+
+    async def aiter_bytes(self, items: AsyncIterable[Any]) -> AsyncIterator[bytes]:
+        async for item in items:
+            chunk = self.encode(item)
+            if chunk is not None:
+                yield chunk
+
+        rest = self.close()
+        if rest:
+            yield rest
+
+    def _flush(self) -> bytes:
+        chunk = bytes(self._buffer)
+        self._buffer.clear()
+        return chunk
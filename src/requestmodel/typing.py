@@ -1,5 +1,7 @@
 from typing import Any
+from typing import AsyncIterator
 from typing import Dict
+from typing import Iterator
 from typing import List
 from typing import Type
 from typing import TypeVar
@@ -15,3 +17,4 @@ ResponseType = TypeVar(
     bound=Union[BaseModel, TypeAdapter[List[BaseModel]], List[BaseModel]],
 )
 RequestArgs = Dict[Type[FieldInfo], Dict[str, Any]]
+StreamContent = Union[Iterator[bytes], AsyncIterator[bytes]]
@@ -0,0 +1,245 @@
+import asyncio
+import inspect
+import mmap
+import os
+import threading
+from typing import IO
+from typing import Any
+from typing import AsyncGenerator
+from typing import AsyncIterator
+from typing import Dict
+from typing import Generator
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Union
+
+from httpx import AsyncByteStream
+from httpx import SyncByteStream
+
+
+Buffer = Union[bytes, bytearray, memoryview, mmap.mmap]
+Source = Union[str, "os.PathLike[str]", IO[bytes], Buffer]
+BUFFERS = (bytes, bytearray, memoryview, mmap.mmap)
+
+
+def _quote(value: str) -> str:
+    """Escape a multipart header parameter like browsers do"""
+    return value.replace('"', "%22").replace("\r", "%0D").replace("\n", "%0A")
+
+
+class FileUpload:
+    """A file, or a byte range of it, streamed in chunks without buffering it
+
+    ``source`` is a path, a binary file handle or a buffer such as ``mmap``
+    or ``memoryview``. Only one chunk is in memory at a time, buffers are
+    sliced and files are read at their offset with ``os.pread``. Paths are
+    opened on every iteration and handles are read from the offset again,
+    so a request with an upload can be sent again.
+
+    ``offset`` and ``length`` select the range to send, ``content_range``
+    describes it for resumable uploads.
+    """
+
+    def __init__(
+        self,
+        source: Source,
+        filename: Optional[str] = None,
+        content_type: str = "application/octet-stream",
+        offset: int = 0,
+        length: Optional[int] = None,
+        chunk_size: int = 64 * 1024,
+    ) -> None:
+        self.source = source
+        self.content_type = content_type
+        self.offset = offset
+        self.chunk_size = chunk_size
+        self._lock = threading.Lock()
+        self.total = self._total_size()
+
+        if not 0 <= offset <= self.total:
+            raise ValueError(f"offset {offset} outside of {self.total} bytes")
+
+        remaining = self.total - offset
+        self.size = remaining if length is None else min(length, remaining)
+
+        if filename is None:
+            name = getattr(source, "name", None)
+            if isinstance(source, (str, os.PathLike)):
+                name = os.fspath(source)
+            filename = os.path.basename(name) if isinstance(name, str) else "upload"
+
+        self.filename = filename
+
+    @property
+    def content_range(self) -> str:
+        """The Content-Range of the selected bytes"""
+        if not self.size:
+            return f"bytes */{self.total}"
+
+        return f"bytes {self.offset}-{self.offset + self.size - 1}/{self.total}"
+
+    def _total_size(self) -> int:
+        if isinstance(self.source, (str, os.PathLike)):
+            return os.stat(self.source).st_size
+
+        if isinstance(self.source, BUFFERS):
+            return memoryview(self.source).nbytes
+
+        try:
+            return os.fstat(self.source.fileno()).st_size
+        except (AttributeError, OSError):
+            position = self.source.tell()
+            size = self.source.seek(0, os.SEEK_END)
+            self.source.seek(position)
+            return size
+
+    def iter_chunks(self) -> Generator[bytes, None, None]:
+        if isinstance(self.source, BUFFERS):
+            yield from self._iter_buffer(self.source)
+        elif isinstance(self.source, (str, os.PathLike)):
+            with open(self.source, "rb") as f:
+                yield from self._iter_file(f)
+        else:
+            yield from self._iter_file(self.source)
+
+    async def aiter_chunks(self) -> AsyncGenerator[bytes, None]:
+        """Read the chunks in the default executor, not on the event loop"""
+        loop = asyncio.get_running_loop()
+        chunks = self.iter_chunks()
+
+        try:
+            while True:
+                chunk = await loop.run_in_executor(None, next, chunks, None)
+
+                if chunk is None:
+                    break
+
+                yield chunk
+        finally:
+            # a read that was cancelled may still be running in its thread
+            if inspect.getgeneratorstate(chunks) != inspect.GEN_RUNNING:
+                chunks.close()
+
+    def _iter_buffer(self, buffer: Buffer) -> Iterator[bytes]:
+        end = self.offset + self.size
+
+        with memoryview(buffer) as source, source.cast("B") as view:
+            for start in range(self.offset, end, self.chunk_size):
+                yield view[start : min(start + self.chunk_size, end)].tobytes()
+
+    def _iter_file(self, f: IO[bytes]) -> Iterator[bytes]:
+        try:
+            fd = f.fileno()
+        except (AttributeError, OSError):
+            fd = -1
+
+        # pread leaves the position of a shared handle alone
+        pread = fd != -1 and hasattr(os, "pread")
+        position = self.offset
+        end = self.offset + self.size
+
+        while position < end:
+            size = min(self.chunk_size, end - position)
+
+            if pread:
+                chunk = os.pread(fd, size, position)
+            else:
+                # hedged attempts read the same handle at the same time
+                with self._lock:
+                    f.seek(position)
+                    chunk = f.read(size)
+
+            if not chunk:
+                raise ValueError(f"{self.filename} is shorter than expected")
+
+            position += len(chunk)
+            yield chunk
+
+
+class MultipartUpload(SyncByteStream, AsyncByteStream):
+    """A multipart/form-data body that streams its files with a known length"""
+
+    def __init__(
+        self,
+        data: Dict[str, Any],
+        files: Dict[str, Any],
+        boundary: Optional[bytes] = None,
+    ) -> None:
+        self.boundary = boundary or os.urandom(16).hex().encode()
+        self.content_type = f"multipart/form-data; boundary={self.boundary.decode()}"
+        self.parts: List[Union[bytes, FileUpload]] = []
+
+        for name, value in data.items():
+            for item in value if isinstance(value, list) else [value]:
+                self._add_field(name, item)
+
+        for name, value in files.items():
+            self._add_file(name, value)
+
+        self.parts.append(b"--" + self.boundary + b"--\r\n")
+        self.content_length = sum(
+            len(part) if isinstance(part, bytes) else part.size for part in self.parts
+        )
+
+    def __len__(self) -> int:
+        return self.content_length
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return {
+            "Content-Type": self.content_type,
+            "Content-Length": str(self.content_length),
+        }
+
+    def __iter__(self) -> Iterator[bytes]:
+        for part in self.parts:
+            if isinstance(part, bytes):
+                yield part
+            else:
+                yield from part.iter_chunks()
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        for part in self.parts:
+            if isinstance(part, bytes):
+                yield part
+            else:
+                async for chunk in part.aiter_chunks():
+                    yield chunk
+
+    def _header(self, name: str, filename: Optional[str], content_type: str) -> bytes:
+        disposition = f'form-data; name="{_quote(name)}"'
+
+        if filename is not None:
+            disposition += f'; filename="{_quote(filename)}"'
+
+        header = f"Content-Disposition: {disposition}\r\n"
+
+        if content_type:
+            header += f"Content-Type: {content_type}\r\n"
+
+        return b"--" + self.boundary + b"\r\n" + header.encode() + b"\r\n"
+
+    def _add_field(self, name: str, value: Any) -> None:
+        content = value if isinstance(value, bytes) else str(value).encode()
+        self.parts.append(self._header(name, None, "") + content + b"\r\n")
+
+    def _add_file(self, name: str, value: Any) -> None:
+        if isinstance(value, FileUpload):
+            header = self._header(name, value.filename, value.content_type)
+            self.parts.extend([header, value, b"\r\n"])
+            return
+
+        content = value if isinstance(value, bytes) else str(value).encode()
+        header = self._header(name, "upload", "application/octet-stream")
+        self.parts.append(header + content + b"\r\n")
+
+
+def multipart_upload(
+    data: Dict[str, Any], files: Dict[str, Any]
+) -> Optional[MultipartUpload]:
+    """A streaming multipart body when the files hold a FileUpload"""
+    if not any(isinstance(value, FileUpload) for value in files.values()):
+        return None
+
+    return MultipartUpload(data, files)
@@ -1,9 +1,15 @@
+import threading
+from typing import AbstractSet
 from typing import Any
+from typing import Callable
 from typing import Dict
+from typing import Generic
 from typing import Optional
-from typing import Set
+from typing import TypeVar
 
+from httpx import Request
 from pydantic.fields import FieldInfo
+from pydantic_core import to_json
 from typing_extensions import Annotated
 from typing_extensions import get_args
 from typing_extensions import get_origin
@@ -14,8 +20,13 @@ from .fastapi import field_annotation_is_sequence
 from .typing import RequestArgs
 
 
+T = TypeVar("T")
+
+
 def get_annotated_type(
-    variable_key: str, variable_type: Any, path_param_names: Optional[Set[str]] = None
+    variable_key: str,
+    variable_type: Any,
+    path_param_names: Optional[AbstractSet[str]] = None,
 ) -> FieldInfo:
     origin = get_origin(variable_type)
 
@@ -63,3 +74,31 @@ def unify_body(
                 request_args[type(annotated_property)][nested_key] = nested_value
     else:
         request_args[type(annotated_property)][key] = value
+
+
+def json_member_value(document: bytes, key: str) -> bytes:
+    """Return the raw value of a JSON object that only has the given key"""
+    prefix = b"{" + to_json(key) + b":"
+
+    if not document.startswith(prefix) or not document.endswith(b"}"):
+        raise ValueError(f"expected a JSON object with only {key!r}")
+
+    return document[len(prefix) : -1]
+
+
+class PerHost(Generic[T]):
+    """Keep one instance per host, created with the factory on first use"""
+
+    def __init__(self, factory: Callable[[], T]) -> None:
+        self.factory = factory
+        self.hosts: Dict[str, T] = {}
+        self._lock = threading.Lock()
+
+    def for_request(self, request: Request) -> T:
+        host = request.url.netloc.decode("ascii")
+
+        if host not in self.hosts:
+            with self._lock:
+                self.hosts.setdefault(host, self.factory())
+
+        return self.hosts[host]
@@ -4,6 +4,8 @@ from fastapi import FastAPI
 from fastapi import File
 from fastapi import Header
 from fastapi import params
+from httpx import ASGITransport
+from httpx import AsyncClient
 from starlette.testclient import TestClient
 from typing_extensions import Annotated
 
@@ -42,6 +44,11 @@ async def get_items(page: int = 1, size: int = 25) -> PaginatedResponse:
     )
 
 
+@app.get("/payload")
+async def get_payload(size: int = 1) -> PaginatedResponse:
+    return PaginatedResponse(items=list(range(size)), total=size, page=1, size=size)
+
+
 @app.put("/items")
 async def create_item(
     data: Annotated[FileCreateSchema, params.Body()],
@@ -55,3 +62,6 @@ async def get_type_adapter() -> List[NameModel]:
 
 
 client = TestClient(app)
+async_client = AsyncClient(
+    transport=ASGITransport(app=app), base_url="http://testserver"
+)
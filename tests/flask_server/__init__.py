@@ -1,3 +1,6 @@
+import gzip
+import json
+
 from a2wsgi import WSGIMiddleware
 from flask import Flask
 from flask import Response
@@ -28,4 +31,23 @@ def submit() -> Response:
     return jsonify({"errors": form.errors})
 
 
+@app.route("/names", methods=["POST"])
+def names() -> Response:
+    """Answer with the encoding and the number of names that were received"""
+    encoding = request.headers.get("Content-Encoding", "identity")
+    content = request.get_data()
+
+    if encoding == "gzip":
+        content = gzip.decompress(content)
+
+    return jsonify({"name": f"{encoding} {len(json.loads(content)['names'])}"})
+
+
+@app.route("/payload", methods=["GET"])
+def payload() -> Response:
+    size = int(request.args.get("size", 1))
+
+    return jsonify({"items": list(range(size)), "total": size, "page": 1, "size": size})
+
+
 client = TestClient(WSGIMiddleware(app))  # type: ignore[arg-type]
@@ -0,0 +1,137 @@
+"""Allocation budgets of building requests and validating responses.
+
+Every case is called once to warm up caches, then once more with tracemalloc
+running. The peak is the most memory the call needed at once, the blocks are
+the allocations still alive afterwards, including the result. The budgets
+leave room for differences between Python versions, raise them only when
+the extra memory is expected.
+"""
+
+import json
+import tracemalloc
+from typing import Any
+from typing import Callable
+from typing import ClassVar
+from typing import List
+from typing import NamedTuple
+from typing import Type
+
+import pytest
+from httpx import Response
+from typing_extensions import Annotated
+
+from requestmodel import RequestModel
+from requestmodel import params
+from tests.locatieserver.models import LookupDoc
+from tests.locatieserver.models import LookupResponse
+from tests.locatieserver.requests import LookupRequest
+
+
+KiB = 1024
+MiB = 1024 * KiB
+
+DOC = {
+    "bron": "BAG",
+    "woonplaatscode": "3594",
+    "type": "adres",
+    "woonplaatsnaam": "Utrecht",
+    "huis_nlt": "1",
+    "openbareruimtetype": "Weg",
+    "gemeentecode": "0344",
+    "weergavenaam": "Stationsplein 1, 3511ED Utrecht",
+    "straatnaam_verkort": "Stationsplein",
+    "id": "adr-bf54db721969487ed33ba84d9973c702",
+    "gemeentenaam": "Utrecht",
+    "identificatie": "0344010000000001",
+    "openbareruimte_id": "0344300000118753",
+    "provinciecode": "PV26",
+    "postcode": "3511ED",
+    "provincienaam": "Utrecht",
+    "nummeraanduiding_id": "0344200000000001",
+    "adresseerbaarobject_id": "0344010000000001",
+    "huisnummer": 1,
+    "provincieafkorting": "UT",
+    "straatnaam": "Stationsplein",
+    "gekoppeld_perceel": ["UTT00-C-1234"],
+}
+
+
+class Allocations(NamedTuple):
+    peak: int
+    blocks: int
+
+
+def measure_allocations(call: Callable[[], Any]) -> Allocations:
+    call()
+
+    tracemalloc.start()
+    try:
+        result = call()  # noqa: F841 keep the result alive while counting
+        _, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+
+    blocks = sum(stat.count for stat in snapshot.statistics("filename"))
+    return Allocations(peak, blocks)
+
+
+class BulkLookupRequest(RequestModel[LookupResponse]):
+    method: ClassVar[str] = "POST"
+    url: ClassVar[str] = "/lookup"
+    response_model: ClassVar[Type[LookupResponse]] = LookupResponse
+
+    docs: Annotated[List[LookupDoc], params.Body(embed=True)]
+
+
+class JSONLookupRequest(LookupRequest):
+    validate_json_bytes: ClassVar[bool] = False
+
+
+def lookup_response(count: int) -> Response:
+    body = {"response": {"numFound": count, "start": 0, "docs": [DOC] * count}}
+    return Response(200, content=json.dumps(body).encode())
+
+
+def test_request_args_for_values_small() -> None:
+    request = LookupRequest(id="adr-bf54db721969487ed33ba84d9973c702")
+
+    allocations = measure_allocations(request.request_args_for_values)
+
+    # about 1 KiB, the coverage tracer of the test session doubles it
+    assert allocations.peak < 4 * KiB
+    assert allocations.blocks < 20
+
+
+def test_request_args_for_values_large() -> None:
+    request = BulkLookupRequest(docs=[LookupDoc.model_validate(DOC)] * 100)
+
+    allocations = measure_allocations(request.request_args_for_values)
+
+    assert allocations.peak < 160 * KiB
+    assert allocations.blocks < 600
+
+
+@pytest.mark.parametrize(
+    "count, peak, blocks", [(1, 8 * KiB, 40), (1_000, 6 * MiB, 14_000)]
+)
+def test_adapt_type(count: int, peak: int, blocks: int) -> None:
+    request = LookupRequest(id="adr-bf54db721969487ed33ba84d9973c702")
+    response = lookup_response(count)
+
+    allocations = measure_allocations(lambda: request.adapt_type(response))
+
+    assert allocations.peak < peak
+    assert allocations.blocks < blocks
+
+
+def test_adapt_type_from_bytes_needs_less_memory() -> None:
+    response = lookup_response(1_000)
+    from_bytes = LookupRequest(id="x")
+    from_json = JSONLookupRequest(id="x")
+
+    allocations = measure_allocations(lambda: from_bytes.adapt_type(response))
+    fallback = measure_allocations(lambda: from_json.adapt_type(response))
+
+    assert allocations.peak < fallback.peak
+    assert allocations.blocks < fallback.blocks
@@ -0,0 +1,122 @@
+import asyncio
+from typing import ClassVar
+from typing import List
+from typing import Type
+
+import pytest
+from httpx import AsyncClient
+from httpx import HTTPStatusError
+from httpx import MockTransport
+from httpx import Request
+from httpx import Response
+
+from requestmodel import RequestModel
+from requestmodel.batch import BatchResult
+from requestmodel.batch import asend_many
+from requestmodel.batch import send_many
+from tests.fastapi_server import async_client
+from tests.fastapi_server import client
+from tests.fastapi_server.schema import PaginatedResponse
+
+
+class ItemsRequest(RequestModel[PaginatedResponse]):
+    method: ClassVar[str] = "GET"
+    url: ClassVar[str] = "/items"
+    response_model: ClassVar[Type[PaginatedResponse]] = PaginatedResponse
+
+    page: int
+    size: int = 10
+
+
+class MissingRequest(ItemsRequest):
+    url: ClassVar[str] = "/missing"
+
+
+def models() -> List[ItemsRequest]:
+    requests = [ItemsRequest(page=page) for page in range(1, 11)]
+    requests[3] = MissingRequest(page=4)
+    return requests
+
+
+def check(results: List[BatchResult[PaginatedResponse]]) -> None:
+    assert sorted(result.index for result in results) == list(range(10))
+
+    for result in results:
+        if result.index == 3:
+            assert isinstance(result.error, HTTPStatusError)
+            assert result.response is None
+
+            with pytest.raises(HTTPStatusError):
+                result.result()
+        else:
+            assert result.error is None
+            assert result.response is not None
+            assert result.response.page == result.index + 1
+            assert result.model.raw_response is not None
+
+
+@pytest.mark.parametrize("ordered", [True, False])
+def test_send_many(ordered: bool) -> None:
+    results = list(send_many(client, models(), concurrency=3, ordered=ordered))
+
+    check(results)
+
+    if ordered:
+        assert [result.index for result in results] == list(range(10))
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("ordered", [True, False])
+async def test_asend_many(ordered: bool) -> None:
+    results = [
+        result
+        async for result in asend_many(
+            async_client, models(), concurrency=3, ordered=ordered
+        )
+    ]
+
+    check(results)
+
+    if ordered:
+        assert [result.index for result in results] == list(range(10))
+
+
+def test_send_many_same_instance() -> None:
+    request = ItemsRequest(page=2)
+
+    results = list(send_many(client, [request] * 5, concurrency=5))
+
+    # every result has its own instance with its own raw response
+    assert len({id(result.model) for result in results}) == 5
+    assert len({id(result.model.raw_response) for result in results}) == 5
+    assert all(result.response == results[0].response for result in results)
+
+
+@pytest.mark.asyncio
+async def test_asend_many_early_exit() -> None:
+    cancelled: List[str] = []
+
+    async def handler(request: Request) -> Response:
+        page = request.url.params["page"]
+
+        try:
+            if page != "1":
+                await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(page)
+            raise
+
+        return Response(200, json={"items": [], "page": 1, "size": 10, "total": 0})
+
+    slow_client = AsyncClient(transport=MockTransport(handler), base_url="http://test")
+    results = asend_many(slow_client, models(), concurrency=3)
+
+    result = await results.__anext__()
+    await results.aclose()
+
+    assert result.index == 0
+    assert result.result() == result.response
+
+    # the requests still in flight are cancelled, no other one is sent
+    await asyncio.sleep(0)
+    assert sorted(cancelled) == ["2", "3"]
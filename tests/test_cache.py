@@ -0,0 +1,207 @@
+from typing import ClassVar
+from typing import List
+from typing import Tuple
+from typing import Type
+
+import pytest
+from httpx import AsyncClient
+from httpx import Client
+from httpx import MockTransport
+from httpx import Request
+from httpx import Response
+
+from requestmodel import RequestModel
+from requestmodel.cache import ResponseCache
+from requestmodel.cache import freshness_lifetime
+from tests.fastapi_server.schema import NameModel
+
+
+class CachedRequest(RequestModel[NameModel]):
+    method: ClassVar[str] = "GET"
+    url: ClassVar[str] = "/names/{name}"
+    response_model: ClassVar[Type[NameModel]] = NameModel
+    response_cache: ClassVar[ResponseCache] = ResponseCache()
+
+    name: str
+
+
+class Server:
+    def __init__(self, headers: List[Tuple[str, str]]) -> None:
+        self.headers = headers
+        self.requests: List[Request] = []
+
+    def __call__(self, request: Request) -> Response:
+        self.requests.append(request)
+
+        if request.headers.get("if-none-match") == '"v1"':
+            return Response(304, headers=self.headers)
+
+        name = request.url.path.rsplit("/", 1)[-1]
+        return Response(200, json={"name": name}, headers=self.headers)
+
+
+def setup_function() -> None:
+    CachedRequest.response_cache = ResponseCache()
+
+
+def test_cache_hit() -> None:
+    server = Server([("cache-control", "max-age=60")])
+    client = Client(transport=MockTransport(server), base_url="http://test")
+
+    first = CachedRequest(name="a").send(client)
+    second = CachedRequest(name="a").send(client)
+    other = CachedRequest(name="b").send(client)
+
+    assert first is second
+    assert other.name == "b"
+    assert len(server.requests) == 2
+    assert CachedRequest.response_cache.hits == 1
+    assert CachedRequest.response_cache.misses == 2
+
+
+@pytest.mark.asyncio
+async def test_async_cache_hit() -> None:
+    server = Server([("cache-control", "max-age=60")])
+    client = AsyncClient(transport=MockTransport(server), base_url="http://test")
+
+    first = await CachedRequest(name="a").asend(client)
+    request = CachedRequest(name="a")
+    second = await request.asend(client)
+
+    assert first is second
+    assert request.raw_response is not None
+    assert request.raw_response.status_code == 200
+    assert len(server.requests) == 1
+    assert CachedRequest.response_cache.hits == 1
+
+
+@pytest.mark.asyncio
+async def test_cache_revalidate() -> None:
+    server = Server([("cache-control", "no-cache"), ("etag", '"v1"')])
+    client = AsyncClient(transport=MockTransport(server), base_url="http://test")
+
+    request = CachedRequest(name="a")
+    first = await request.asend(client)
+    second = await request.asend(client)
+
+    assert first is second
+    assert request.raw_response is not None
+    assert request.raw_response.status_code == 200
+    assert len(server.requests) == 2
+    assert server.requests[1].headers["if-none-match"] == '"v1"'
+    assert CachedRequest.response_cache.revalidations == 1
+
+
+class OtherName(NameModel):
+    pass
+
+
+class OtherCachedRequest(CachedRequest):
+    response_model: ClassVar[Type[NameModel]] = OtherName
+
+
+def test_cache_per_model() -> None:
+    server = Server([("cache-control", "max-age=60")])
+    client = Client(transport=MockTransport(server), base_url="http://test")
+
+    # both models inherit the cache and build the same request
+    first = CachedRequest(name="a").send(client)
+    other = OtherCachedRequest(name="a").send(client)
+
+    assert type(first) is NameModel
+    assert type(other) is OtherName
+    assert OtherCachedRequest(name="a").send(client) is other
+    assert len(server.requests) == 2
+    assert len(CachedRequest.response_cache) == 2
+
+
+def test_cache_not_stored() -> None:
+    server = Server([("cache-control", "no-store")])
+    client = Client(transport=MockTransport(server), base_url="http://test")
+
+    CachedRequest(name="a").send(client)
+    CachedRequest(name="a").send(client)
+
+    assert len(server.requests) == 2
+    assert len(CachedRequest.response_cache) == 0
+
+
+def test_cache_eviction() -> None:
+    CachedRequest.response_cache = ResponseCache(max_bytes=30, default_ttl=60)
+    server = Server([])
+    client = Client(transport=MockTransport(server), base_url="http://test")
+
+    for name in ["a", "b", "a", "c"]:
+        CachedRequest(name=name).send(client)
+
+    # {"name":"a"} is 12 bytes, so only two responses fit and b is the oldest
+    assert len(CachedRequest.response_cache) == 2
+    assert CachedRequest.response_cache.size == 24
+    assert CachedRequest.response_cache.evictions == 1
+
+    CachedRequest(name="a").send(client)
+    CachedRequest(name="b").send(client)
+
+    assert [r.url.path for r in server.requests] == [
+        "/names/a",
+        "/names/b",
+        "/names/c",
+        "/names/b",
+    ]
+
+
+def test_freshness_lifetime() -> None:
+    date = "Wed, 21 Oct 2015 07:28:00 GMT"
+
+    def lifetime(*headers: Tuple[str, str]) -> object:
+        return freshness_lifetime(Response(200, headers=list(headers)), 5.0)
+
+    assert lifetime() == 5.0
+    assert lifetime(("cache-control", "max-age=60"), ("age", "10")) == 50.0
+    assert lifetime(("cache-control", "private, no-cache")) == 0.0
+    assert lifetime(("cache-control", "no-store")) is None
+    assert lifetime(("expires", "Wed, 21 Oct 2015 07:29:00 GMT"), ("date", date)) == 60
+    assert lifetime(("expires", "0")) == 0.0
+    assert lifetime(("expires", "")) == 0.0
+
+    # without a Date header the expiry is relative to now
+    remaining = lifetime(("expires", "Fri, 01 Jan 2100 00:00:00 GMT"))
+    assert isinstance(remaining, float) and remaining > 0
+
+
+def test_cache_store() -> None:
+    cache = ResponseCache(max_bytes=20, default_ttl=60)
+    request = Request("GET", "http://test/names/a")
+
+    assert cache.lookup(Request("POST", "http://test/names/a")) is None
+
+    lookup = cache.lookup(request)
+    assert lookup is not None
+
+    lookup.store(
+        Response(200, json={"name": "a"}, headers={"cache-control": "no-store"}), 1
+    )
+    lookup.store(Response(404, json={"name": "a"}), 1)
+    lookup.store(
+        Response(200, json={"name": "a"}, headers={"cache-control": "max-age=0"}), 1
+    )
+    lookup.store(Response(200, json={"name": "a" * 20}), 1)
+
+    assert len(cache) == 0
+    assert cache.size == 0
+
+    lookup.store(Response(200, json={"name": "a"}), 1)
+    lookup.store(Response(200, json={"name": "ab"}), 2)
+
+    # the second response replaced the first
+    assert len(cache) == 1
+    assert cache.size == len(b'{"name":"ab"}')
+
+    hit = cache.lookup(request)
+    assert hit is not None and hit.hit is not None
+    assert hit.hit.value == 2
+
+    cache.clear()
+
+    assert len(cache) == 0
+    assert cache.size == 0
@@ -0,0 +1,194 @@
+import time
+from typing import ClassVar
+from typing import List
+from typing import Type
+
+import pytest
+from httpx import AsyncClient
+from httpx import Client
+from httpx import ConnectError
+from httpx import HTTPStatusError
+from httpx import MockTransport
+from httpx import Request
+from httpx import Response
+
+from requestmodel import RequestModel
+from requestmodel.circuitbreaker import CLOSED
+from requestmodel.circuitbreaker import HALF_OPEN
+from requestmodel.circuitbreaker import OPEN
+from requestmodel.circuitbreaker import CircuitBreaker
+from requestmodel.circuitbreaker import CircuitBreakerOpen
+from requestmodel.circuitbreaker import HostCircuitBreaker
+from tests.fastapi_server.schema import NameModel
+
+
+class BrokenRequest(RequestModel[NameModel]):
+    method: ClassVar[str] = "GET"
+    url: ClassVar[str] = "/names/a"
+    response_model: ClassVar[Type[NameModel]] = NameModel
+
+
+class Upstream:
+    def __init__(self, status_code: int = 503) -> None:
+        self.status_code = status_code
+        self.requests: List[Request] = []
+
+    def __call__(self, request: Request) -> Response:
+        self.requests.append(request)
+        return Response(self.status_code, json={"name": "a"})
+
+
+def test_opens_on_failure_rate() -> None:
+    breaker = CircuitBreaker(failure_rate=0.5, window=4, min_calls=4)
+
+    for success in [True, False, True]:
+        breaker.record(success)
+    assert breaker.state == CLOSED
+
+    breaker.record(False)
+    assert breaker.state == OPEN
+    assert breaker.opened == 1
+
+
+def test_only_recent_outcomes_count() -> None:
+    breaker = CircuitBreaker(failure_rate=0.5, window=4, min_calls=4)
+
+    for success in [True] * 6 + [False]:
+        breaker.record(success)
+    assert breaker.state == CLOSED
+
+    breaker.record(False)
+    assert breaker.state == OPEN
+
+
+def test_half_open_probes() -> None:
+    breaker = CircuitBreaker(window=2, min_calls=1, open_timeout=0.01, probes=2)
+    request = Request("GET", "http://testserver/")
+
+    breaker.record(False)
+    with pytest.raises(CircuitBreakerOpen):
+        breaker.before(request)
+
+    time.sleep(0.01)
+    assert breaker.state == HALF_OPEN
+    assert breaker.before(request)
+    assert breaker.before(request)
+
+    with pytest.raises(CircuitBreakerOpen):
+        breaker.before(request)
+
+    breaker.record(True, probe=True)
+    assert breaker.state == HALF_OPEN
+    breaker.record(True, probe=True)
+    assert breaker.state == CLOSED
+    assert breaker.rejected == 2
+
+
+def test_failed_probe_opens_again() -> None:
+    breaker = CircuitBreaker(window=2, min_calls=1, open_timeout=0.01)
+    request = Request("GET", "http://testserver/")
+
+    breaker.record(False)
+    time.sleep(0.01)
+
+    assert breaker.before(request)
+    breaker.record(False, probe=True)
+
+    assert breaker.state == OPEN
+    assert breaker.opened == 2
+
+
+def test_late_probe_of_an_open_breaker() -> None:
+    breaker = CircuitBreaker(window=2, min_calls=1, open_timeout=0.01, probes=2)
+    request = Request("GET", "http://testserver/")
+
+    breaker.record(False)
+    time.sleep(0.01)
+    assert breaker.before(request)
+    breaker.record(None, probe=True)
+    assert breaker.state == HALF_OPEN
+
+    assert breaker.before(request)
+    assert breaker.before(request)
+
+    breaker.record(False, probe=True)
+    breaker.record(True, probe=True)
+
+    assert breaker.state == OPEN
+    assert breaker.opened == 2
+
+
+def test_other_exceptions_are_not_failures() -> None:
+    breaker = CircuitBreaker(window=1, min_calls=1)
+    request = Request("GET", "http://testserver/")
+
+    def send() -> Response:
+        raise KeyError("not a failure of the upstream")
+
+    with pytest.raises(KeyError):
+        breaker.call(request, send)
+
+    assert breaker.state == CLOSED
+    assert breaker.call(request, lambda: Response(200)).status_code == 200
+
+
+def test_transport_errors_open_the_breaker() -> None:
+    def handler(request: Request) -> Response:
+        raise ConnectError("connection refused", request=request)
+
+    BrokenRequest.circuit_breaker = CircuitBreaker(window=1, min_calls=1)
+    client = Client(transport=MockTransport(handler), base_url="http://testserver")
+
+    with pytest.raises(ConnectError):
+        BrokenRequest().send(client)
+
+    with pytest.raises(CircuitBreakerOpen):
+        BrokenRequest().send(client)
+
+
+def test_open_breaker_does_not_send() -> None:
+    BrokenRequest.circuit_breaker = CircuitBreaker(window=2, min_calls=2)
+    upstream = Upstream()
+    client = Client(transport=MockTransport(upstream), base_url="http://testserver")
+
+    for _ in range(2):
+        with pytest.raises(HTTPStatusError):
+            BrokenRequest().send(client)
+
+    with pytest.raises(CircuitBreakerOpen):
+        BrokenRequest().send(client)
+
+    assert len(upstream.requests) == 2
+
+
+@pytest.mark.asyncio
+async def test_open_breaker_does_not_asend() -> None:
+    def handler(request: Request) -> Response:
+        raise ConnectError("connection refused", request=request)
+
+    BrokenRequest.circuit_breaker = HostCircuitBreaker(window=1, min_calls=1)
+    client = AsyncClient(transport=MockTransport(handler), base_url="http://testserver")
+
+    with pytest.raises(ConnectError):
+        await BrokenRequest().asend(client)
+
+    with pytest.raises(CircuitBreakerOpen):
+        await BrokenRequest().asend(client)
+
+    request = Request("GET", "http://testserver/names/a")
+    assert BrokenRequest.circuit_breaker.for_request(request).state == OPEN
+
+
+@pytest.mark.asyncio
+async def test_healthy_upstream_keeps_the_breaker_closed() -> None:
+    BrokenRequest.circuit_breaker = CircuitBreaker(window=2, min_calls=2)
+    upstream = Upstream(200)
+    client = AsyncClient(
+        transport=MockTransport(upstream), base_url="http://testserver"
+    )
+
+    for _ in range(3):
+        assert await BrokenRequest().asend(client) == NameModel(name="a")
+
+    assert BrokenRequest.circuit_breaker.state == CLOSED
+    assert len(upstream.requests) == 3
@@ -0,0 +1,232 @@
+import gzip
+import json
+import threading
+from typing import AsyncIterator
+from typing import ClassVar
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Type
+
+import pytest
+import requests
+from httpx import AsyncClient
+from httpx import Client
+from httpx import MockTransport
+from httpx import Request
+from httpx import Response
+from typing_extensions import Annotated
+from werkzeug.serving import make_server
+
+from requestmodel import RequestModel
+from requestmodel import params
+from requestmodel.adapters.requests import RequestsRequestModel
+from requestmodel.compression import ACCEPT_ENCODING
+from requestmodel.compression import ENCODERS
+from requestmodel.compression import Compression
+from tests.fastapi_server.schema import NameModel
+from tests.flask_server import app as flask_app
+
+
+class Names(NameModel):
+    names: List[str]
+
+
+class CompressedRequest(RequestModel[NameModel]):
+    method: ClassVar[str] = "POST"
+    url: ClassVar[str] = "/names"
+    response_model: ClassVar[Type[NameModel]] = NameModel
+    compression: ClassVar[Optional[Compression]] = Compression(threshold=100)
+
+    content_type: Annotated[str, params.Header()] = "application/json"
+    body: Annotated[Names, params.Body()]
+
+
+def names(count: int) -> Names:
+    return Names(name="names", names=[f"name {n}" for n in range(count)])
+
+
+def handler(request: Request) -> Response:
+    """Answer with the encoding and the number of names, gzip encoded"""
+    content = request.read()
+
+    if request.headers.get("content-encoding") == "gzip":
+        content = gzip.decompress(content)
+
+    count = len(json.loads(content)["names"])
+    encoding = request.headers.get("content-encoding", "identity")
+    body = json.dumps({"name": f"{encoding} {count}"}).encode()
+
+    return Response(
+        200,
+        content=gzip.compress(body),
+        headers={
+            "content-encoding": "gzip",
+            "x-accept": request.headers["accept-encoding"],
+        },
+    )
+
+
+client = Client(transport=MockTransport(handler), base_url="http://test")
+
+
+def test_compress_large_body() -> None:
+    model = CompressedRequest(body=names(1000))
+
+    assert model.send(client) == NameModel(name="gzip 1000")
+    assert model.raw_response is not None
+    assert model.raw_response.request.headers["accept-encoding"] == ACCEPT_ENCODING
+    assert model.raw_response.headers["x-accept"] == ACCEPT_ENCODING
+
+
+def test_small_body_is_not_compressed() -> None:
+    assert CompressedRequest(body=names(1)).send(client) == NameModel(name="identity 1")
+
+
+def test_compression_level() -> None:
+    compression = Compression(level=1)
+    request = Request("POST", "http://test", content=b"a" * 10_000)
+
+    compressed = compression.compress(request)
+
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert compressed.headers["content-length"] == str(len(compressed.content))
+    assert gzip.decompress(compressed.content) == b"a" * 10_000
+    assert compression.compressed == 1
+    assert compression.bytes_in == 10_000
+    assert compression.bytes_out == len(compressed.content)
+
+    encoded = Request("POST", "http://test", content=b"a" * 10_000)
+    encoded.headers["content-encoding"] = "br"
+
+    assert compression.compress(encoded) is encoded
+
+
+@pytest.mark.asyncio
+async def test_bodies_sent_as_they_are() -> None:
+    async def stream() -> AsyncIterator[bytes]:
+        yield b"a" * 10_000  # pragma: no cover
+
+    compression = Compression(threshold=100)
+    streaming = Request("POST", "http://test", content=stream())
+    small = Request("POST", "http://test", content=b"a")
+
+    assert compression.compress(streaming) is streaming
+    assert await compression.acompress(small) is small
+    assert small.headers["accept-encoding"] == ACCEPT_ENCODING
+    assert compression.compressed == 0
+
+    untouched = Request("POST", "http://test", content=b"a")
+    assert Compression(accept=None).compress(untouched) is untouched
+    assert "accept-encoding" not in untouched.headers
+
+
+def test_unavailable_encoding() -> None:
+    with pytest.raises(ValueError, match="not available"):
+        Compression(encoding="lzma")
+
+
+@pytest.mark.skipif("zstd" not in ENCODERS, reason="zstandard is not installed")
+def test_zstd() -> None:  # pragma: no cover
+    import zstandard
+
+    request = Request("POST", "http://test", content=b"a" * 10_000)
+    compressed = Compression(encoding="zstd").compress(request)
+
+    assert compressed.headers["content-encoding"] == "zstd"
+    decompressor = zstandard.ZstdDecompressor()
+    assert decompressor.decompress(compressed.content) == b"a" * 10_000
+
+
+@pytest.mark.asyncio
+async def test_asend_compresses_off_the_event_loop() -> None:
+    threads = []
+
+    class RecordingCompression(Compression):
+        def encode(self, data: bytes) -> bytes:
+            threads.append(threading.get_ident())
+            return super().encode(data)
+
+    class OffloadedRequest(CompressedRequest):
+        compression: ClassVar[Optional[Compression]] = RecordingCompression(
+            threshold=100, offload_threshold=10_000
+        )
+
+    async def async_handler(request: Request) -> Response:
+        await request.aread()
+        return handler(request)
+
+    async_client = AsyncClient(
+        transport=MockTransport(async_handler), base_url="http://test"
+    )
+
+    assert await OffloadedRequest(body=names(10)).asend(async_client) == NameModel(
+        name="gzip 10"
+    )
+    assert await OffloadedRequest(body=names(1000)).asend(async_client) == NameModel(
+        name="gzip 1000"
+    )
+
+    assert threads[0] == threading.get_ident()
+    assert threads[1] != threading.get_ident()
+
+
+class RequestsCompressed(RequestsRequestModel[NameModel]):
+    method: ClassVar[str] = "POST"
+    url: ClassVar[str] = "http://test/names"
+    response_model: ClassVar[Type[NameModel]] = NameModel
+    encode_json_body: ClassVar[bool] = True
+    compression: ClassVar[Optional[Compression]] = Compression(threshold=100)
+
+    content_type: Annotated[str, params.Header()] = "application/json"
+    body: Annotated[Names, params.Body()]
+
+
+@pytest.fixture
+def flask_server() -> Iterator[str]:
+    httpd = make_server("127.0.0.1", 0, flask_app, threaded=True)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+
+    yield f"http://127.0.0.1:{httpd.server_port}"
+
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_requests_compression() -> None:
+    request = RequestsCompressed(body=names(1000)).as_request().prepare()
+    assert RequestsCompressed.compression is not None
+    RequestsCompressed.compression.compress_prepared(request)
+
+    assert isinstance(request.body, bytes)
+    assert request.headers["Content-Encoding"] == "gzip"
+    assert request.headers["Content-Length"] == str(len(request.body))
+    assert len(json.loads(gzip.decompress(request.body))["names"]) == 1000
+
+
+def test_requests_text_body() -> None:
+    compression = Compression(threshold=100)
+    text = requests.Request("POST", "http://test", data="a" * 1000).prepare()
+    small = requests.Request("POST", "http://test", data="a").prepare()
+
+    compression.compress_prepared(text)
+    compression.compress_prepared(small)
+
+    assert isinstance(text.body, bytes)
+    assert gzip.decompress(text.body) == b"a" * 1000
+    assert small.body == "a"
+    assert "Content-Encoding" not in small.headers
+
+
+def test_requests_send_compressed(
+    flask_server: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(RequestsCompressed, "url", f"{flask_server}/names")
+
+    with requests.Session() as session:
+        large = RequestsCompressed(body=names(1000)).send(session)
+        small = RequestsCompressed(body=names(1)).send(session)
+
+    assert large == NameModel(name="gzip 1000")
+    assert small == NameModel(name="identity 1")
@@ -0,0 +1,171 @@
+import asyncio
+import time
+from typing import ClassVar
+from typing import Type
+
+import pytest
+from httpx import AsyncClient
+from httpx import HTTPStatusError
+from httpx import MockTransport
+from httpx import ReadTimeout
+from httpx import Request
+from httpx import Response
+
+from requestmodel import RequestModel
+from requestmodel.concurrency import AdaptiveLimiter
+from tests.fastapi_server.schema import NameModel
+
+
+class LimitedRequest(RequestModel[NameModel]):
+    method: ClassVar[str] = "GET"
+    url: ClassVar[str] = "/names/a"
+    response_model: ClassVar[Type[NameModel]] = NameModel
+
+
+class TimeoutRequest(LimitedRequest):
+    url: ClassVar[str] = "/timeout"
+
+
+def test_additive_increase() -> None:
+    limiter = AdaptiveLimiter(initial_limit=2)
+
+    for _ in range(4):
+        limiter.in_flight = 2
+        limiter.sample(time.monotonic(), 0.01)
+
+    assert limiter.limit == 3
+    assert limiter.in_flight == 1
+
+
+def test_no_increase_when_window_is_unused() -> None:
+    limiter = AdaptiveLimiter(initial_limit=10)
+
+    for _ in range(20):
+        limiter.in_flight = 1
+        limiter.sample(time.monotonic(), 0.01)
+
+    assert limiter.limit == 10
+
+
+def test_multiplicative_decrease_once_per_event() -> None:
+    limiter = AdaptiveLimiter(initial_limit=16)
+    started = time.monotonic()
+
+    limiter.in_flight = 3
+    for _ in range(3):
+        limiter.sample(started, 0.01, dropped=True)
+
+    assert limiter.limit == 8
+    assert limiter.drops == 3
+
+    limiter.in_flight = 1
+    limiter.sample(time.monotonic(), 0.01, dropped=True)
+    assert limiter.limit == 4
+
+
+def test_latency_spike_cuts_limit() -> None:
+    limiter = AdaptiveLimiter(initial_limit=10, tolerance=2)
+    limiter.in_flight = 2
+
+    limiter.sample(time.monotonic(), 0.01)
+    limiter.sample(time.monotonic(), 0.05)
+
+    assert limiter.limit == 5
+
+
+@pytest.mark.asyncio
+async def test_waiters_are_served_in_order() -> None:
+    limiter = AdaptiveLimiter(initial_limit=1)
+    order = []
+
+    async def take(i: int) -> None:
+        await limiter.acquire()
+        order.append(i)
+
+    await limiter.acquire()
+    tasks = [asyncio.ensure_future(take(i)) for i in range(3)]
+    await asyncio.sleep(0)
+
+    cancelled = tasks.pop(1)
+    cancelled.cancel()
+
+    limiter.release()
+    await asyncio.sleep(0)
+    limiter.release()
+    await asyncio.gather(*tasks)
+
+    assert order == [0, 2]
+    assert limiter.in_flight == 1
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_hands_the_slot_on() -> None:
+    limiter = AdaptiveLimiter(initial_limit=1)
+    await limiter.acquire()
+
+    waiter = asyncio.ensure_future(limiter.acquire())
+    following = asyncio.ensure_future(limiter.acquire())
+    await asyncio.sleep(0)
+
+    # the slot is handed over, then the waiter is cancelled before it resumes
+    limiter.release()
+    waiter.cancel()
+
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+
+    await following
+    assert limiter.in_flight == 1
+
+
+@pytest.mark.asyncio
+async def test_cancelled_call_releases_its_slot() -> None:
+    limiter = AdaptiveLimiter(initial_limit=1)
+    started = asyncio.Event()
+
+    async def send() -> Response:
+        started.set()
+        await asyncio.sleep(10)
+        return Response(200)  # pragma: no cover
+
+    # a hedge loser is cancelled while it waits for the upstream
+    loser = asyncio.ensure_future(limiter.acall(send))
+    await started.wait()
+    loser.cancel()
+
+    with pytest.raises(asyncio.CancelledError):
+        await loser
+
+    assert limiter.in_flight == 0
+    assert limiter.drops == 0
+    assert limiter.latency is None
+
+
+@pytest.mark.asyncio
+async def test_asend_adapts_to_upstream() -> None:
+    statuses = iter([200, 200, 503, 200])
+
+    async def handler(request: Request) -> Response:
+        if request.url.path.endswith("timeout"):
+            raise ReadTimeout("timeout", request=request)
+        return Response(next(statuses), json={"name": "a"})
+
+    # no latency spikes, only the 503 and the timeout cut the limit
+    LimitedRequest.concurrency_limiter = AdaptiveLimiter(
+        initial_limit=8, tolerance=float("inf")
+    )
+    client = AsyncClient(transport=MockTransport(handler), base_url="http://testserver")
+
+    await LimitedRequest().asend(client)
+    await LimitedRequest().asend(client)
+
+    with pytest.raises(HTTPStatusError):
+        await LimitedRequest().asend(client)
+
+    assert LimitedRequest.concurrency_limiter.limit == 4
+
+    with pytest.raises(ReadTimeout):
+        await TimeoutRequest().asend(client)
+
+    assert LimitedRequest.concurrency_limiter.limit == 2
+    assert LimitedRequest.concurrency_limiter.in_flight == 0
@@ -0,0 +1,176 @@
+import asyncio
+from typing import AsyncIterator
+from typing import ClassVar
+from typing import List
+from typing import Type
+
+import pytest
+from httpx import AsyncClient
+from httpx import ConnectError
+from httpx import MockTransport
+from httpx import Request
+from httpx import Response
+
+from requestmodel import RequestModel
+from requestmodel.hedge import Hedge
+from tests.fastapi_server.schema import NameModel
+
+
+class HedgedRequest(RequestModel[NameModel]):
+    method: ClassVar[str] = "GET"
+    url: ClassVar[str] = "/names/a"
+    response_model: ClassVar[Type[NameModel]] = NameModel
+
+
+class HedgedPostRequest(HedgedRequest):
+    method: ClassVar[str] = "POST"
+
+
+class SlowReplica:
+    """Answer the first request after ``slow`` seconds, the others at once"""
+
+    def __init__(self, slow: float) -> None:
+        self.slow = slow
+        self.requests: List[Request] = []
+        self.cancelled = 0
+
+    async def __call__(self, request: Request) -> Response:
+        self.requests.append(request)
+
+        try:
+            if len(self.requests) == 1:
+                await asyncio.sleep(self.slow)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+
+        return Response(200, json={"name": str(len(self.requests))})
+
+
+def make_client(handler: SlowReplica) -> AsyncClient:
+    return AsyncClient(transport=MockTransport(handler), base_url="http://test")
+
+
+@pytest.mark.asyncio
+async def test_hedge_wins() -> None:
+    HedgedRequest.hedge = Hedge(delay=0.01, max_rate=1)
+    replica = SlowReplica(slow=1)
+
+    response = await HedgedRequest().asend(make_client(replica))
+
+    assert response.name == "2"
+    assert len(replica.requests) == 2
+    assert replica.cancelled == 1
+    assert HedgedRequest.hedge.issued == 1
+    assert HedgedRequest.hedge.won == 1
+
+
+@pytest.mark.asyncio
+async def test_fast_response_is_not_hedged() -> None:
+    HedgedRequest.hedge = Hedge(delay=0.5, max_rate=1)
+    replica = SlowReplica(slow=0)
+
+    response = await HedgedRequest().asend(make_client(replica))
+
+    assert response.name == "1"
+    assert HedgedRequest.hedge.issued == 0
+
+
+@pytest.mark.asyncio
+async def test_hedge_rate_is_capped() -> None:
+    HedgedRequest.hedge = Hedge(delay=0.01, max_rate=0.5)
+
+    for _ in range(4):
+        await HedgedRequest().asend(make_client(SlowReplica(slow=0.05)))
+
+    assert HedgedRequest.hedge.requests == 4
+    assert HedgedRequest.hedge.issued == 2
+
+
+@pytest.mark.asyncio
+async def test_post_is_not_hedged() -> None:
+    HedgedPostRequest.hedge = Hedge(delay=0.01, max_rate=1)
+    replica = SlowReplica(slow=0.05)
+
+    response = await HedgedPostRequest().asend(make_client(replica))
+
+    assert response.name == "1"
+    assert HedgedPostRequest.hedge.requests == 0
+
+
+@pytest.mark.asyncio
+async def test_no_hedge_before_latencies_are_known() -> None:
+    HedgedRequest.hedge = Hedge(max_rate=1)
+    replica = SlowReplica(slow=0.05)
+
+    response = await HedgedRequest().asend(make_client(replica))
+
+    assert response.name == "1"
+    assert HedgedRequest.hedge.issued == 0
+    assert HedgedRequest.hedge.requests == 1
+
+
+@pytest.mark.asyncio
+async def test_both_attempts_fail() -> None:
+    async def handler(request: Request) -> Response:
+        if not replica.requests:
+            replica.requests.append(request)
+            await asyncio.sleep(0.05)
+        raise ConnectError("connection refused", request=request)
+
+    HedgedRequest.hedge = Hedge(delay=0.01, max_rate=1)
+    replica = SlowReplica(slow=0)
+    client = AsyncClient(transport=MockTransport(handler), base_url="http://test")
+
+    with pytest.raises(ConnectError):
+        await HedgedRequest().asend(client)
+
+    assert HedgedRequest.hedge.issued == 1
+
+
+@pytest.mark.asyncio
+async def test_late_response_of_the_loser_is_closed() -> None:
+    hedge = Hedge(delay=0.01, max_rate=1)
+    request = Request("GET", "http://test/names/a")
+    first_sent = asyncio.Event()
+    responses: List[Response] = []
+
+    async def body() -> AsyncIterator[bytes]:
+        yield b"{}"  # pragma: no cover
+
+    async def send() -> Response:
+        response = Response(200, content=body())
+        responses.append(response)
+
+        if len(responses) == 1:
+            await first_sent.wait()
+        else:
+            # both attempts complete before the hedge looks at them
+            first_sent.set()
+
+        return response
+
+    winner = await hedge.acall(request, send)
+
+    assert len(responses) == 2
+    assert [response.is_closed for response in responses].count(True) == 1
+    assert not winner.is_closed
+
+
+def test_streaming_body_is_not_hedged() -> None:
+    async def body() -> AsyncIterator[bytes]:
+        yield b"once"  # pragma: no cover
+
+    hedge = Hedge()
+    assert hedge.hedgeable(Request("PUT", "http://test/", content=b"again"))
+    assert not hedge.hedgeable(Request("PUT", "http://test/", content=body()))
+
+
+def test_percentile_delay() -> None:
+    hedge = Hedge(percentile=90)
+    assert hedge.delay_for() is None
+
+    for latency in range(1, 11):
+        hedge.observe(latency / 100)
+
+    assert hedge.delay_for() == 0.09
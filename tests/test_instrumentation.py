@@ -0,0 +1,240 @@
+import logging
+from typing import Any
+from typing import AsyncIterator
+from typing import ClassVar
+from typing import Dict
+from typing import List
+from typing import Type
+
+import pytest
+import requests
+from httpx import AsyncClient
+from httpx import Client
+from httpx import HTTPStatusError
+from httpx import MockTransport
+from httpx import Request
+from httpx import Response
+from requests.adapters import BaseAdapter
+from typing_extensions import Annotated
+
+from requestmodel import RequestModel
+from requestmodel import params
+from requestmodel.adapters.requests import RequestsRequestModel
+from requestmodel.instrumentation import Instrumentation
+from requestmodel.instrumentation import Instrumentations
+from requestmodel.instrumentation import PhaseEvent
+from requestmodel.instrumentation import SlowRequestLogger
+from requestmodel.instrumentation import TracingInstrumentation
+from requestmodel.instrumentation import content_length
+from requestmodel.metrics import MetricsInstrumentation
+from requestmodel.metrics import MetricsRegistry
+from tests.fastapi_server.schema import NameModel
+
+
+class Recorder(Instrumentation):
+    def __init__(self) -> None:
+        self.started: List[str] = []
+        self.ended: List[PhaseEvent] = []
+
+    def phase_start(self, event: PhaseEvent) -> None:
+        self.started.append(event.phase)
+
+    def phase_end(self, event: PhaseEvent) -> None:
+        self.ended.append(event)
+
+
+class InstrumentedRequest(RequestModel[NameModel]):
+    method: ClassVar[str] = "POST"
+    url: ClassVar[str] = "/names/{name}"
+    response_model: ClassVar[Type[NameModel]] = NameModel
+
+    name: str
+    body: Annotated[Dict[str, str], params.Body()]
+
+
+def handler(request: Request) -> Response:
+    if request.url.path.endswith("missing"):
+        return Response(404)
+
+    return Response(200, json={"name": "a"})
+
+
+def client() -> Client:
+    return Client(transport=MockTransport(handler), base_url="http://testserver")
+
+
+def test_content_length() -> None:
+    async def stream() -> AsyncIterator[bytes]:
+        yield b"ab"  # pragma: no cover
+
+    prepared = requests.Request("POST", "http://testserver", data=b"abc").prepare()
+    del prepared.headers["Content-Length"]
+
+    assert content_length(None) is None
+    assert content_length(Request("POST", "http://testserver", content=b"ab")) == 2
+    assert (
+        content_length(Request("POST", "http://testserver", content=stream())) is None
+    )
+    assert content_length(prepared) == 3
+    assert content_length(requests.Request("GET", "http://testserver").prepare()) == 0
+
+
+def test_phases() -> None:
+    recorder = Recorder()
+    InstrumentedRequest.instrumentation = recorder
+
+    InstrumentedRequest(name="a", body={"a": "b"}).send(client())
+
+    assert recorder.started == ["build", "send", "validate"]
+    assert [event.phase for event in recorder.ended] == recorder.started
+
+    build, send, validate = recorder.ended
+
+    assert build.model is InstrumentedRequest
+    assert build.method == "POST"
+    assert build.url == "/names/{name}"
+    assert send.bytes_out == len(b"a=b")
+    assert send.bytes_in == 12
+    assert send.status_code == validate.status_code == 200
+    assert all(event.duration is not None for event in recorder.ended)
+
+
+@pytest.mark.asyncio
+async def test_async_phases() -> None:
+    recorder = Recorder()
+    InstrumentedRequest.instrumentation = recorder
+    async_client = AsyncClient(
+        transport=MockTransport(handler), base_url="http://testserver"
+    )
+
+    with pytest.raises(HTTPStatusError):
+        await InstrumentedRequest(name="missing", body={}).asend(async_client)
+
+    assert recorder.started == ["build", "send", "validate"]
+    assert isinstance(recorder.ended[-1].error, HTTPStatusError)
+    assert recorder.ended[-1].status_code == 404
+
+
+def test_slow_request_logger(caplog: pytest.LogCaptureFixture) -> None:
+    InstrumentedRequest.instrumentation = SlowRequestLogger(threshold=0)
+
+    with caplog.at_level(logging.WARNING, logger="requestmodel"):
+        InstrumentedRequest(name="a", body={}).send(client())
+
+    assert len(caplog.records) == 3
+    assert (
+        caplog.records[1]
+        .getMessage()
+        .startswith("InstrumentedRequest POST /names/{name}: send took")
+    )
+
+    caplog.clear()
+    InstrumentedRequest.instrumentation = SlowRequestLogger(threshold=60)
+
+    with caplog.at_level(logging.WARNING, logger="requestmodel"):
+        InstrumentedRequest(name="a", body={}).send(client())
+
+    assert not caplog.records
+
+
+def test_default_instrumentation_does_nothing() -> None:
+    InstrumentedRequest.instrumentation = Instrumentation()
+
+    assert InstrumentedRequest(name="a", body={}).send(client()).name == "a"
+
+
+class FakeSpan:
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.attributes: Dict[str, Any] = {}
+        self.ended = False
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def record_exception(self, exception: BaseException) -> None:
+        self.attributes["exception"] = exception
+
+    def end(self) -> None:
+        self.ended = True
+
+
+class FakeTracer:
+    def __init__(self) -> None:
+        self.spans: List[FakeSpan] = []
+
+    def start_span(self, name: str) -> FakeSpan:
+        self.spans.append(FakeSpan(name))
+        return self.spans[-1]
+
+
+def test_tracing() -> None:
+    tracer = FakeTracer()
+    InstrumentedRequest.instrumentation = TracingInstrumentation(tracer)
+
+    InstrumentedRequest(name="a", body={}).send(client())
+
+    assert [span.name for span in tracer.spans] == [
+        "InstrumentedRequest build",
+        "InstrumentedRequest send",
+        "InstrumentedRequest validate",
+    ]
+    assert all(span.ended for span in tracer.spans)
+    assert tracer.spans[1].attributes["http.response.status_code"] == 200
+    assert tracer.spans[1].attributes["url.template"] == "/names/{name}"
+
+    with pytest.raises(HTTPStatusError):
+        InstrumentedRequest(name="missing", body={}).send(client())
+
+    assert isinstance(tracer.spans[-1].attributes["exception"], HTTPStatusError)
+    assert "exception" not in tracer.spans[-2].attributes
+
+
+def test_instrumentations() -> None:
+    recorder = Recorder()
+    tracer = FakeTracer()
+    metrics = MetricsInstrumentation(MetricsRegistry())
+    InstrumentedRequest.instrumentation = Instrumentations(
+        TracingInstrumentation(tracer), recorder, metrics
+    )
+
+    InstrumentedRequest(name="a", body={}).send(client())
+
+    assert recorder.started == ["build", "send", "validate"]
+    assert [event.phase for event in recorder.ended] == recorder.started
+    assert all(span.ended for span in tracer.spans)
+    assert tracer.spans[1].attributes["http.response.status_code"] == 200
+    assert metrics.requests.value("InstrumentedRequest", "POST", "200") == 1
+
+
+class FakeAdapter(BaseAdapter):
+    def send(  # type: ignore[override]
+        self, request: requests.PreparedRequest, **kwargs: Any
+    ) -> requests.Response:
+        response = requests.Response()
+        response.status_code = 200
+        response._content = b'{"name": "a"}'
+        response.request = request
+        return response
+
+    def close(self) -> None:
+        pass
+
+
+class InstrumentedRequestsModel(RequestsRequestModel[NameModel]):
+    method: ClassVar[str] = "GET"
+    url: ClassVar[str] = "http://testserver/names/a"
+    response_model: ClassVar[Type[NameModel]] = NameModel
+
+
+def test_requests_phases() -> None:
+    recorder = Recorder()
+    InstrumentedRequestsModel.instrumentation = recorder
+    with requests.Session() as session:
+        session.mount("http://", FakeAdapter())
+
+        assert InstrumentedRequestsModel().send(session).name == "a"
+
+    assert recorder.started == ["build", "send", "validate"]
+    assert recorder.ended[1].status_code == 200
+    assert recorder.ended[1].bytes_in == 13
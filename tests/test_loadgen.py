@@ -0,0 +1,190 @@
+import argparse
+import io
+from pathlib import Path
+from typing import Any
+from typing import ClassVar
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Type
+
+import pytest
+from httpx import AsyncClient
+from httpx import ConnectError
+from httpx import MockTransport
+from httpx import Request
+from httpx import Response
+
+from requestmodel import RequestModel
+from requestmodel.loadgen import LoadStats
+from requestmodel.loadgen import import_object
+from requestmodel.loadgen import load_params
+from requestmodel.loadgen import main
+from requestmodel.loadgen import parse_header
+from requestmodel.loadgen import percentile
+from requestmodel.loadgen import run
+from tests.fastapi_server.schema import NameModel
+
+
+class LoadRequest(RequestModel[NameModel]):
+    method: ClassVar[str] = "GET"
+    url: ClassVar[str] = "/names/{name}"
+    response_model: ClassVar[Type[NameModel]] = NameModel
+
+    name: str
+
+
+class PingRequest(RequestModel[NameModel]):
+    method: ClassVar[str] = "GET"
+    url: ClassVar[str] = "/names/ping"
+    response_model: ClassVar[Type[NameModel]] = NameModel
+
+
+def handler(request: Request) -> Response:
+    name = request.url.path.rsplit("/", 1)[-1]
+
+    if name == "broken":
+        return Response(503)
+
+    if name == "down":
+        raise ConnectError("connection refused", request=request)
+
+    if "x-token" in request.headers:
+        name = request.headers["x-token"]
+
+    return Response(200, json={"name": name})
+
+
+def make_client() -> AsyncClient:
+    return AsyncClient(transport=MockTransport(handler), base_url="http://test")
+
+
+def test_import_object() -> None:
+    assert import_object("tests.test_loadgen:LoadRequest") is LoadRequest
+    assert import_object("tests.test_loadgen.LoadRequest") is LoadRequest
+    assert import_object("requestmodel.loadgen:LoadStats.record") is (LoadStats.record)
+
+
+def test_load_params(tmp_path: Path) -> None:
+    path = tmp_path / "params.jsonl"
+    path.write_text('{"name": "a"}\n\n{"name": "b"}\n')
+
+    assert load_params(str(path)) == [{"name": "a"}, {"name": "b"}]
+
+
+def test_percentile() -> None:
+    latencies = [float(n) for n in range(1, 101)]
+
+    assert percentile(latencies, 50) == 51
+    assert percentile(latencies, 99) == 100
+    assert percentile([], 99) == 0
+
+
+def test_parse_header() -> None:
+    assert parse_header("X-Token: abc") == ("X-Token", "abc")
+
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_header("X-Token")
+
+
+@pytest.mark.asyncio
+async def test_open_loop() -> None:
+    out = io.StringIO()
+
+    stats = await run(
+        LoadRequest,
+        [{"name": "a"}, {"name": "broken"}],
+        make_client(),
+        duration=0.2,
+        rate=50,
+        interval=0.1,
+        out=out,
+    )
+
+    assert stats.completed == 10
+    assert len(stats.latencies) == 5
+    assert stats.errors == {"HTTP 503": 5}
+    assert "req/s" in out.getvalue()
+    assert "HTTP 503" in out.getvalue()
+
+
+@pytest.mark.asyncio
+async def test_closed_loop_ends_with_params() -> None:
+    def params() -> Iterator[Dict[str, str]]:
+        for name in "abc":
+            yield {"name": name}
+
+    stats = await run(
+        LoadRequest,
+        params(),
+        make_client(),
+        duration=5,
+        concurrency=2,
+        out=io.StringIO(),
+    )
+
+    assert stats.completed == 3
+    assert not stats.errors
+
+
+@pytest.mark.asyncio
+async def test_closed_loop_ends_at_the_deadline() -> None:
+    stats = await run(
+        LoadRequest,
+        [{"name": "down"}],
+        make_client(),
+        duration=0.05,
+        concurrency=2,
+        out=io.StringIO(),
+    )
+
+    assert stats.completed > 2
+    assert stats.errors == {"ConnectError": stats.completed}
+    assert not stats.latencies
+
+
+@pytest.mark.asyncio
+async def test_open_loop_ends_with_params() -> None:
+    out = io.StringIO()
+
+    stats = await run(
+        LoadRequest, iter([{"name": "a"}]), make_client(), 5, rate=1000, out=out
+    )
+
+    assert stats.completed == 1
+
+    stats = await run(LoadRequest, [], make_client(), 5, rate=1000, out=out)
+
+    assert stats.completed == 0
+
+
+def mock_async_client(**kwargs: Any) -> AsyncClient:
+    return AsyncClient(transport=MockTransport(handler), **kwargs)
+
+
+def make_params() -> List[Dict[str, str]]:
+    return [{"name": "factory"}]
+
+
+def test_main(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    monkeypatch.setattr("requestmodel.loadgen.AsyncClient", mock_async_client)
+    path = tmp_path / "params.jsonl"
+    path.write_text('{"name": "a"}\n{"name": "broken"}\n')
+
+    argv = ["tests.test_loadgen:LoadRequest", "--base-url", "http://test"]
+    options = ["--duration", "0.1", "--interval", "0.05"]
+
+    assert main(argv + options + ["--params", str(path), "--rate", "40"]) == 0
+    output = capsys.readouterr().out
+    assert "requests   4 in" in output
+    assert "HTTP 503" in output
+
+    factory = ["--params-factory", "tests.test_loadgen:make_params"]
+    assert main(argv + options + factory + ["--concurrency", "2"]) == 0
+    assert "errors     0 (0.00%)" in capsys.readouterr().out
+
+    ping = ["tests.test_loadgen:PingRequest", "--base-url", "http://test"]
+    assert main(ping + options + ["--rate", "20", "--header", "X-Token: down"]) == 0
+    assert "errors     0 (0.00%)" in capsys.readouterr().out
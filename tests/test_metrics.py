@@ -0,0 +1,152 @@
+from typing import ClassVar
+from typing import Type
+
+import pytest
+from httpx import Client
+from httpx import ConnectError
+from httpx import HTTPStatusError
+from httpx import MockTransport
+from httpx import Request
+from httpx import Response
+
+from requestmodel import RequestModel
+from requestmodel.instrumentation import SEND
+from requestmodel.metrics import Counter
+from requestmodel.metrics import Histogram
+from requestmodel.metrics import MetricsInstrumentation
+from requestmodel.metrics import MetricsRegistry
+from requestmodel.retry import Retry
+from requestmodel.retry import RetryBudget
+from tests.fastapi_server.schema import NameModel
+
+
+class MeasuredRequest(RequestModel[NameModel]):
+    method: ClassVar[str] = "GET"
+    url: ClassVar[str] = "/names/{name}"
+    response_model: ClassVar[Type[NameModel]] = NameModel
+    retry: ClassVar[Retry] = Retry(attempts=2, backoff=0, budget=RetryBudget())
+
+    name: str
+
+
+def test_counter() -> None:
+    counter = Counter("test_total", "Test", ("a",))
+
+    counter.inc("x")
+    counter.inc("x", amount=2)
+
+    assert counter.value("x") == 3
+    assert counter.value("y") == 0
+
+
+def test_histogram_buckets() -> None:
+    histogram = Histogram("test_seconds", "Test", buckets=(0.1, 1))
+
+    for value in [0.05, 0.1, 0.5, 5]:
+        histogram.observe(value)
+
+    assert histogram.count() == 4
+    assert list(histogram.samples()) == [
+        ("test_seconds_bucket", ("le",), ("0.1",), 2),
+        ("test_seconds_bucket", ("le",), ("1",), 3),
+        ("test_seconds_bucket", ("le",), ("+Inf",), 4),
+        ("test_seconds_sum", (), (), 5.65),
+        ("test_seconds_count", (), (), 4),
+    ]
+
+
+def test_registry_reuses_metrics() -> None:
+    registry = MetricsRegistry()
+    counter = registry.counter("test_total", "Test")
+
+    assert registry.counter("test_total", "Test") is counter
+
+    with pytest.raises(
+        ValueError, match="test_total is already registered as a counter"
+    ):
+        registry.histogram("test_total", "Test")
+
+    histogram = registry.histogram("test_seconds", "Test")
+
+    assert registry.histogram("test_seconds", "Test") is histogram
+
+    with pytest.raises(ValueError, match="already registered as a histogram"):
+        registry.counter("test_seconds", "Test")
+
+
+def test_render() -> None:
+    registry = MetricsRegistry()
+    registry.counter("test_total", "Test", ("path",)).inc('a"\\b')
+    registry.histogram("test_seconds", "Latency", buckets=(1,)).observe(0.5)
+
+    assert registry.render() == (
+        "# HELP test_total Test\n"
+        "# TYPE test_total counter\n"
+        'test_total{path="a\\"\\\\b"} 1\n'
+        "# HELP test_seconds Latency\n"
+        "# TYPE test_seconds histogram\n"
+        'test_seconds_bucket{le="1"} 1\n'
+        'test_seconds_bucket{le="+Inf"} 1\n'
+        "test_seconds_sum 0.5\n"
+        "test_seconds_count 1\n"
+    )
+
+
+def test_metrics_instrumentation() -> None:
+    failures = iter([503, 200, 404])
+
+    def handler(request: Request) -> Response:
+        return Response(next(failures), json={"name": "a"})
+
+    registry = MetricsRegistry()
+    metrics = MetricsInstrumentation(registry)
+    MeasuredRequest.instrumentation = metrics
+    client = Client(transport=MockTransport(handler), base_url="http://testserver")
+
+    MeasuredRequest(name="a").send(client)
+
+    with pytest.raises(HTTPStatusError):
+        MeasuredRequest(name="b").send(client)
+
+    model = "MeasuredRequest"
+    assert metrics.requests.value(model, "GET", "200") == 1
+    assert metrics.requests.value(model, "GET", "404") == 1
+    assert metrics.retries.value(model) == 1
+    assert metrics.errors.value(model, "validate", "HTTPStatusError") == 1
+    assert metrics.latency.count(model) == 2
+    assert metrics.validation.count(model) == 2
+    assert metrics.size.count(model) == 2
+
+    rendered = registry.render()
+    assert 'requestmodel_requests_total{model="MeasuredRequest"' in rendered
+    assert "# TYPE requestmodel_response_size_bytes histogram" in rendered
+
+
+def test_metrics_without_response_or_size() -> None:
+    def handler(request: Request) -> Response:
+        if request.url.path.endswith("down"):
+            raise ConnectError("connection refused", request=request)
+
+        # streamed without a Content-Length, the size is not known up front
+        return Response(200, content=iter([b'{"name": "a"}']))
+
+    metrics = MetricsInstrumentation(MetricsRegistry())
+    MeasuredRequest.instrumentation = metrics
+    client = Client(transport=MockTransport(handler), base_url="http://testserver")
+
+    with pytest.raises(ConnectError):
+        MeasuredRequest(name="down").send(client)
+
+    streamed = MeasuredRequest(name="a")
+    phase = streamed.phase(SEND, Request("GET", "http://testserver/names/a"))
+
+    with phase as event:
+        assert event is not None
+        event.response = client.send(event.request, stream=True)
+        event.response.close()
+
+    model = "MeasuredRequest"
+    assert metrics.errors.value(model, "send", "ConnectError") == 1
+    assert metrics.requests.value(model, "GET", "200") == 1
+    assert metrics.latency.count(model) == 2
+    assert metrics.size.count(model) == 0
@@ -1,11 +1,17 @@
+import math
 from typing import ClassVar
+from typing import Iterator
 from typing import Type
 
+import pytest
+from httpx import HTTPStatusError
 from typing_extensions import Annotated
 
 from requestmodel.model import IteratorRequestModel
+from requestmodel.model import OffsetIteratorRequestModel
 from requestmodel.model import RequestModel
 from requestmodel.params import Header
+from tests.fastapi_server import async_client
 from tests.fastapi_server import client
 from tests.fastapi_server.schema import FileCreateSchema
 from tests.fastapi_server.schema import FileUploadRequest
@@ -29,6 +35,24 @@ class PaginatedRequest(IteratorRequestModel[PaginatedResponse]):
         return True
 
 
+class OffsetPaginatedRequest(OffsetIteratorRequestModel[PaginatedResponse]):
+    method: ClassVar[str] = "GET"
+    url: ClassVar[str] = "/items"
+
+    response_model: ClassVar[Type[PaginatedResponse]] = PaginatedResponse
+
+    page: int
+    size: int
+
+    def pages_from_response(
+        self, response: PaginatedResponse
+    ) -> Iterator["OffsetPaginatedRequest"]:
+        last_page = math.ceil(response.total / response.size)
+
+        for page in range(response.page + 1, last_page + 1):
+            yield self.model_copy(update={"page": page})
+
+
 class CreateRequest(RequestModel[FileCreateSchema]):
     method: ClassVar[str] = "PUT"
     url: ClassVar[str] = "/items"
@@ -38,6 +62,10 @@ class CreateRequest(RequestModel[FileCreateSchema]):
     data: FileCreateSchema
 
 
+class EncodedCreateRequest(CreateRequest):
+    encode_json_body: ClassVar[bool] = True
+
+
 def test_file_upload() -> None:
     request = FileUploadRequest(
         name="test", path="test", file=b"test", extra_header="test1"
@@ -68,3 +96,85 @@ def test_create() -> None:
     assert isinstance(response, FileCreateSchema)
     assert response.name == "test"
     assert response.path == "test"
+
+
+def test_create_encoded_json_body() -> None:
+    request = EncodedCreateRequest(data=FileCreateSchema(name="test", path="test"))
+
+    assert request.json_body() == b'{"name":"test","path":"test"}'
+    assert request.as_request(client).content == request.json_body()
+
+    response = request.send(client)
+
+    assert response == FileCreateSchema(name="test", path="test")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("prefetch", [0, 1, 3])
+async def test_paginated_async(prefetch: int) -> None:
+    request = PaginatedRequest(page=1, size=25)
+
+    pages = [page.page async for page in request.aiter_pages(async_client, prefetch)]
+
+    assert pages == [1, 2, 3, 4]
+
+
+@pytest.mark.asyncio
+async def test_paginated_async_early_exit() -> None:
+    request = PaginatedRequest(page=1, size=25)
+
+    pages = request.aiter_pages(async_client, prefetch=2)
+
+    assert (await pages.__anext__()).page == 1
+    await pages.aclose()
+
+    # one page was handed out, the prefetched ones were dropped
+    assert request.page in (2, 3, 4)
+
+
+@pytest.mark.asyncio
+async def test_paginated_async_error() -> None:
+    class MissingRequest(PaginatedRequest):
+        url: ClassVar[str] = "/missing"
+
+    with pytest.raises(HTTPStatusError):
+        async for _ in MissingRequest(page=1, size=25).aiter_pages(async_client):
+            pass  # pragma: no cover
+
+
+@pytest.mark.parametrize("ordered", [True, False])
+def test_offset_paginated(ordered: bool) -> None:
+    request = OffsetPaginatedRequest(page=1, size=10)
+
+    pages = [page.page for page in request.send(client, 3, ordered)]
+
+    assert pages[0] == 1
+    assert sorted(pages) == list(range(1, 11))
+    if ordered:
+        assert pages == list(range(1, 11))
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("ordered", [True, False])
+async def test_offset_paginated_async(ordered: bool) -> None:
+    request = OffsetPaginatedRequest(page=1, size=10)
+
+    pages = [page.page async for page in request.aiter_pages(async_client, 3, ordered)]
+
+    assert sorted(pages) == list(range(1, 11))
+    if ordered:
+        assert pages == list(range(1, 11))
+
+
+def test_offset_paginated_error() -> None:
+    class MissingRequest(OffsetPaginatedRequest):
+        url: ClassVar[str] = "/missing"
+
+    class BrokenRequest(OffsetPaginatedRequest):
+        def pages_from_response(
+            self, response: PaginatedResponse
+        ) -> Iterator["OffsetPaginatedRequest"]:
+            yield MissingRequest(page=2, size=10)
+
+    with pytest.raises(HTTPStatusError):
+        list(BrokenRequest(page=1, size=10).send(client))
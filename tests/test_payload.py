@@ -0,0 +1,12 @@
+import pytest
+from httpx import Client
+
+from tests.fastapi_server import client as fastapi_client
+from tests.flask_server import client as flask_client
+
+
+@pytest.mark.parametrize("client", [fastapi_client, flask_client])
+def test_payload(client: Client) -> None:
+    response = client.get("/payload", params={"size": 3})
+
+    assert response.json() == {"items": [0, 1, 2], "total": 3, "page": 1, "size": 3}
@@ -0,0 +1,105 @@
+import asyncio
+import time
+from typing import ClassVar
+from typing import Type
+
+import pytest
+from httpx import AsyncClient
+from httpx import Client
+from httpx import MockTransport
+from httpx import Request
+from httpx import Response
+
+from requestmodel import RequestModel
+from requestmodel.ratelimit import HostRateLimiter
+from requestmodel.ratelimit import TokenBucket
+from tests.fastapi_server.schema import NameModel
+
+
+def handler(request: Request) -> Response:
+    return Response(200, json={"name": "a"})
+
+
+class LimitedRequest(RequestModel[NameModel]):
+    method: ClassVar[str] = "GET"
+    url: ClassVar[str] = "/names/a"
+    response_model: ClassVar[Type[NameModel]] = NameModel
+    rate_limiter: ClassVar[TokenBucket] = TokenBucket(rate=20, capacity=2)
+
+
+def test_token_bucket_burst(monkeypatch: pytest.MonkeyPatch) -> None:
+    # a clock that only moves when the test says so
+    now = [100.0]
+    monkeypatch.setattr("requestmodel.ratelimit.time.monotonic", lambda: now[0])
+    bucket = TokenBucket(rate=10, capacity=3)
+
+    assert [bucket.reserve() for _ in range(3)] == [0, 0, 0]
+    assert bucket.reserve() == pytest.approx(0.1)
+    assert bucket.reserve() == pytest.approx(0.2)
+    assert bucket.acquired == 5
+    assert bucket.delayed == 2
+    assert bucket.waited == pytest.approx(0.3)
+
+    # the two tokens owed and a full bucket
+    now[0] += 0.5
+    assert [bucket.reserve() for _ in range(3)] == [0, 0, 0]
+    assert bucket.reserve() == pytest.approx(0.1)
+
+
+def test_token_bucket_refills() -> None:
+    bucket = TokenBucket(rate=1000, capacity=1)
+
+    assert bucket.acquire() == 0
+    time.sleep(0.01)
+    assert bucket.acquire() == 0
+
+
+def test_rate_limited_send() -> None:
+    LimitedRequest.rate_limiter = TokenBucket(rate=20, capacity=2)
+    client = Client(transport=MockTransport(handler), base_url="http://testserver")
+
+    start = time.monotonic()
+    for _ in range(5):
+        assert LimitedRequest().send(client).name == "a"
+
+    assert time.monotonic() - start >= 0.1
+    assert LimitedRequest.rate_limiter.delayed == 3
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_asend() -> None:
+    LimitedRequest.rate_limiter = TokenBucket(rate=20, capacity=2)
+    client = AsyncClient(transport=MockTransport(handler), base_url="http://testserver")
+
+    start = time.monotonic()
+    await asyncio.gather(*(LimitedRequest().asend(client) for _ in range(5)))
+
+    assert time.monotonic() - start >= 0.1
+    assert LimitedRequest.rate_limiter.delayed == 3
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_returns_token() -> None:
+    bucket = TokenBucket(rate=1, capacity=1)
+    await bucket.aacquire()
+
+    task = asyncio.ensure_future(bucket.aacquire())
+    await asyncio.sleep(0)
+    task.cancel()
+
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert bucket.reserve() == pytest.approx(1, abs=0.05)
+
+
+def test_host_rate_limiter() -> None:
+    limiter = HostRateLimiter(rate=10, capacity=1)
+
+    a = limiter.for_request(Request("GET", "http://a.example/x"))
+    b = limiter.for_request(Request("GET", "http://b.example/x"))
+
+    assert a is limiter.for_request(Request("GET", "http://a.example/y?q=1"))
+    assert a is not b
+    assert a.reserve() == 0
+    assert b.reserve() == 0
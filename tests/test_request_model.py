@@ -1,3 +1,4 @@
+import json
 from typing import Any
 from typing import ClassVar
 from typing import Dict
@@ -8,7 +9,10 @@ from typing import Type
 import pytest
 from fastapi._compat import field_annotation_is_scalar
 from fastapi._compat import field_annotation_is_sequence
+from httpx import Client
+from httpx import Response
 from pydantic import BaseModel
+from pydantic import PrivateAttr
 from pydantic import ValidationError
 from typeguard import suppress_type_checks
 from typing_extensions import Annotated
@@ -18,7 +22,9 @@ from typing_extensions import get_type_hints
 
 from requestmodel import RequestModel
 from requestmodel import params
+from requestmodel.adapters.requests import RequestsRequestModel
 from requestmodel.utils import get_annotated_type
+from requestmodel.utils import json_member_value
 from tests.fastapi_server import client
 from tests.fastapi_server.schema import NameModel
 from tests.fastapi_server.schema import NameModelList
@@ -202,3 +208,230 @@ def test_type_adapter_exception() -> None:
         ValueError, match="response_model must be a TypeAdapter or a BaseModel"
     ):
         request.adapt_type(SimpleResponse(data="test"))
+    with pytest.raises(
+        ValueError, match="response_model must be a TypeAdapter or a BaseModel"
+    ):
+        request.adapt_content(b"{}")
+
+
+class DictResponse:
+    def json(self) -> Any:
+        return {"data": "from dict"}
+
+
+def test_adapt_type_from_bytes() -> None:
+    request = ModelWithClassVar2(page=1)
+    response = Response(200, content=b'{"data": "from bytes"}')
+
+    assert request.adapt_type(response) == SimpleResponse(data="from bytes")
+    assert request.adapt_type(DictResponse()) == SimpleResponse(data="from dict")
+
+
+def test_adapt_type_without_bytes_validation() -> None:
+    class DictRequest(ModelWithClassVar2):
+        validate_json_bytes: ClassVar[bool] = False
+
+    request = DictRequest(page=1)
+    response = Response(200, json={"data": "from json"})
+
+    assert request.adapt_type(response) == SimpleResponse(data="from json")
+
+
+def test_type_adapter_without_bytes_validation() -> None:
+    class DictListRequest(RequestModel[List[NameModel]]):  # type: ignore[type-var]
+        url: ClassVar[str] = "/type-adapter"
+        method: ClassVar[str] = "GET"
+        response_model: ClassVar[Type[List[NameModel]]] = NameModelList  # type: ignore[assignment]
+        validate_json_bytes: ClassVar[bool] = False
+
+    response = Response(200, json=[{"name": "from json"}])
+
+    assert DictListRequest().adapt_type(response) == [NameModel(name="from json")]
+
+
+def test_request_plan_is_cached() -> None:
+    plan = ModelWithClassVar.request_plan()
+
+    assert plan is ModelWithClassVar.request_plan()
+    assert [field.name for field in plan.fields] == ["body", "X_Test", "X-Scored"]
+    assert plan.fields[0].kind is params.Body
+
+
+def test_request_plan_follows_url() -> None:
+    class PathRequest(RequestModel[SimpleResponse]):
+        url: ClassVar[str] = "/items/{item_id}"
+        method: ClassVar[str] = "GET"
+        response_model: ClassVar[Type[SimpleResponse]] = SimpleResponse
+        item_id: int
+
+    assert PathRequest.request_plan().fields[-1].kind is params.Path
+    assert PathRequest(item_id=1).get_path_param_names() == {"item_id"}
+
+    PathRequest.url = "/items"
+
+    assert PathRequest.request_plan().path_param_names == frozenset()
+    assert PathRequest.request_plan().fields[-1].kind is params.Query
+    assert PathRequest(item_id=1).get_path_param_names() == set()
+
+
+class DefaultsRequest(RequestModel[SimpleResponse]):
+    url: ClassVar[str] = "test"
+    method: ClassVar[str] = "POST"
+    response_model: ClassVar[Type[SimpleResponse]] = SimpleResponse
+
+    body: NameModel
+    page: int = 1
+    missing: Optional[int] = None
+    query: Annotated[str, params.Query(alias="q")]
+
+
+def test_dump_values_single_pass() -> None:
+    request = DefaultsRequest(body=NameModel(name="test"), query="search")
+
+    assert request.request_args_for_values() == {
+        params.Query: {"page": 1, "q": "search"},
+        params.Cookie: {},
+        params.Header: {},
+        params.Path: {},
+        params.File: {},
+        params.Body: {"name": "test"},
+    }
+
+
+def test_private_attributes_are_not_sent() -> None:
+    class PrivateRequest(DefaultsRequest):
+        _token: str = PrivateAttr("secret")
+
+    request = PrivateRequest(body=NameModel(name="test"), query="search")
+
+    assert "_token" not in [field.key for field in request.request_plan().fields]
+    assert request.request_args_for_values() == {
+        params.Query: {"page": 1, "q": "search"},
+        params.Cookie: {},
+        params.Header: {},
+        params.Path: {},
+        params.File: {},
+        params.Body: {"name": "test"},
+    }
+
+
+class EncodedRequest(SimpleRequest2):
+    encode_json_body: ClassVar[bool] = True
+
+    content_type: Annotated[str, params.Header()] = "application/json"
+    nested: Annotated[NameModel, params.Body()]
+    embedded: Annotated[NameModel, params.Body(embed=True)]
+
+
+def test_json_body_matches_body_for_values() -> None:
+    request = EncodedRequest(
+        query_list=[1],
+        data_str="test",
+        data_int=1,
+        data_list=[0, 1],
+        data_dict={"key": 1925},
+        nested=NameModel(name="nested"),
+        embedded=NameModel(name="embedded"),
+    )
+
+    assert json.loads(request.json_body()) == request.body_for_values()
+    assert request.body_for_values() == {
+        "data_str": "test",
+        "data_int": 1,
+        "data_list": [0, 1],
+        "data_dict": {"key": 1925},
+        "name": "nested",
+        "embedded": {"name": "embedded"},
+    }
+    assert request.request_args_for_values(include_body=False)[params.Body] == {}
+
+
+def test_json_body_skips_unset_fields() -> None:
+    class OptionalBodyRequest(EncodedRequest):
+        comment: Annotated[Optional[str], params.Body()] = None
+
+    request = OptionalBodyRequest(
+        query_list=[1],
+        data_str="test",
+        data_int=1,
+        data_list=[0, 1],
+        data_dict={"key": 1925},
+        nested=NameModel(name="nested"),
+        embedded=NameModel(name="embedded"),
+    )
+    commented = request.model_copy(update={"comment": "a"})
+
+    assert json.loads(request.json_body()) == request.body_for_values()
+    assert "comment" not in request.body_for_values()
+    assert json.loads(commented.json_body())["comment"] == "a"
+
+
+def test_json_body_skips_empty_objects() -> None:
+    class Filters(BaseModel):
+        name: Optional[str] = None
+
+    class FilterRequest(RequestModel[SimpleResponse]):
+        url: ClassVar[str] = "/test"
+        method: ClassVar[str] = "POST"
+        response_model: ClassVar[Type[SimpleResponse]] = SimpleResponse
+        encode_json_body: ClassVar[bool] = True
+
+        content_type: Annotated[str, params.Header()] = "application/json"
+        filters: Annotated[Filters, params.Body()]
+        page: Annotated[int, params.Body()] = 1
+
+    # the filters are set, but none of their fields
+    assert json.loads(FilterRequest(filters=Filters()).json_body()) == {"page": 1}
+
+
+def test_json_member_value() -> None:
+    assert json_member_value(b'{"a":[1,2]}', "a") == b"[1,2]"
+
+    with pytest.raises(ValueError, match="expected a JSON object with only 'a'"):
+        json_member_value(b'{"b":1}', "a")
+
+
+def test_httpx_adapter_form_body() -> None:
+    class FormRequest(RequestModel[SimpleResponse]):
+        url: ClassVar[str] = "/test"
+        method: ClassVar[str] = "POST"
+        response_model: ClassVar[Type[SimpleResponse]] = SimpleResponse
+        encode_json_body: ClassVar[bool] = True
+
+        content_type: Annotated[str, params.Header()] = "text/plain"
+        body: SimpleBody
+
+    request = FormRequest(body=SimpleBody(data="test")).as_request(
+        Client(base_url="http://test")
+    )
+
+    assert request.content == b"data=test"
+    assert request.headers["content-type"] == "text/plain"
+
+
+class EncodedRequestsModel(RequestsRequestModel[SimpleResponse]):
+    url: ClassVar[str] = "https://example.com/test"
+    method: ClassVar[str] = "POST"
+    response_model: ClassVar[Type[SimpleResponse]] = SimpleResponse
+    encode_json_body: ClassVar[bool] = True
+
+    content_type: Annotated[str, params.Header()] = "application/json"
+    body: SimpleBody
+
+
+def test_requests_adapter_json_body() -> None:
+    request = EncodedRequestsModel(body=SimpleBody(data="test"))
+
+    prepared = request.as_request().prepare()
+
+    assert prepared.body == b'{"data":"test"}'
+    assert prepared.headers["content-type"] == "application/json"
+
+
+def test_requests_adapter_form_body() -> None:
+    class FormRequestsModel(EncodedRequestsModel):
+        content_type: Annotated[str, params.Header()] = "text/plain"
+
+    request = FormRequestsModel(body=SimpleBody(data="test"))
+
+    assert request.as_request().prepare().body == "data=test"
@@ -0,0 +1,187 @@
+from typing import ClassVar
+from typing import List
+from typing import Type
+
+import pytest
+from httpx import AsyncClient
+from httpx import Client
+from httpx import ConnectError
+from httpx import HTTPStatusError
+from httpx import MockTransport
+from httpx import Request
+from httpx import Response
+
+from requestmodel import IteratorRequestModel
+from requestmodel import RequestModel
+from requestmodel.retry import Retry
+from requestmodel.retry import RetryBudget
+from requestmodel.retry import parse_retry_after
+from tests.fastapi_server.schema import NameModel
+
+
+class RetriedRequest(RequestModel[NameModel]):
+    method: ClassVar[str] = "GET"
+    url: ClassVar[str] = "/names/a"
+    response_model: ClassVar[Type[NameModel]] = NameModel
+    retry: ClassVar[Retry] = Retry(attempts=3, backoff=0, budget=RetryBudget())
+
+
+class RetriedPostRequest(RetriedRequest):
+    method: ClassVar[str] = "POST"
+
+
+class RetriedPages(IteratorRequestModel[NameModel], RetriedRequest):
+    page: int = 1
+
+    def next_from_response(self, response: NameModel) -> bool:
+        self.page += 1
+        return self.page <= 2
+
+
+class Flaky:
+    """Fail the first ``failures`` requests"""
+
+    def __init__(self, failures: int, status_code: int = 503) -> None:
+        self.failures = failures
+        self.status_code = status_code
+        self.requests: List[Request] = []
+
+    def __call__(self, request: Request) -> Response:
+        self.requests.append(request)
+
+        if len(self.requests) <= self.failures:
+            if self.status_code == 0:
+                raise ConnectError("connection refused", request=request)
+            return Response(self.status_code, headers={"retry-after": "0"})
+
+        return Response(200, json={"name": "a"})
+
+
+def client(handler: Flaky) -> Client:
+    return Client(transport=MockTransport(handler), base_url="http://test")
+
+
+@pytest.mark.parametrize("status_code", [503, 0])
+def test_retry(status_code: int) -> None:
+    server = Flaky(2, status_code)
+
+    assert RetriedRequest().send(client(server)).name == "a"
+    assert len(server.requests) == 3
+
+
+def test_retry_gives_up() -> None:
+    server = Flaky(3)
+
+    with pytest.raises(HTTPStatusError):
+        RetriedRequest().send(client(server))
+
+    assert len(server.requests) == 3
+
+
+def test_retry_not_idempotent() -> None:
+    server = Flaky(1)
+
+    with pytest.raises(HTTPStatusError):
+        RetriedPostRequest().send(client(server))
+
+    assert len(server.requests) == 1
+
+
+def test_retry_pages() -> None:
+    server = Flaky(1)
+
+    assert len(list(RetriedPages().send(client(server)))) == 2
+    assert len(server.requests) == 3
+
+
+@pytest.mark.asyncio
+async def test_retry_async() -> None:
+    server = Flaky(2)
+    async_client = AsyncClient(transport=MockTransport(server), base_url="http://test")
+
+    assert (await RetriedRequest().asend(async_client)).name == "a"
+    assert len(server.requests) == 3
+
+
+class Budgeted(RetriedRequest):
+    retry: ClassVar[Retry] = Retry(backoff=0, budget=RetryBudget(burst=100))
+
+
+@pytest.mark.asyncio
+async def test_retry_async_transport_error() -> None:
+    server = Flaky(1, status_code=0)
+    async_client = AsyncClient(transport=MockTransport(server), base_url="http://test")
+
+    assert (await RetriedRequest().asend(async_client)).name == "a"
+    assert len(server.requests) == 2
+
+    server = Flaky(3, status_code=0)
+    async_client = AsyncClient(transport=MockTransport(server), base_url="http://test")
+
+    with pytest.raises(ConnectError):
+        await Budgeted().asend(async_client)
+
+    assert len(server.requests) == 3
+
+
+def test_retry_gives_up_on_transport_error() -> None:
+    server = Flaky(3, status_code=0)
+
+    with pytest.raises(ConnectError):
+        Budgeted().send(client(server))
+
+    assert len(server.requests) == 3
+
+
+def test_retry_empty_budget() -> None:
+    class Unbudgeted(RetriedRequest):
+        retry: ClassVar[Retry] = Retry(backoff=0, budget=RetryBudget(ratio=0, burst=0))
+
+    server = Flaky(1)
+
+    with pytest.raises(HTTPStatusError):
+        Unbudgeted().send(client(server))
+
+    assert len(server.requests) == 1
+    assert Unbudgeted.retry.budget.exhausted == 1
+    assert Unbudgeted.retry.retries == 0
+
+
+def test_retry_budget() -> None:
+    budget = RetryBudget(ratio=0.5, burst=1)
+
+    assert budget.withdraw()
+    assert not budget.withdraw()
+
+    budget.deposit()
+    budget.deposit()
+
+    assert budget.withdraw()
+    assert budget.exhausted == 1
+
+
+def test_retry_delay() -> None:
+    retry = Retry(backoff=1, max_backoff=4, budget=RetryBudget(burst=100))
+    request = Request("GET", "http://test")
+
+    for attempt in range(10):
+        assert 0 <= retry.backoff_for(attempt) <= 4
+
+    assert retry.delay(request, 0, Response(503, headers={"retry-after": "2"})) == 2
+    assert 0 <= retry.delay(request, 0, Response(503)) <= 1  # type: ignore[operator]
+    assert retry.delay(request, 0, Response(503, headers={"retry-after": "60"})) is None
+    assert retry.delay(request, 0, Response(404)) is None
+    assert retry.delay(request, 0, error=ValueError()) is None
+    assert retry.delay(request, 2, Response(503)) is None
+
+    streaming = Request("PUT", "http://test", content=iter([b"data"]))
+    assert retry.delay(streaming, 0, Response(503)) is None
+
+
+def test_parse_retry_after() -> None:
+    def parse(value: str) -> object:
+        return parse_retry_after(Response(503, headers={"retry-after": value}))
+
+    assert parse("3") == 3
+    assert parse("Wed, 21 Oct 2015 07:28:00 GMT") == 0
+    assert parse("soon") is None
@@ -0,0 +1,134 @@
+import asyncio
+from typing import ClassVar
+from typing import List
+from typing import Type
+
+import pytest
+from httpx import AsyncClient
+from httpx import HTTPStatusError
+from httpx import MockTransport
+from httpx import Request
+from httpx import Response
+
+from requestmodel import RequestModel
+from requestmodel.singleflight import SingleFlight
+from tests.fastapi_server.schema import NameModel
+
+
+class SharedRequest(RequestModel[NameModel]):
+    method: ClassVar[str] = "GET"
+    url: ClassVar[str] = "/names/{name}"
+    response_model: ClassVar[Type[NameModel]] = NameModel
+    single_flight: ClassVar[SingleFlight] = SingleFlight()
+
+    name: str
+
+
+class SharedPostRequest(SharedRequest):
+    method: ClassVar[str] = "POST"
+
+
+def make_client(requests: List[Request], status_code: int = 200) -> AsyncClient:
+    async def handler(request: Request) -> Response:
+        requests.append(request)
+        await asyncio.sleep(0.01)
+        name = request.url.path.rsplit("/", 1)[-1]
+        return Response(status_code, json={"name": name})
+
+    return AsyncClient(transport=MockTransport(handler), base_url="http://test")
+
+
+@pytest.mark.asyncio
+async def test_single_flight() -> None:
+    requests: List[Request] = []
+    client = make_client(requests)
+    models = [SharedRequest(name="a") for _ in range(10)] + [SharedRequest(name="b")]
+
+    responses = await asyncio.gather(*(model.asend(client) for model in models))
+
+    assert len(requests) == 2
+    assert all(response is responses[0] for response in responses[:10])
+    assert responses[10].name == "b"
+    assert all(model.raw_response is not None for model in models)
+    assert len(SharedRequest.single_flight) == 0
+
+
+class OtherName(NameModel):
+    pass
+
+
+class OtherSharedRequest(SharedRequest):
+    response_model: ClassVar[Type[NameModel]] = OtherName
+
+
+@pytest.mark.asyncio
+async def test_single_flight_per_model() -> None:
+    requests: List[Request] = []
+    client = make_client(requests)
+
+    # both models inherit the single flight and build the same request
+    shared, other = await asyncio.gather(
+        SharedRequest(name="a").asend(client),
+        OtherSharedRequest(name="a").asend(client),
+    )
+
+    assert len(requests) == 2
+    assert type(shared) is NameModel
+    assert type(other) is OtherName
+
+
+@pytest.mark.asyncio
+async def test_single_flight_shares_errors() -> None:
+    requests: List[Request] = []
+    client = make_client(requests, status_code=503)
+
+    results = await asyncio.gather(
+        *(SharedRequest(name="a").asend(client) for _ in range(3)),
+        return_exceptions=True,
+    )
+
+    assert len(requests) == 1
+    assert all(isinstance(result, HTTPStatusError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_single_flight_only_for_get() -> None:
+    requests: List[Request] = []
+    client = make_client(requests)
+
+    await asyncio.gather(*(SharedPostRequest(name="a").asend(client) for _ in range(3)))
+
+    assert len(requests) == 3
+
+
+@pytest.mark.asyncio
+async def test_single_flight_cancelled_caller() -> None:
+    requests: List[Request] = []
+    client = make_client(requests)
+
+    first = asyncio.ensure_future(SharedRequest(name="a").asend(client))
+    second = asyncio.ensure_future(SharedRequest(name="a").asend(client))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    assert (await second).name == "a"
+    assert first.cancelled()
+    assert len(requests) == 1
+
+
+@pytest.mark.asyncio
+async def test_single_flight_cancelled_call() -> None:
+    flight = SingleFlight()
+
+    async def call() -> None:
+        await asyncio.sleep(0.01)
+        raise asyncio.CancelledError
+
+    results = await asyncio.gather(
+        *(flight.do("a", call) for _ in range(2)), return_exceptions=True
+    )
+
+    assert all(isinstance(result, asyncio.CancelledError) for result in results)
+    assert flight.calls == 1
+    assert flight.shared == 1
+    assert len(flight) == 0
@@ -0,0 +1,514 @@
+import json
+from typing import AsyncIterable
+from typing import AsyncIterator
+from typing import ClassVar
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import Tuple
+from typing import Type
+from typing import Union
+
+import pytest
+from httpx import AsyncClient
+from httpx import Client
+from httpx import HTTPStatusError
+from httpx import MockTransport
+from httpx import Request
+from httpx import Response
+from typing_extensions import Annotated
+
+from requestmodel import NDJSONRequestModel
+from requestmodel import RequestModel
+from requestmodel import SSERequestModel
+from requestmodel import StreamingRequestModel
+from requestmodel import params
+from requestmodel.adapters.requests import RequestsRequestModel
+from requestmodel.streaming import BodyEncoder
+from requestmodel.streaming import ItemScanner
+from requestmodel.streaming import JSONArrayScanner
+from requestmodel.streaming import NDJSONScanner
+from requestmodel.streaming import SSEScanner
+from tests.fastapi_server.schema import NameModel
+
+
+def scan(document: bytes, path: Tuple[str, ...] = (), size: int = 1) -> List[bytes]:
+    scanner = JSONArrayScanner(path)
+    items = []
+
+    for start in range(0, len(document), size):
+        items.extend(scanner.feed(document[start : start + size]))
+
+    scanner.close()
+    return items
+
+
+@pytest.mark.parametrize("size", [1, 3, 1024])
+def test_scan_top_level_array(size: int) -> None:
+    document = b' [{"name": "a,]"}, 1 , "b\\"]", [2, [3]], null, {"x": {}}]'
+
+    assert scan(document, size=size) == [
+        b'{"name": "a,]"}',
+        b"1",
+        b'"b\\"]"',
+        b"[2, [3]]",
+        b"null",
+        b'{"x": {}}',
+    ]
+
+
+def test_scan_nested_array() -> None:
+    document = json.dumps(
+        {
+            "meta": {"docs": [0]},
+            "response": {"numFound": 2, "docs": [{"id": "a"}, {"id": "b"}]},
+            "docs": [1],
+        }
+    ).encode()
+
+    items = scan(document, ("response", "docs"), size=2)
+
+    assert [json.loads(item) for item in items] == [{"id": "a"}, {"id": "b"}]
+
+
+def test_scan_array_at_another_depth() -> None:
+    document = b'{"meta": {"docs": [0], "list": [[1]]}, "docs": [1, 2]}'
+
+    assert scan(document, ("docs",), size=3) == [b"1", b"2"]
+
+    with pytest.raises(ValueError, match="no complete JSON array at docs"):
+        scan(b'[{"docs": 1}]', ("docs",))
+
+    # stray separators outside of any container are skipped
+    assert scan(b'] : {"docs": [3]}', ("docs",)) == [b"3"]
+
+
+def test_scan_escaped_key() -> None:
+    assert scan(b'{"a\\u0062": [1, 2]}', ("ab",)) == [b"1", b"2"]
+
+
+def test_scan_empty_array() -> None:
+    assert scan(b"[]") == []
+    assert scan(b'{"docs": [ ]}', ("docs",)) == []
+
+
+def test_scan_missing_array() -> None:
+    scanner = JSONArrayScanner(("docs",))
+    scanner.feed(b'{"items": [1, 2]}')
+
+    with pytest.raises(ValueError, match="no complete JSON array at docs"):
+        scanner.close()
+
+
+def test_scan_keeps_only_the_current_item() -> None:
+    scanner = JSONArrayScanner()
+    scanner.feed(b"[")
+
+    for _ in range(1_000):
+        assert scanner.feed(b'{"name": "a"},') == [b'{"name": "a"}']
+        assert len(scanner._buffer) < 16
+
+
+class NamesRequest(StreamingRequestModel[NameModel]):
+    method: ClassVar[str] = "GET"
+    url: ClassVar[str] = "/names"
+    response_model: ClassVar[Type[NameModel]] = NameModel
+
+
+class DocsRequest(StreamingRequestModel[NameModel]):
+    method: ClassVar[str] = "GET"
+    url: ClassVar[str] = "/lookup"
+    response_model: ClassVar[Type[NameModel]] = NameModel
+    items_path: ClassVar[Tuple[str, ...]] = ("response", "docs")
+
+
+def chunks(count: int) -> Iterator[bytes]:
+    yield b"["
+    for n in range(count):
+        yield (b"," if n else b"") + json.dumps({"name": str(n)}).encode()
+    yield b"]"
+
+
+def handler(request: Request) -> Response:
+    if request.url.path == "/missing":
+        return Response(404, content=b"not found")
+
+    return Response(200, content=chunks(100))
+
+
+def test_stream_items() -> None:
+    client = Client(transport=MockTransport(handler), base_url="http://test")
+
+    names = [item.name for item in NamesRequest().send(client)]
+
+    assert names == [str(n) for n in range(100)]
+    assert NamesRequest().send(client).__next__() == NameModel(name="0")
+
+
+def test_stream_nested_items() -> None:
+    body = {"response": {"numFound": 1, "start": 0, "docs": [{"name": "a"}] * 3}}
+
+    def lookup(request: Request) -> Response:
+        return Response(200, json=body)
+
+    client = Client(transport=MockTransport(lookup), base_url="http://test")
+
+    docs = list(DocsRequest().send(client))
+
+    assert [doc.name for doc in docs] == ["a", "a", "a"]
+
+
+def test_stream_error() -> None:
+    class MissingRequest(NamesRequest):
+        url: ClassVar[str] = "/missing"
+
+    client = Client(transport=MockTransport(handler), base_url="http://test")
+
+    with pytest.raises(HTTPStatusError):
+        list(MissingRequest().send(client))
+
+
+@pytest.mark.asyncio
+async def test_aiter_items() -> None:
+    async def body() -> AsyncIterator[bytes]:
+        # the client stops reading once the array is closed
+        for chunk in chunks(100):  # pragma: no branch
+            yield chunk
+
+    async def async_handler(request: Request) -> Response:
+        return Response(200, content=body())
+
+    client = AsyncClient(transport=MockTransport(async_handler), base_url="http://test")
+
+    names = [item.name async for item in NamesRequest().aiter_items(client)]
+
+    assert names == [str(n) for n in range(100)]
+
+
+@pytest.mark.asyncio
+async def test_aiter_items_error() -> None:
+    async def body() -> AsyncIterator[bytes]:
+        yield b"not found"
+
+    async def async_handler(request: Request) -> Response:
+        return Response(404, content=body())
+
+    client = AsyncClient(transport=MockTransport(async_handler), base_url="http://test")
+    model = NamesRequest()
+
+    with pytest.raises(HTTPStatusError):
+        [item async for item in model.aiter_items(client)]
+
+    assert model.raw_response is not None
+    assert model.raw_response.content == b"not found"
+    assert model.raw_response.is_closed
+
+
+def feed_all(scanner: ItemScanner, document: bytes, size: int) -> List[bytes]:
+    items = []
+
+    for start in range(0, len(document), size):
+        items.extend(scanner.feed(document[start : start + size]))
+
+    return items + scanner.close()
+
+
+@pytest.mark.parametrize("size", [1, 4, 1024])
+def test_scan_ndjson(size: int) -> None:
+    document = b'{"name": "a"}\n\n{"name": "b"}\r\n {"name": "c"}'
+
+    assert feed_all(NDJSONScanner(), document, size) == [
+        b'{"name": "a"}',
+        b'{"name": "b"}',
+        b' {"name": "c"}',
+    ]
+
+
+@pytest.mark.parametrize("size", [1, 5, 1024])
+def test_scan_sse(size: int) -> None:
+    document = (
+        b": keep-alive\r\n\r\n"
+        b'data: {"name":\r\ndata: "a"}\r\nid: 1\r\n\r\n'
+        b"event: ping\ndata: {}\n\n"
+        b'event: message\ndata:{"name": "b"}\r\r'
+        b"retry: 10\n\n"
+        b'data: {"name": "unfinished"}\n'
+    )
+
+    assert feed_all(SSEScanner(), document, size) == [
+        b'{"name":\n"a"}',
+        b"{}",
+        b'{"name": "b"}',
+    ]
+    assert feed_all(SSEScanner({"message"}), document, size) == [
+        b'{"name":\n"a"}',
+        b'{"name": "b"}',
+    ]
+
+
+class RecordsRequest(NDJSONRequestModel[NameModel]):
+    method: ClassVar[str] = "GET"
+    url: ClassVar[str] = "/records"
+    response_model: ClassVar[Type[NameModel]] = NameModel
+
+
+class EventsRequest(SSERequestModel[NameModel]):
+    method: ClassVar[str] = "GET"
+    url: ClassVar[str] = "/events"
+    response_model: ClassVar[Type[NameModel]] = NameModel
+    events: ClassVar[Optional[Set[str]]] = {"name"}
+
+
+def records(count: int) -> Iterator[bytes]:
+    for n in range(count):
+        yield json.dumps({"name": str(n)}).encode() + b"\n"
+
+
+def test_ndjson_items() -> None:
+    def ndjson(request: Request) -> Response:
+        return Response(200, content=records(10))
+
+    client = Client(transport=MockTransport(ndjson), base_url="http://test")
+
+    names = [item.name for item in RecordsRequest().send(client)]
+
+    assert names == [str(n) for n in range(10)]
+
+
+def test_ndjson_last_record_without_newline() -> None:
+    def ndjson(request: Request) -> Response:
+        return Response(200, content=iter([b'{"name": "a"}\n{"name"', b': "b"}']))
+
+    client = Client(transport=MockTransport(ndjson), base_url="http://test")
+
+    assert [item.name for item in RecordsRequest().send(client)] == ["a", "b"]
+
+
+def test_ndjson_early_exit_closes_the_response() -> None:
+    produced = []
+
+    def body() -> Iterator[bytes]:
+        # the test stops after the first record
+        for chunk in records(1_000):  # pragma: no branch
+            produced.append(chunk)
+            yield chunk
+
+    def ndjson(request: Request) -> Response:
+        return Response(200, content=body())
+
+    client = Client(transport=MockTransport(ndjson), base_url="http://test")
+    model = RecordsRequest()
+    items = model.send(client)
+
+    assert next(items) == NameModel(name="0")
+    items.close()
+
+    assert model.raw_response is not None
+    assert model.raw_response.is_closed
+    assert len(produced) == 1
+
+
+def test_sse_items() -> None:
+    def sse(request: Request) -> Response:
+        content = b'event: name\ndata: {"name": "a"}\n\nevent: other\ndata: 1\n\n'
+        return Response(
+            200, content=content, headers={"content-type": "text/event-stream"}
+        )
+
+    client = Client(transport=MockTransport(sse), base_url="http://test")
+
+    assert list(EventsRequest().send(client)) == [NameModel(name="a")]
+
+
+@pytest.mark.asyncio
+async def test_ndjson_aiter_items() -> None:
+    async def body() -> AsyncIterator[bytes]:
+        # the test stops after the first record
+        for chunk in records(10):  # pragma: no branch
+            yield chunk
+
+    async def async_handler(request: Request) -> Response:
+        return Response(200, content=body())
+
+    client = AsyncClient(transport=MockTransport(async_handler), base_url="http://test")
+    model = RecordsRequest()
+    items = model.aiter_items(client)
+
+    assert await items.__anext__() == NameModel(name="0")
+    await items.aclose()
+
+    assert model.raw_response is not None
+    assert model.raw_response.is_closed
+
+
+@pytest.mark.asyncio
+async def test_ndjson_aiter_last_record_without_newline() -> None:
+    async def body() -> AsyncIterator[bytes]:
+        yield b'{"name": "a"}\n{"name"'
+        yield b': "b"}'
+
+    async def async_handler(request: Request) -> Response:
+        return Response(200, content=body())
+
+    client = AsyncClient(transport=MockTransport(async_handler), base_url="http://test")
+
+    names = [item.name async for item in RecordsRequest().aiter_items(client)]
+
+    assert names == ["a", "b"]
+
+
+def test_encode_ndjson() -> None:
+    encoder = BodyEncoder("ndjson", chunk_size=20)
+    items = [NameModel(name="a"), {"name": "b"}, NameModel(name="c")]
+
+    assert list(encoder.iter_bytes(items)) == [
+        b'{"name":"a"}\n{"name":"b"}\n',
+        b'{"name":"c"}\n',
+    ]
+
+
+@pytest.mark.asyncio
+async def test_aencode_ndjson() -> None:
+    async def items() -> AsyncIterator[NameModel]:
+        for name in "ab":
+            yield NameModel(name=name)
+
+    # every item fills a chunk, nothing is left when the items end
+    encoder = BodyEncoder("ndjson", chunk_size=1)
+
+    assert [chunk async for chunk in encoder.aiter_bytes(items())] == [
+        b'{"name":"a"}\n',
+        b'{"name":"b"}\n',
+    ]
+
+
+def test_encode_array() -> None:
+    items = [NameModel(name=str(n)) for n in range(3)]
+
+    assert b"".join(BodyEncoder("array", chunk_size=1).iter_bytes(items)) == (
+        b'[{"name":"0"},{"name":"1"},{"name":"2"}]'
+    )
+    assert list(BodyEncoder("array").iter_bytes([])) == [b"[]"]
+    assert list(BodyEncoder("ndjson").iter_bytes([])) == []
+
+
+class UploadRequest(RequestModel[NameModel]):
+    method: ClassVar[str] = "POST"
+    url: ClassVar[str] = "/upload"
+    response_model: ClassVar[Type[NameModel]] = NameModel
+
+    dataset: Annotated[str, params.Query()]
+    records: Annotated[
+        Union[Iterable[NameModel], AsyncIterable[NameModel]],
+        params.StreamBody(chunk_size=32),
+    ]
+
+
+class ArrayUploadRequest(UploadRequest):
+    records: Annotated[Iterable[NameModel], params.StreamBody(format="array")]
+
+
+def upload(request: Request) -> Response:
+    chunked = request.headers.get("transfer-encoding") == "chunked"
+    lines = request.read().splitlines()
+
+    return Response(
+        200,
+        json={"name": f"{len(lines)} {request.headers['content-type']} {chunked}"},
+    )
+
+
+def test_stream_body() -> None:
+    consumed = []
+
+    def generate() -> Iterator[NameModel]:
+        for n in range(100):
+            consumed.append(n)
+            yield NameModel(name=str(n))
+
+    client = Client(transport=MockTransport(upload), base_url="http://test")
+    model = UploadRequest(dataset="names", records=generate())
+
+    request = model.as_request(client)
+
+    assert consumed == []
+    assert request.url.params["dataset"] == "names"
+    assert "records" not in request.url.params
+
+    assert model.send(client) == NameModel(name="100 application/x-ndjson True")
+    assert len(consumed) == 100
+    assert "content-type" not in client.headers
+
+
+def test_stream_body_array() -> None:
+    def upload_array(request: Request) -> Response:
+        names = [item["name"] for item in json.loads(request.read())]
+        return Response(200, json={"name": ",".join(names)})
+
+    client = Client(transport=MockTransport(upload_array), base_url="http://test")
+    records = (NameModel(name=str(n)) for n in range(3))
+
+    model = ArrayUploadRequest(dataset="names", records=records)
+
+    assert model.send(client) == NameModel(name="0,1,2")
+
+
+@pytest.mark.asyncio
+async def test_stream_body_async() -> None:
+    async def generate() -> AsyncIterator[NameModel]:
+        for n in range(100):
+            yield NameModel(name=str(n))
+
+    async def async_upload(request: Request) -> Response:
+        await request.aread()
+        return upload(request)
+
+    client = AsyncClient(transport=MockTransport(async_upload), base_url="http://test")
+    model = UploadRequest(dataset="names", records=generate())
+
+    assert await model.asend(client) == NameModel(name="100 application/x-ndjson True")
+
+
+def test_stream_body_requests() -> None:
+    class RequestsUpload(RequestsRequestModel[NameModel]):
+        method: ClassVar[str] = "POST"
+        url: ClassVar[str] = "http://test/upload"
+        response_model: ClassVar[Type[NameModel]] = NameModel
+
+        records: Annotated[
+            Union[Iterable[NameModel], AsyncIterable[NameModel]], params.StreamBody()
+        ]
+
+    request = RequestsUpload(records=[NameModel(name="a")]).as_request().prepare()
+
+    assert request.headers["Transfer-Encoding"] == "chunked"
+    assert request.headers["content-type"] == "application/x-ndjson"
+    assert isinstance(request.body, Iterator)
+    assert list(request.body) == [b'{"name":"a"}\n']
+
+    async def generate() -> AsyncIterator[NameModel]:
+        yield NameModel(name="a")  # pragma: no cover
+
+    with pytest.raises(TypeError):
+        RequestsUpload(records=generate()).as_request()
+
+
+def test_one_stream_body() -> None:
+    class TwoStreams(UploadRequest):
+        more: Annotated[Iterable[NameModel], params.StreamBody()]
+
+    with pytest.raises(ValueError, match="more than one StreamBody"):
+        TwoStreams.request_plan()
+
+    class Mixed(UploadRequest):
+        other: NameModel
+
+    with pytest.raises(ValueError, match="can not mix"):
+        Mixed.request_plan()
+
+
+def test_unknown_stream_format() -> None:
+    with pytest.raises(ValueError, match="unknown stream format 'csv'"):
+        params.StreamBody(format="csv")
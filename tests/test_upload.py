@@ -0,0 +1,345 @@
+import asyncio
+import io
+import json
+import mmap
+import threading
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+from typing import ClassVar
+from typing import Generator
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Type
+from typing import Union
+
+import httpx
+import pytest
+from httpx import MockTransport
+from httpx import Request
+from httpx import Response
+from typing_extensions import Annotated
+
+from requestmodel import RequestModel
+from requestmodel import params
+from requestmodel.adapters.requests import RequestsRequestModel
+from requestmodel.hedge import Hedge
+from requestmodel.retry import Retry
+from requestmodel.retry import RetryBudget
+from requestmodel.upload import FileUpload
+from requestmodel.upload import MultipartUpload
+from tests.fastapi_server import async_client
+from tests.fastapi_server import client
+from tests.fastapi_server.schema import FileUploadResponse
+
+
+CONTENT = bytes(range(256)) * 40
+
+
+class UploadHandler(BaseHTTPRequestHandler):
+    """Answer with the size of the body, as a strict HTTP/1.1 server"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_PUT(self) -> None:
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        content = json.dumps(
+            {
+                "file_size": len(body),
+                "name": self.headers["Host"],
+                "path": self.path,
+                "extra_header": self.headers["extra-header"],
+            }
+        ).encode()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+@pytest.fixture
+def server() -> Iterator[str]:
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), UploadHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+
+    yield f"http://127.0.0.1:{httpd.server_port}"
+
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def path(tmp_path: Path) -> Path:
+    path = tmp_path / "data.bin"
+    path.write_bytes(CONTENT)
+    return path
+
+
+def chunks(upload: FileUpload) -> bytes:
+    data = list(upload.iter_chunks())
+
+    assert all(len(chunk) <= upload.chunk_size for chunk in data)
+    return b"".join(data)
+
+
+def test_upload_path(path: Path) -> None:
+    upload = FileUpload(path, chunk_size=1000)
+
+    assert upload.filename == "data.bin"
+    assert upload.size == len(CONTENT)
+    assert upload.content_range == f"bytes 0-10239/{len(CONTENT)}"
+    assert chunks(upload) == CONTENT
+    # every iteration starts over
+    assert chunks(upload) == CONTENT
+
+
+def test_upload_range(path: Path) -> None:
+    upload = FileUpload(str(path), offset=1000, length=3000, chunk_size=512)
+
+    assert upload.size == 3000
+    assert upload.content_range == "bytes 1000-3999/10240"
+    assert chunks(upload) == CONTENT[1000:4000]
+
+    end = FileUpload(path, offset=10000, length=3000)
+    assert end.size == 240
+    assert chunks(end) == CONTENT[10000:]
+
+    empty = FileUpload(path, offset=len(CONTENT))
+    assert empty.content_range == "bytes */10240"
+    assert chunks(empty) == b""
+
+    with pytest.raises(ValueError):
+        FileUpload(path, offset=len(CONTENT) + 1)
+
+
+def test_upload_handle(path: Path) -> None:
+    with open(path, "rb") as f:
+        upload = FileUpload(f, offset=10, chunk_size=4096)
+
+        assert upload.filename == "data.bin"
+        assert chunks(upload) == CONTENT[10:]
+        assert f.tell() == 0
+
+    handle = io.BytesIO(CONTENT)
+    upload = FileUpload(handle, offset=5, length=100, chunk_size=30)
+
+    assert upload.filename == "upload"
+    assert chunks(upload) == CONTENT[5:105]
+
+
+def test_upload_truncated_file(path: Path) -> None:
+    upload = FileUpload(path, chunk_size=4096)
+    handle = io.BytesIO(CONTENT)
+    from_handle = FileUpload(handle, chunk_size=4096)
+
+    # the file shrank after the upload measured it
+    path.write_bytes(CONTENT[:5000])
+    handle.truncate(5000)
+
+    for truncated in [upload, from_handle]:
+        with pytest.raises(ValueError, match="is shorter than expected"):
+            chunks(truncated)
+
+
+def test_upload_buffer(path: Path) -> None:
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        upload = FileUpload(m, offset=100, length=200, chunk_size=64)
+
+        assert chunks(upload) == CONTENT[100:300]
+
+    # the mapping can be closed after iterating
+    assert m.closed
+
+    upload = FileUpload(memoryview(CONTENT)[10:], chunk_size=1000)
+
+    assert chunks(upload) == CONTENT[10:]
+
+
+def test_multipart_length() -> None:
+    upload = MultipartUpload(
+        {"name": "a", "tags": ["x", "y"]},
+        {"file": FileUpload(CONTENT, filename='a"b.bin'), "raw": b"raw"},
+        boundary=b"boundary",
+    )
+
+    body = b"".join(upload)
+
+    assert len(body) == upload.content_length == len(upload)
+    assert body.count(b'name="tags"') == 2
+    assert b'filename="a%22b.bin"' in body
+    assert CONTENT in body
+    assert body.endswith(b"--boundary--\r\n")
+
+
+class UploadRequest(RequestModel[FileUploadResponse]):
+    method: ClassVar[str] = "POST"
+    url: ClassVar[str] = "/files/{path}"
+    response_model: ClassVar[Type[FileUploadResponse]] = FileUploadResponse
+
+    path: str
+    name: str
+    file: Annotated[Union[bytes, FileUpload], params.File()]
+    extra_header: Annotated[str, params.Header()]
+
+
+def test_send_upload(path: Path) -> None:
+    model = UploadRequest(
+        path="test",
+        name="test",
+        file=FileUpload(path, offset=240),
+        extra_header="test1",
+    )
+
+    request = model.as_request(client)
+
+    assert request.headers["content-length"] == str(len(request.read()))
+    assert "transfer-encoding" not in request.headers
+
+    response = model.send(client)
+
+    assert response.file_size == len(CONTENT) - 240
+    assert response.extra_header == "test1"
+
+
+@pytest.mark.asyncio
+async def test_asend_upload(path: Path) -> None:
+    model = UploadRequest(
+        path="test", name="test", file=FileUpload(path), extra_header="test1"
+    )
+
+    response = await model.asend(async_client)
+
+    assert response.file_size == len(CONTENT)
+
+
+def test_requests_upload(path: Path) -> None:
+    class RequestsUpload(RequestsRequestModel[FileUploadResponse]):
+        method: ClassVar[str] = "POST"
+        url: ClassVar[str] = "http://test/files"
+        response_model: ClassVar[Type[FileUploadResponse]] = FileUploadResponse
+
+        file: Annotated[FileUpload, params.File()]
+
+    request = RequestsUpload(file=FileUpload(path)).as_request().prepare()
+
+    assert isinstance(request.body, MultipartUpload)
+    assert request.headers["Content-Length"] == str(len(request.body))
+    assert "Transfer-Encoding" not in request.headers
+    assert CONTENT in b"".join(request.body)
+
+
+class PutUploadRequest(UploadRequest):
+    method: ClassVar[str] = "PUT"
+
+
+def test_send_upload_over_a_socket(path: Path, server: str) -> None:
+    model = PutUploadRequest(
+        path="test", name="test", file=FileUpload(path), extra_header="test1"
+    )
+
+    with httpx.Client(base_url=server) as socket_client:
+        assert "host" in model.as_request(socket_client).headers
+
+        response = model.send(socket_client)
+
+    assert response.name == server[len("http://") :]
+    assert model.raw_response is not None
+    assert response.file_size == int(
+        model.raw_response.request.headers["content-length"]
+    )
+
+
+@pytest.mark.asyncio
+async def test_asend_upload_over_a_socket(path: Path, server: str) -> None:
+    model = PutUploadRequest(
+        path="test", name="test", file=FileUpload(path), extra_header="test1"
+    )
+
+    async with httpx.AsyncClient(base_url=server) as socket_client:
+        response = await model.asend(socket_client)
+
+    assert response.name == server[len("http://") :]
+    assert response.file_size > len(CONTENT)
+
+
+def test_retry_upload(path: Path) -> None:
+    bodies = []
+
+    def flaky(request: Request) -> Response:
+        bodies.append(request.read())
+        if len(bodies) == 1:
+            return Response(503)
+        return Response(
+            200,
+            json={
+                "file_size": len(bodies[-1]),
+                "name": "",
+                "path": "",
+                "extra_header": "",
+            },
+        )
+
+    class RetriedUpload(PutUploadRequest):
+        retry: ClassVar[Optional[Retry]] = Retry(backoff=0, budget=RetryBudget())
+
+    model = RetriedUpload(
+        path="test", name="test", file=FileUpload(path), extra_header="test1"
+    )
+    mock_client = httpx.Client(transport=MockTransport(flaky), base_url="http://test")
+
+    assert model.send(mock_client).file_size == len(bodies[0])
+    assert len(bodies) == 2
+    assert bodies[0] == bodies[1]
+    assert Hedge().hedgeable(model.as_request(mock_client))
+
+
+@pytest.mark.asyncio
+async def test_aiter_chunks_reads_off_the_event_loop(path: Path) -> None:
+    threads = set()
+
+    class RecordingUpload(FileUpload):
+        def iter_chunks(self) -> Generator[bytes, None, None]:
+            for chunk in super().iter_chunks():
+                threads.add(threading.get_ident())
+                yield chunk
+
+    upload = RecordingUpload(path, chunk_size=1000)
+
+    assert b"".join([chunk async for chunk in upload.aiter_chunks()]) == CONTENT
+    assert threading.get_ident() not in threads
+
+    chunks = upload.aiter_chunks()
+    assert await chunks.__anext__() == CONTENT[:1000]
+    await chunks.aclose()
+
+
+@pytest.mark.asyncio
+async def test_aiter_chunks_cancelled_during_a_read(path: Path) -> None:
+    reading = threading.Event()
+    release = threading.Event()
+
+    class SlowUpload(FileUpload):
+        def iter_chunks(self) -> Generator[bytes, None, None]:
+            reading.set()
+            release.wait(5)
+            yield from super().iter_chunks()
+
+    async def consume() -> List[bytes]:
+        return [chunk async for chunk in SlowUpload(path).aiter_chunks()]
+
+    task = asyncio.ensure_future(consume())
+    await asyncio.get_running_loop().run_in_executor(None, reading.wait, 5)
+    task.cancel()
+
+    # the read still runs in its thread, it is left to finish on its own
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    release.set()